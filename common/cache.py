@@ -0,0 +1,105 @@
+import time
+from collections import Counter
+
+from django.core.cache import cache
+
+DEFAULT_TIMEOUT = 5 * 60
+MISSING = object()
+
+# hits and misses per namespace, counted in this process
+hits = Counter()
+misses = Counter()
+
+
+def generation_key(model):
+    return f"generation:{model._meta.label_lower}"
+
+
+def generations(*models):
+    keys = [generation_key(model) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # a fresh value instead of 0, so that keys built before the cache
+            # was cleared can never match again
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def generation(model):
+    return generations(model)[0]
+
+
+def bump_generation(model):
+    """
+    Invalidate everything cached for `model`. common.signals calls this on
+    every save and delete, bulk writes have to call it themselves.
+    """
+    try:
+        cache.incr(generation_key(model))
+    except ValueError:
+        cache.add(generation_key(model), time.time_ns(), timeout=None)
+
+
+class Namespace:
+    """
+    A group of keys in the default cache, `<name>:<generations>:<parts>`.
+
+    The generation of each of `models` is part of every key, so a change to
+    one of those models makes the whole namespace miss at once, without
+    having to know which keys were set. The stale entries simply expire.
+    """
+
+    def __init__(self, name, models=(), timeout=DEFAULT_TIMEOUT):
+        self.name = name
+        self.models = list(models)
+        self.timeout = timeout
+
+    def key(self, *parts):
+        versions = generations(*self.models) if self.models else []
+        return ":".join(str(part) for part in [self.name, *versions, *parts])
+
+    def get(self, *parts, default=None):
+        value = cache.get(self.key(*parts), MISSING)
+        if value is MISSING:
+            misses[self.name] += 1
+            return default
+        hits[self.name] += 1
+        return value
+
+    def set(self, value, *parts, timeout=None):
+        cache.set(self.key(*parts), value, timeout or self.timeout)
+
+    def get_or_set(self, *parts, default, timeout=None):
+        """Return the cached value, or compute it with `default()` and cache it."""
+        key = self.key(*parts)
+        value = cache.get(key, MISSING)
+        if value is not MISSING:
+            hits[self.name] += 1
+            return value
+        misses[self.name] += 1
+        value = default()
+        cache.set(key, value, timeout or self.timeout)
+        return value
+
+    def delete(self, *parts):
+        cache.delete(self.key(*parts))
+
+
+def cache_stats():
+    """{namespace: {"hits", "misses", "hit_rate"}} for this process."""
+    stats = {}
+    for name in sorted(hits.keys() | misses.keys()):
+        total = hits[name] + misses[name]
+        stats[name] = {
+            "hits": hits[name],
+            "misses": misses[name],
+            "hit_rate": hits[name] / total if total else 0.0,
+        }
+    return stats
+
+
+def reset_stats():
+    hits.clear()
+    misses.clear()
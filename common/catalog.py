@@ -0,0 +1,28 @@
+from common.cache import Namespace, generation
+from common.models import MetaData
+
+catalog = Namespace("metadata-catalog", models=[MetaData], timeout=60 * 60)
+
+# the catalog of the current generation, kept in the process so that
+# rendering a form does not even have to unpickle it from the cache
+_catalog = (None, [])
+
+
+def metadata_catalog():
+    """
+    Every MetaData row, in the model ordering. The rows are loaded once per
+    generation of MetaData: in the process first, then in the cache, and only
+    then from the database.
+    """
+    global _catalog
+    version = generation(MetaData)
+    if _catalog[0] == version:
+        return _catalog[1]
+
+    entries = catalog.get_or_set(default=lambda: list(MetaData.objects.all()))
+    _catalog = (version, entries)
+    return entries
+
+
+def metadata_choices():
+    return [(entry.pk, str(entry)) for entry in metadata_catalog()]
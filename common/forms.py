@@ -1,7 +1,81 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+from common.catalog import metadata_catalog, metadata_choices
 
 
 class BaseModelForm(forms.Form):
     def __init__(self, *args, instance=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.instance = instance
+
+
+class MetaDataChoiceField(forms.MultipleChoiceField):
+    """
+    Checkboxes for the MetaData rows, read from the cached catalog instead of
+    querying the table to render and again to validate the choices. Cleans to
+    a list of MetaData instances, like a ModelMultipleChoiceField.
+    """
+
+    widget = forms.CheckboxSelectMultiple
+
+    def __init__(self, **kwargs):
+        super().__init__(choices=metadata_choices, **kwargs)
+
+    def prepare_value(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return [getattr(item, "pk", item) for item in value]
+
+    def clean(self, value):
+        values = super().clean(value)
+        entries = {str(entry.pk): entry for entry in metadata_catalog()}
+        return [entries[value] for value in values]
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select for a ModelChoiceField that renders only the selected options, so
+    the page does not grow with the table. The other options are fetched from
+    the JSON endpoint `url` (a URL name) by static/js/autocomplete.js as the
+    user types.
+    """
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["widget"]["attrs"]["data-autocomplete-url"] = reverse(self.url)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        selected = [item for item in value if item]
+        options = []
+        if not self.allow_multiple_selected and field.empty_label is not None:
+            options.append(
+                self.create_option(name, "", field.empty_label, not selected, 0)
+            )
+        try:
+            objects = list(field.queryset.filter(pk__in=selected)) if selected else []
+        except (ValueError, ValidationError):
+            # a tampered value, the field reports it when the form is cleaned
+            objects = []
+        for obj in objects:
+            options.append(
+                self.create_option(
+                    name,
+                    field.prepare_value(obj),
+                    field.label_from_instance(obj),
+                    True,
+                    len(options),
+                )
+            )
+        return [(None, [option], option["index"]) for option in options]
+
+
+class AutocompleteSelectMultiple(AutocompleteSelect, forms.SelectMultiple):
+    pass
@@ -0,0 +1,320 @@
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models import query
+from django.template.base import Template
+
+from common import tracing
+
+# context variables rather than thread locals: under ASGI the queries and the
+# templates of a request run in the threads of sync_to_async, which get a
+# copy of the context of the request but not its thread locals
+_query_wrappers = ContextVar("query_wrappers", default=())
+_template_timers = ContextVar("template_timers", default=())
+_rendering = ContextVar("rendering", default=False)
+_prefetch_usages = ContextVar("prefetch_usages", default=())
+_render = Template.render
+_prefetch_related_objects = query.prefetch_related_objects
+
+# the values of a query, so that queries differing only by them compare equal
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def _wrap_query(execute, sql, params, many, context):
+    for wrapper in reversed(_query_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def _hook_connection(sender, connection, **kwargs):
+    if _wrap_query not in connection.execute_wrappers:
+        # first, so that connection.execute_wrapper() blocks still pop their own
+        connection.execute_wrappers.insert(0, _wrap_query)
+
+
+@contextmanager
+def query_wrapper(wrapper):
+    """
+    connection.execute_wrapper(wrapper) for the queries the current context
+    makes on any connection, in whichever thread it runs them.
+    """
+    install()
+    token = _query_wrappers.set((*_query_wrappers.get(), wrapper))
+    try:
+        yield wrapper
+    finally:
+        _query_wrappers.reset(token)
+
+
+class QueryTimer:
+    """
+    A connection execute wrapper counting the queries and the time spent
+    executing them. Fetching the rows of a streamed (iterator) query is not
+    included.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.ms += (perf_counter() - start) * 1000
+
+
+def normalize_sql(sql):
+    """`sql` with its literals and the length of its IN lists taken out."""
+    sql = _STRINGS.sub("%s", sql)
+    sql = _NUMBERS.sub("%s", sql)
+    sql = _LISTS.sub("(...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def _is_own(filename):
+    """Whether `filename` is a module of this project, other than this one."""
+    return (
+        filename.startswith(str(settings.BASE_DIR) + os.sep)
+        and filename != __file__
+        and "site-packages" not in filename
+    )
+
+
+def _own_frame(frame):
+    """The innermost frame of a module of this project, outside this one."""
+    while frame is not None:
+        if _is_own(frame.f_code.co_filename):
+            return frame
+        frame = frame.f_back
+    return None
+
+
+def _template_name(frame):
+    """The name of the innermost template being rendered, if any."""
+    while frame is not None:
+        template = frame.f_locals.get("self")
+        if isinstance(template, Template) and frame.f_code.co_name == "render":
+            return template.origin.name
+        frame = frame.f_back
+    return None
+
+
+def _origin(frame):
+    """(line of our code, template being rendered) that led to `frame`."""
+    own = _own_frame(frame)
+    location = None
+    if own is not None:
+        path = os.path.relpath(own.f_code.co_filename, settings.BASE_DIR)
+        location = f"{path}:{own.f_lineno} in {own.f_code.co_name}"
+    return location, _template_name(frame)
+
+
+class QueryPatterns:
+    """
+    A connection execute wrapper counting the queries by their normalized
+    SQL. Where a query was made from is looked up on its first repeat only,
+    a query made once costs just the normalization.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.locations = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        pattern = normalize_sql(sql)
+        self.counts[pattern] += 1
+        if self.counts[pattern] == 2:
+            self.locations[pattern] = _origin(sys._getframe(1))
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        """
+        (sql, count, code location, template) of the patterns run more than
+        `threshold` times, the most repeated first.
+        """
+        return [
+            (pattern, count, *self.locations[pattern])
+            for pattern, count in self.counts.most_common()
+            if count > threshold and count > 1
+        ]
+
+
+class _ReadCache(dict):
+    """
+    The `_prefetched_objects_cache` of an instance, noting the relations read
+    from it. Django reads a relation with [] when it is used, and with get()
+    or `in` while prefetching.
+    """
+
+    def __init__(self, cache, usage, model):
+        super().__init__(cache)
+        self.usage = usage
+        self.model = model
+
+    def __getitem__(self, name):
+        self.usage.read.add((self.model, name))
+        return super().__getitem__(name)
+
+    def __reduce__(self):
+        # cached or copied instances take a plain dict along
+        return dict, (dict(self),)
+
+
+class PrefetchUsage:
+    """
+    The many-valued relations prefetched in the current context (with
+    prefetch_related, but not to an attribute), by the number of instances
+    they were prefetched for, and which of them were read.
+    """
+
+    def __init__(self):
+        self.prefetched = Counter()  # (model, relation): instances
+        self.read = set()
+        self.locations = {}
+
+    def track(self, instances, frame):
+        for instance in instances:
+            cache = getattr(instance, "_prefetched_objects_cache", None)
+            if not cache or isinstance(cache, _ReadCache):
+                continue
+            model = type(instance).__name__
+            instance._prefetched_objects_cache = _ReadCache(cache, self, model)
+            for name, related in cache.items():
+                self.prefetched[model, name] += 1
+                if (model, name) not in self.locations:
+                    self.locations[model, name] = _origin(frame)
+                # the lookups spanning this relation, e.g. "courses__metadata"
+                self.track(getattr(related, "_result_cache", None) or (), frame)
+
+    def unused(self):
+        """
+        (relation, instances, code location, template) of the relations
+        prefetched but never read.
+        """
+        return [
+            (f"{model}.{name}", count, *self.locations[model, name])
+            for (model, name), count in self.prefetched.most_common()
+            if (model, name) not in self.read
+        ]
+
+
+def _track_prefetch(model_instances, *related_lookups):
+    _prefetch_related_objects(model_instances, *related_lookups)
+    for usage in _prefetch_usages.get():
+        usage.track(model_instances, sys._getframe(1))
+
+
+@contextmanager
+def prefetch_usage():
+    """The relations prefetched in the current context while the block runs."""
+    install()
+    usage = PrefetchUsage()
+    token = _prefetch_usages.set((*_prefetch_usages.get(), usage))
+    try:
+        yield usage
+    finally:
+        _prefetch_usages.reset(token)
+
+
+def allocation_sites(snapshot, limit):
+    """
+    (location, bytes, blocks) of the `limit` lines of our code holding the
+    most memory in the tracemalloc `snapshot`. An allocation made in Django
+    or a library counts for the innermost line of ours that led to it.
+    """
+    sites = Counter()
+    blocks = Counter()
+    for stat in snapshot.statistics("traceback"):
+        frames = stat.traceback
+        frame = next((f for f in reversed(frames) if _is_own(f.filename)), frames[-1])
+        filename = frame.filename
+        if filename.startswith(str(settings.BASE_DIR)):
+            filename = os.path.relpath(filename, settings.BASE_DIR)
+        location = f"{filename.split('site-packages' + os.sep)[-1]}:{frame.lineno}"
+        sites[location] += stat.size
+        blocks[location] += stat.count
+    return [
+        (location, size, blocks[location])
+        for location, size in sites.most_common(limit)
+    ]
+
+
+class TemplateTimer:
+    def __init__(self, on_render=None):
+        self.ms = 0.0
+        self.on_render = on_render
+
+
+def _timed_render(self, context):
+    if tracing.active():
+        name = self.origin.template_name or self.origin.name
+        # a span per widget would bury the page in spans, the template of
+        # the form they are rendered in has one
+        if not str(name).startswith("django/forms/widgets/"):
+            with tracing.span(f"render {name}", template=name):
+                return _time_render(self, context)
+    return _time_render(self, context)
+
+
+def _time_render(self, context):
+    timers = _template_timers.get()
+    if not timers or _rendering.get():
+        return _render(self, context)
+    # only the outermost render is timed, the included and extended
+    # templates are rendered within it
+    token = _rendering.set(True)
+    start = perf_counter()
+    try:
+        return _render(self, context)
+    finally:
+        elapsed = (perf_counter() - start) * 1000
+        _rendering.reset(token)
+        for timer in timers:
+            timer.ms += elapsed
+            if timer.on_render is not None:
+                # the context of the template is still alive here
+                timer.on_render()
+
+
+def install():
+    """
+    Hook the template timers, the template spans of common.tracing, the
+    prefetches of `prefetch_usage` and the query wrappers of `query_wrapper`
+    on every database connection.
+    """
+    Template.render = _timed_render
+    query.prefetch_related_objects = _track_prefetch
+    connection_created.connect(_hook_connection, dispatch_uid=__name__)
+    for connection in connections.all(initialized_only=True):
+        _hook_connection(None, connection)
+
+
+@contextmanager
+def template_timer(on_render=None):
+    """
+    Time spent rendering templates in the current context while the block
+    runs, including the queries made while rendering. `on_render` is called
+    at the end of every outermost render.
+    """
+    install()
+    timer = TemplateTimer(on_render)
+    token = _template_timers.set((*_template_timers.get(), timer))
+    try:
+        yield timer
+    finally:
+        _template_timers.reset(token)
@@ -0,0 +1,146 @@
+import http.client
+import statistics
+import threading
+from importlib import import_module
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
+    SESSION_KEY,
+    get_user_model,
+)
+from django.core.management.base import BaseCommand, CommandError
+
+
+def cpu_times():
+    """(busy, total) jiffies of the host from /proc/stat, None elsewhere."""
+    try:
+        with open("/proc/stat") as f:
+            values = [int(value) for value in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle = values[3] + (values[4] if len(values) > 4 else 0)  # idle + iowait
+    return sum(values) - idle, sum(values)
+
+
+def connect(base_url):
+    parts = urlsplit(base_url)
+    if parts.scheme == "https":
+        return http.client.HTTPSConnection(parts.netloc, timeout=30)
+    return http.client.HTTPConnection(parts.netloc, timeout=30)
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent GET requests to running servers, e.g. the WSGI (prod) "
+        "and ASGI (asgi) compose services, and compare the requests per second "
+        "and latency each one sustains, with the CPU use of this host."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "urls",
+            nargs="+",
+            help="Base URLs of the servers, e.g. http://localhost:8000",
+        )
+        parser.add_argument("--path", default="/students/enrollments/")
+        parser.add_argument(
+            "--concurrency",
+            default="1,8,32",
+            help="Comma separated numbers of concurrent clients.",
+        )
+        parser.add_argument("--duration", type=float, default=10.0)
+        parser.add_argument(
+            "--email", help="User the requests are made as, the first admin by default."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options["concurrency"].split(",")]
+        except ValueError:
+            raise CommandError("--concurrency must be a list of numbers.")
+        cookie = f"{settings.SESSION_COOKIE_NAME}={self.login(options['email'])}"
+
+        self.stdout.write(
+            f"{'server':<28} {'clients':>7} {'req/s':>8} {'p50':>8} {'p95':>8} "
+            f"{'errors':>6} {'cpu %':>6}  (ms)"
+        )
+        for url in options["urls"]:
+            for level in levels:
+                before = cpu_times()
+                timings, errors, elapsed = self.run(
+                    url, options["path"], cookie, level, options["duration"]
+                )
+                after = cpu_times()
+                cpu = "-"
+                if before and after and after[1] > before[1]:
+                    busy = (after[0] - before[0]) / (after[1] - before[1])
+                    cpu = f"{busy * 100:.0f}"
+                p50 = statistics.median(timings) if timings else 0
+                p95 = (
+                    statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else p50
+                )
+                self.stdout.write(
+                    f"{url:<28} {level:>7} {len(timings) / elapsed:8.1f} "
+                    f"{p50:8.2f} {p95:8.2f} {errors:>6} {cpu:>6}"
+                )
+
+    def login(self, email):
+        """
+        Create a session for the user directly in the session store, which
+        the servers have to share with this command, and return its key.
+        """
+        users = get_user_model().objects.all()
+        user = (
+            users.filter(email=email).first()
+            if email
+            else users.filter(is_superuser=True).order_by("pk").first()
+        )
+        if user is None:
+            raise CommandError("No user to make the requests as.")
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
+
+    def run(self, url, path, cookie, clients, duration):
+        timings = []
+        errors = []
+        lock = threading.Lock()
+        deadline = perf_counter() + duration
+
+        def client():
+            connection = connect(url)
+            own_timings, own_errors = [], 0
+            while perf_counter() < deadline:
+                start = perf_counter()
+                try:
+                    connection.request("GET", path, headers={"Cookie": cookie})
+                    response = connection.getresponse()
+                    response.read()
+                except (OSError, http.client.HTTPException):
+                    own_errors += 1
+                    connection.close()
+                    connection = connect(url)
+                    continue
+                if response.status != 200:
+                    own_errors += 1
+                else:
+                    own_timings.append((perf_counter() - start) * 1000)
+            connection.close()
+            with lock:
+                timings.extend(own_timings)
+                errors.append(own_errors)
+
+        started = perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, sum(errors), perf_counter() - started
@@ -0,0 +1,66 @@
+import statistics
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+# how the connection is handled between two "requests"
+MODES = {
+    "per-request": {"CONN_MAX_AGE": 0},
+    "persistent": {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": True},
+    "pooled": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": True, "pool": True},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the latency of a one-query request with a new connection per "
+        "request, a persistent connection and a psycopg connection pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--query", default="SELECT 1")
+
+    def handle(self, *args, **options):
+        default = connections.settings["default"]
+        if not default["ENGINE"].endswith("postgresql"):
+            raise CommandError("The benchmark needs the PostgreSQL database.")
+
+        self.stdout.write(f"{'mode':<12} {'mean':>8} {'median':>8} {'p95':>8}  (ms)")
+        for mode, overrides in MODES.items():
+            timings = self.measure(mode, overrides, options)
+            self.stdout.write(
+                f"{mode:<12} {statistics.fmean(timings):8.2f} "
+                f"{statistics.median(timings):8.2f} "
+                f"{statistics.quantiles(timings, n=20)[-1]:8.2f}"
+            )
+
+    def measure(self, mode, overrides, options):
+        alias = f"benchmark-{mode}"
+        settings = {**connections.settings["default"], "OPTIONS": {}}
+        if overrides.get("pool"):
+            settings["OPTIONS"]["pool"] = {"min_size": 1, "max_size": 1}
+        settings["CONN_MAX_AGE"] = overrides["CONN_MAX_AGE"]
+        settings["CONN_HEALTH_CHECKS"] = overrides.get("CONN_HEALTH_CHECKS", False)
+        connections.settings[alias] = settings
+        connection = connections[alias]
+
+        timings = []
+        try:
+            for _ in range(options["requests"]):
+                start = perf_counter()
+                # what a request does: (re)use the connection, run its query,
+                # then let request_finished decide whether to keep it
+                connection.close_if_unusable_or_obsolete()
+                with connection.cursor() as cursor:
+                    cursor.execute(options["query"])
+                    cursor.fetchall()
+                connection.close_if_unusable_or_obsolete()
+                timings.append((perf_counter() - start) * 1000)
+        finally:
+            connection.close()
+            if overrides.get("pool"):
+                connection.close_pool()
+            del connections[alias]
+        return timings
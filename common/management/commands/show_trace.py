@@ -0,0 +1,90 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def read_traces(path):
+    """{trace id: [span]} of an OTLP/JSON file, in the order of the file."""
+    traces = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    for span in scope["spans"]:
+                        traces.setdefault(span["traceId"], []).append(span)
+    return traces
+
+
+def duration_ms(span):
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+def attribute(span, key):
+    for item in span.get("attributes", []):
+        if item["key"] == key:
+            return next(iter(item["value"].values()))
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the traces TracingMiddleware wrote to TRACE_FILE as trees of "
+        "spans with their durations, the latest first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("trace", nargs="?", help="trace id, or its beginning")
+        parser.add_argument("--file", help="OTLP/JSON file, TRACE_FILE by default")
+        parser.add_argument("--last", type=int, default=1)
+        parser.add_argument("--view", help="only the requests of this url name")
+        parser.add_argument(
+            "--min-ms",
+            type=float,
+            default=0,
+            help="hide the spans shorter than this",
+        )
+
+    def handle(self, *args, **options):
+        path = options["file"] or settings.TRACE_FILE
+        if not path:
+            raise CommandError("Set TRACE_FILE or pass --file.")
+        try:
+            traces = read_traces(path)
+        except FileNotFoundError:
+            raise CommandError(f"No traces at {path}.")
+
+        selected = []
+        for trace_id, spans in reversed(traces.items()):
+            root = next(span for span in spans if "parentSpanId" not in span)
+            if options["trace"] and not trace_id.startswith(options["trace"]):
+                continue
+            if options["view"] and root["name"].split(" ", 1)[-1] != options["view"]:
+                continue
+            selected.append((trace_id, root, spans))
+        if not selected:
+            raise CommandError("No matching trace.")
+        for trace_id, root, spans in selected[: options["last"]]:
+            children = {}
+            for span in spans:
+                children.setdefault(span.get("parentSpanId"), []).append(span)
+            self.stdout.write(f"trace {trace_id}")
+            self.print_span(root, children, 0, options["min_ms"])
+
+    def print_span(self, span, children, depth, min_ms):
+        ms = duration_ms(span)
+        line = f"{'  ' * depth}{span['name']}  {ms:.2f} ms"
+        statement = attribute(span, "db.statement")
+        if statement:
+            line += f"  {statement[:120]}"
+        if "status" in span:
+            line += f"  ! {span['status'].get('message', 'error')}"
+        self.stdout.write(line)
+        for child in sorted(
+            children.get(span["spanId"], []),
+            key=lambda child: int(child["startTimeUnixNano"]),
+        ):
+            if duration_ms(child) >= min_ms:
+                self.print_span(child, children, depth + 1, min_ms)
@@ -0,0 +1,257 @@
+"""
+Request metrics in the Prometheus text format.
+
+Each process keeps its metrics in memory and, when METRICS_DIR is set, writes
+them to `<METRICS_DIR>/<pid>.json` at most every FLUSH_INTERVAL seconds. The
+/metrics view adds up the files of all the processes, so a scrape sees the
+totals of every gunicorn worker whichever one answers. The gunicorn master
+folds the file of an exited worker into `archive.json` (see gunicorn.conf.py),
+which keeps the counters from going down when workers are recycled. Servers
+without such hooks, like uvicorn, leave the file behind; the next scrape
+archives the files of the processes that no longer run.
+"""
+
+import fcntl
+import json
+import os
+import threading
+from time import monotonic
+
+from common import cache
+
+PREFIX = "eduapp"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+MEMORY_BUCKETS = tuple(2**power for power in range(16, 30, 2))  # 64 KiB - 256 MiB
+FLUSH_INTERVAL = 1.0
+ARCHIVE = "archive.json"
+
+HISTOGRAMS = {
+    "http_request_duration_seconds": (
+        "Time to produce the response, by url name.",
+        DURATION_BUCKETS,
+    ),
+    "http_request_db_queries": ("Database queries per request.", QUERY_BUCKETS),
+    "http_request_memory_peak_bytes": (
+        "Peak of the memory allocated during a sampled request.",
+        MEMORY_BUCKETS,
+    ),
+    "http_request_memory_net_bytes": (
+        "Memory allocated by a sampled request and still held at its end.",
+        MEMORY_BUCKETS,
+    ),
+}
+COUNTERS = {
+    "http_request_db_seconds_total": "Time spent executing database queries.",
+    "http_request_template_seconds_total": "Time spent rendering templates.",
+    "http_response_size_bytes_total": "Size of the response bodies (not streamed).",
+    "cache_hits_total": "Hits of the cache namespaces of common.cache.",
+    "cache_misses_total": "Misses of the cache namespaces of common.cache.",
+}
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.flushed_at = 0.0
+        self.pending = False
+        self.counters = {}  # (name, labels): value
+        self.histograms = {}  # (name, labels): [bucket counts..., sum, count]
+
+    def reset_after_fork(self):
+        # a worker forked from a master that already counted must not report
+        # the master's numbers as its own
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.pending = False
+            self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            row = self.histograms.get(key)
+            if row is None:
+                row = self.histograms[key] = [0] * (len(buckets) + 2)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    row[index] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            counters = [[n, list(l), v] for (n, l), v in self.counters.items()]
+            histograms = [
+                [n, list(l), list(r)] for (n, l), r in self.histograms.items()
+            ]
+        for kind, counts in (("hits", cache.hits), ("misses", cache.misses)):
+            for namespace, value in counts.items():
+                counters.append(
+                    [f"cache_{kind}_total", [["namespace", namespace]], value]
+                )
+        return {"counters": counters, "histograms": histograms}
+
+    def flush(self, directory, force=False):
+        """Write this process' snapshot, at most every FLUSH_INTERVAL seconds."""
+        now = monotonic()
+        if not force and now - self.flushed_at < FLUSH_INTERVAL:
+            # write it once the interval is over, in case no other request
+            # comes to this process
+            with self.lock:
+                if self.pending:
+                    return
+                self.pending = True
+            timer = threading.Timer(FLUSH_INTERVAL, self.flush, (directory, True))
+            timer.daemon = True
+            timer.start()
+            return
+        self.flushed_at = now
+        self.pending = False
+        os.makedirs(directory, exist_ok=True)
+        write(os.path.join(directory, f"{os.getpid()}.json"), self.snapshot())
+
+
+registry = Registry()
+
+
+def write(path, snapshot):
+    temporary = f"{path}.{threading.get_ident()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(snapshot, f)
+    os.replace(temporary, path)
+
+
+def read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # the worker exited and its file was archived in the meantime
+        return {"counters": [], "histograms": []}
+
+
+def merge(snapshots):
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, row in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], row)]
+            else:
+                histograms[key] = list(row)
+    return {
+        "counters": [[n, list(l), v] for (n, l), v in counters.items()],
+        "histograms": [[n, list(l), r] for (n, l), r in histograms.items()],
+    }
+
+
+def collect(directory=None):
+    """The metrics of every process writing to `directory`, or of this one."""
+    if not directory:
+        return registry.snapshot()
+    registry.flush(directory, force=True)
+    for name in os.listdir(directory):
+        pid = name.removesuffix(".json")
+        if pid.isdigit() and not running(int(pid)):
+            archive_process(directory, pid)
+    paths = [
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(".json")
+    ]
+    return merge(read(path) for path in sorted(paths))
+
+
+def running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def archive_process(directory, pid):
+    """Fold the metrics of the exited process `pid` into the archive."""
+    path = os.path.join(directory, f"{pid}.json")
+    # the master and the scrapes of the workers may archive at the same time
+    with open(os.path.join(directory, "archive.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(path):
+            return
+        archive = os.path.join(directory, ARCHIVE)
+        write(archive, merge([read(archive), read(path)]))
+        os.remove(path)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_text(snapshot):
+    """The Prometheus text exposition format (version 0.0.4) of `snapshot`."""
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        rows = sorted(
+            (tuple(map(tuple, labels)), row)
+            for n, labels, row in snapshot["histograms"]
+            if n == name
+        )
+        lines += [
+            f"# HELP {PREFIX}_{name} {help_text}",
+            f"# TYPE {PREFIX}_{name} histogram",
+        ]
+        for labels, row in rows:
+            cumulative = 0
+            for bound, count in zip(buckets, row):
+                cumulative += count
+                le = format_labels([*labels, ["le", format_value(bound)]])
+                lines.append(f"{PREFIX}_{name}_bucket{le} {cumulative}")
+            le = format_labels([*labels, ["le", "+Inf"]])
+            lines.append(f"{PREFIX}_{name}_bucket{le} {row[-1]}")
+            lines.append(
+                f"{PREFIX}_{name}_sum{format_labels(labels)} {format_value(row[-2])}"
+            )
+            lines.append(f"{PREFIX}_{name}_count{format_labels(labels)} {row[-1]}")
+    for name, help_text in COUNTERS.items():
+        rows = sorted(
+            (tuple(map(tuple, labels)), value)
+            for n, labels, value in snapshot["counters"]
+            if n == name
+        )
+        lines += [
+            f"# HELP {PREFIX}_{name} {help_text}",
+            f"# TYPE {PREFIX}_{name} counter",
+        ]
+        for labels, value in rows:
+            lines.append(
+                f"{PREFIX}_{name}{format_labels(labels)} {format_value(value)}"
+            )
+    return "\n".join(lines) + "\n"
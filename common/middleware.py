@@ -0,0 +1,382 @@
+import logging
+import random
+import threading
+import tracemalloc
+from datetime import datetime, timezone
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from common import instrumentation, profiling, tracing
+from common.instrumentation import (
+    QueryPatterns,
+    QueryTimer,
+    allocation_sites,
+    prefetch_usage,
+    query_wrapper,
+    template_timer,
+)
+from common.metrics import registry
+from users.permissions import is_admin
+
+logger = logging.getLogger(__name__)
+MB = 1024 * 1024
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, database queries and time, template time and
+    response size of every request by url name in common.metrics, and sends
+    the split in a Server-Timing header for the browser's network panel.
+    Keep it first in MIDDLEWARE so that the total covers the other ones.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        registry.reset_after_fork()
+        start = perf_counter()
+        with query_wrapper(QueryTimer()) as queries, template_timer() as templates:
+            response = self.get_response(request)
+        return self.record(
+            request, response, perf_counter() - start, queries, templates
+        )
+
+    async def __acall__(self, request):
+        registry.reset_after_fork()
+        start = perf_counter()
+        with query_wrapper(QueryTimer()) as queries, template_timer() as templates:
+            response = await self.get_response(request)
+        return self.record(
+            request, response, perf_counter() - start, queries, templates
+        )
+
+    def record(self, request, response, total, queries, templates):
+        match = request.resolver_match
+        # unresolved paths (404s) share one label, or every scanner probe
+        # would add a series
+        view = match.view_name if match else "<unresolved>"
+        labels = {"view": view}
+        registry.observe(
+            "http_request_duration_seconds",
+            {**labels, "method": request.method, "status": response.status_code},
+            total,
+        )
+        registry.observe("http_request_db_queries", labels, queries.count)
+        registry.inc("http_request_db_seconds_total", labels, queries.ms / 1000)
+        registry.inc("http_request_template_seconds_total", labels, templates.ms / 1000)
+        if not response.streaming:
+            registry.inc(
+                "http_response_size_bytes_total", labels, len(response.content)
+            )
+        if settings.METRICS_DIR:
+            registry.flush(settings.METRICS_DIR)
+
+        response["Server-Timing"] = (
+            f'db;dur={queries.ms:.1f};desc="{queries.count} queries", '
+            f"tpl;dur={templates.ms:.1f}, total;dur={total * 1000:.1f}"
+        )
+        return response
+
+
+class NPlusOneMiddleware:
+    """
+    Logs the queries a sampled request runs more than NPLUSONE_THRESHOLD
+    times with only their values changing, which is what a missing
+    select_related or prefetch_related looks like, and the relations it
+    prefetches but never reads, with the line of our code and the template
+    that made them. Not loaded unless NPLUSONE_SAMPLE_RATE is above 0; the
+    requests left out of the sample are not slowed down.
+    """
+
+    def __init__(self, get_response):
+        if settings.NPLUSONE_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.NPLUSONE_SAMPLE_RATE:
+            return self.get_response(request)
+        with query_wrapper(QueryPatterns()) as patterns, prefetch_usage() as usage:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else request.path
+        for sql, count, location, template in patterns.repeated(
+            settings.NPLUSONE_THRESHOLD
+        ):
+            logger.warning(
+                "N+1 in %s: %d x %s, from %s%s",
+                view,
+                count,
+                sql,
+                location or "unknown code",
+                f" rendering {template}" if template else "",
+            )
+        for relation, count, location, template in usage.unused():
+            logger.warning(
+                "Unused prefetch in %s: %s of %d objects is never read, from %s%s",
+                view,
+                relation,
+                count,
+                location or "unknown code",
+                f" rendering {template}" if template else "",
+            )
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    Profiles the view, template rendering and queries of a sampled share
+    (PROFILE_SAMPLE_RATE) of the requests, and of the requests of admins
+    sending an `X-Profile` header or a `profile` parameter. The profiles are
+    listed at common:profiles, and the response of a requested one names it
+    in an `X-Profile` header. Keep it after AuthenticationMiddleware.
+
+    Under ASGI a profile also holds what the other requests of the process
+    ran meanwhile, as it does with gunicorn threads since Python 3.12.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        requested = "X-Profile" in request.headers or "profile" in request.GET
+        if not (
+            random.random() < settings.PROFILE_SAMPLE_RATE
+            or (requested and is_admin(request.user))
+        ):
+            return self.get_response(request)
+
+        started_at = datetime.now(timezone.utc)
+        start = perf_counter()
+        with profiling.profile() as profiler:
+            if profiler is None:
+                return self.get_response(request)
+            with query_wrapper(QueryTimer()) as queries:
+                response = self.get_response(request)
+        elapsed = (perf_counter() - start) * 1000
+        self.save(profiler, request, response, requested, started_at, elapsed, queries)
+        return response
+
+    async def __acall__(self, request):
+        requested = "X-Profile" in request.headers or "profile" in request.GET
+        if not (
+            random.random() < settings.PROFILE_SAMPLE_RATE
+            or (requested and is_admin(await request.auser()))
+        ):
+            return await self.get_response(request)
+
+        started_at = datetime.now(timezone.utc)
+        start = perf_counter()
+        with profiling.profile() as profiler:
+            if profiler is None:
+                return await self.get_response(request)
+            with query_wrapper(QueryTimer()) as queries:
+                response = await self.get_response(request)
+        elapsed = (perf_counter() - start) * 1000
+        await sync_to_async(self.save, thread_sensitive=False)(
+            profiler, request, response, requested, started_at, elapsed, queries
+        )
+        return response
+
+    def save(self, profiler, request, response, requested, started_at, ms, queries):
+        match = request.resolver_match
+        name = profiling.save(
+            profiler,
+            {
+                "started_at": started_at.isoformat(),
+                "method": request.method,
+                "path": request.get_full_path(),
+                "view": match.view_name if match else "<unresolved>",
+                "status": response.status_code,
+                "ms": round(ms, 2),
+                "queries": queries.count,
+                "query_ms": round(queries.ms, 2),
+                "requested": requested,
+            },
+        )
+        if requested:
+            response["X-Profile"] = name
+
+
+class TracingMiddleware:
+    """
+    Traces a sampled share (TRACE_SAMPLE_RATE) of the requests to TRACE_FILE,
+    see common.tracing. Not loaded unless TRACE_FILE is set. Keep it last in
+    MIDDLEWARE, so that the view span ends with the view; the middleware
+    above it is not part of the trace.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.TRACE_FILE:
+            raise MiddlewareNotUsed
+        instrumentation.install()
+        tracing.install()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= settings.TRACE_SAMPLE_RATE:
+            return self.get_response(request)
+        trace = tracing.start()
+        try:
+            with self.root_span(request) as root, query_wrapper(tracing.QuerySpans()):
+                response = self.get_response(request)
+                self.finish(request, response, root)
+        finally:
+            tracing.stop()
+        tracing.export(trace, settings.TRACE_FILE)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= settings.TRACE_SAMPLE_RATE:
+            return await self.get_response(request)
+        trace = tracing.start()
+        try:
+            with self.root_span(request) as root, query_wrapper(tracing.QuerySpans()):
+                response = await self.get_response(request)
+                self.finish(request, response, root)
+        finally:
+            tracing.stop()
+        tracing.export(trace, settings.TRACE_FILE)
+        return response
+
+    def root_span(self, request):
+        return tracing.span(
+            f"{request.method} {request.path}",
+            tracing.SERVER,
+            **{"http.request.method": request.method, "url.path": request.path},
+        )
+
+    def finish(self, request, response, root):
+        view_span = getattr(request, "_view_span", None)
+        if view_span is not None:
+            view_span.__exit__(None, None, None)
+        match = request.resolver_match
+        if match:
+            root.rename(f"{request.method} {match.view_name}")
+            root.set(**{"http.route": match.route})
+        root.set(**{"http.response.status_code": response.status_code})
+        if response.status_code >= 500:
+            root.fail(f"HTTP {response.status_code}")
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if tracing.active():
+            name = f"{view_func.__module__}.{view_func.__qualname__}"
+            request._view_span = tracing.span(f"view {name}", view=name)
+            request._view_span.__enter__()
+
+    def process_exception(self, request, exception):
+        view_span = getattr(request, "_view_span", None)
+        if view_span is not None:
+            view_span.fail(f"{type(exception).__name__}: {exception}")
+
+
+class MemoryMiddleware:
+    """
+    Measures with tracemalloc the peak and the net memory allocated by a
+    sampled share (MEMORY_SAMPLE_RATE) of the requests, per url name in
+    common.metrics. A request whose peak goes over MEMORY_BUDGET_MB is
+    logged with the lines of our code that held the most memory at its
+    heaviest point, the end of the page render or of the request.
+    Not loaded unless MEMORY_SAMPLE_RATE is above 0.
+
+    Tracing allocations slows the process down, so tracemalloc only runs
+    during a measured request, and one at a time per process; what other
+    threads allocate meanwhile is counted too.
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self, get_response):
+        if settings.MEMORY_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.MEMORY_SAMPLE_RATE:
+            return self.get_response(request)
+        if not self.lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.measure(request)
+        finally:
+            self.lock.release()
+
+    def measure(self, request):
+        budget = settings.MEMORY_BUDGET_MB * MB
+        # PYTHONTRACEMALLOC may have it running already, count from here then
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start(settings.MEMORY_FRAMES)
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        heaviest = {"size": before + budget, "snapshot": None}
+
+        def checkpoint():
+            size = tracemalloc.get_traced_memory()[0]
+            if size > heaviest["size"]:
+                heaviest.update(size=size, snapshot=tracemalloc.take_snapshot())
+
+        try:
+            with template_timer(on_render=checkpoint):
+                response = self.get_response(request)
+            checkpoint()
+            net, peak = tracemalloc.get_traced_memory()
+            if peak > before + budget and heaviest["snapshot"] is None:
+                # it peaked between two checkpoints, what is left is all we have
+                heaviest["snapshot"] = tracemalloc.take_snapshot()
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+        net -= before
+        peak -= before
+
+        match = request.resolver_match
+        labels = {"view": match.view_name if match else "<unresolved>"}
+        registry.observe("http_request_memory_peak_bytes", labels, peak)
+        registry.observe("http_request_memory_net_bytes", labels, net)
+        if peak > budget:
+            sites = ""
+            if heaviest["snapshot"] is not None:
+                sites = "".join(
+                    f"\n  {location}: {size / MB:.1f} MB in {blocks} blocks"
+                    for location, size, blocks in allocation_sites(
+                        heaviest["snapshot"], settings.MEMORY_TOP
+                    )
+                )
+            logger.warning(
+                "%s %s (%s) peaked at %.1f MB, over the %s MB budget, "
+                "%.1f MB still held at the end%s",
+                request.method,
+                request.get_full_path(),
+                labels["view"],
+                peak / MB,
+                settings.MEMORY_BUDGET_MB,
+                net / MB,
+                sites,
+            )
+        return response
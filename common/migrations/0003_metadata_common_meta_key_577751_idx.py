@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("common", "0002_alter_metadata_options_alter_metadata_key_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="metadata",
+            index=models.Index(fields=["key", "id"], name="common_meta_key_577751_idx"),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+from common.search import TrigramIndex
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("common", "0003_metadata_common_meta_key_577751_idx"),
+        ("users", "0002_trigram_indexes"),
+    ]
+
+    operations = [
+        TrigramIndex("common.MetaData", "key"),
+        TrigramIndex("common.MetaData", "value"),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -25,6 +25,12 @@ class BaseModel(models.Model):
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        # post_save receivers keep denormalized counters in step with the row,
+        # so they have to run in the same transaction as the write itself
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+
 
 class MetaData(models.Model):
     key = models.CharField(max_length=100)
@@ -45,4 +51,5 @@ class MetaData(models.Model):
 
         indexes = [
             models.Index(fields=["key", "value"]),
+            models.Index(fields=["key", "id"]),
         ]
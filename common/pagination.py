@@ -0,0 +1,177 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def get_page_size(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+class CursorPage:
+    def __init__(self, object_list, per_page, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def last_cursor(self):
+        return CursorPaginator.LAST_PAGE
+
+
+class CursorPaginator:
+    """
+    Keyset paginator: instead of COUNT(*) + OFFSET, each page is fetched with a
+    WHERE clause on the ordering columns of the last row seen, so every page
+    costs the same no matter how deep it is.
+
+    The ordering defaults to the queryset/model ordering, with the primary key
+    appended as a tie breaker so that the position of a row is always unique.
+    """
+
+    LAST_PAGE = "last"
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.per_page = per_page
+        ordering = ordering or queryset.query.order_by or self.model._meta.ordering
+        self.ordering = self._with_tiebreaker(list(ordering))
+
+    def _with_tiebreaker(self, ordering):
+        pk_name = self.model._meta.pk.name
+        if not any(field.lstrip("-") in ("pk", pk_name) for field in ordering):
+            descending = bool(ordering) and ordering[0].startswith("-")
+            ordering.append(f"-{pk_name}" if descending else pk_name)
+        return ordering
+
+    def _get_field(self, name):
+        if name == "pk":
+            return self.model._meta.pk
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # annotations such as a search rank have no model field
+            return None
+
+    def _position(self, obj):
+        values = []
+        for name in self.ordering:
+            value = getattr(obj, name.lstrip("-"))
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            elif not isinstance(value, (str, int, float, type(None))):
+                value = str(value)
+            values.append(value)
+        return values
+
+    def encode_cursor(self, obj, reverse=False):
+        payload = json.dumps({"p": self._position(obj), "r": reverse})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        if cursor == self.LAST_PAGE:
+            return None, True
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values, reverse = payload["p"], bool(payload["r"])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise InvalidCursor("Invalid cursor.")
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor("Cursor does not match the ordering.")
+
+        position = []
+        for name, value in zip(self.ordering, values):
+            field = self._get_field(name.lstrip("-"))
+            try:
+                position.append(field.to_python(value) if field else value)
+            except Exception:
+                raise InvalidCursor("Invalid cursor.")
+        return position, reverse
+
+    def _keyset_filter(self, position, reverse):
+        """
+        (a, b) after (x, y) is expanded to `a > x OR (a = x AND b > y)` with the
+        comparison flipped per column for descending fields.
+        """
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            field = name.lstrip("-")
+            descending = name.startswith("-") != reverse
+            lookup = "lt" if descending else "gt"
+            clause = Q(**{f"{field}__{lookup}": position[index]})
+            for previous, value in zip(self.ordering[:index], position[:index]):
+                clause &= Q(**{previous.lstrip("-"): value})
+            condition |= clause
+        return condition
+
+    def page(self, cursor=None):
+        position, reverse = self.decode_cursor(cursor) if cursor else (None, False)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [f[1:] if f.startswith("-") else f"-{f}" for f in ordering]
+        queryset = self.queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._keyset_filter(position, reverse))
+
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1])
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return CursorPage(rows, self.per_page, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        """
+        Return a valid page, even if the cursor is stale or has been tampered with.
+        """
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+def paginate(request, queryset, default_limit=DEFAULT_PAGE_SIZE):
+    per_page = get_page_size(request.GET.get("limit"), default_limit)
+    paginator = CursorPaginator(queryset, per_page)
+    return paginator.get_page(request.GET.get("cursor"))
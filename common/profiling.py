@@ -0,0 +1,119 @@
+"""
+cProfile profiles of single requests, saved in PROFILE_DIR as `<name>.prof`
+(pstats, opens in snakeviz) next to `<name>.json` describing the request.
+Only the newest PROFILE_KEEP are kept.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+NAME = re.compile(r"^\d+-\d+$")
+SORTS = ["cumulative", "tottime", "calls"]
+
+# a process can run one profiler at a time (since Python 3.12 it also sees
+# the calls of the other threads), requests arriving meanwhile are not profiled
+_lock = threading.Lock()
+
+
+@contextmanager
+def profile():
+    """A profiler enabled for the block, or None if one is already running."""
+    if not _lock.acquire(blocking=False):
+        yield None
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+    finally:
+        _lock.release()
+
+
+def save(profiler, info):
+    """Save the profile and `info` about the request, and return its name."""
+    directory = settings.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.time_ns()}-{os.getpid()}"
+    profiler.dump_stats(path(name))
+    with open(path(name, ".json"), "w") as f:
+        json.dump({**info, "name": name}, f)
+    prune(directory, settings.PROFILE_KEEP)
+    return name
+
+
+def names(directory):
+    """Names of the saved profiles, the oldest first."""
+    try:
+        files = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        (file[:-5] for file in files if file.endswith(".json")),
+        key=lambda name: int(name.split("-")[0]),
+    )
+
+
+def prune(directory, keep):
+    for name in names(directory)[:-keep]:
+        for suffix in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def recent(view=None):
+    """The saved requests, the slowest first, optionally of one url name."""
+    requests = []
+    for name in names(settings.PROFILE_DIR):
+        try:
+            info = load(name)
+        except (OSError, ValueError):
+            # pruned by another worker in the meantime
+            continue
+        if view is None or info["view"] == view:
+            requests.append(info)
+    return sorted(requests, key=lambda info: info["ms"], reverse=True)
+
+
+def path(name, suffix=".prof"):
+    if not NAME.match(name):
+        raise FileNotFoundError(name)
+    return os.path.join(settings.PROFILE_DIR, name + suffix)
+
+
+def load(name):
+    """What was saved about the request of the profile `name`."""
+    with open(path(name, ".json")) as f:
+        return json.load(f)
+
+
+def report(name, sort="cumulative", restriction=None, limit=60):
+    """
+    The pstats table of the profile `name`, sorted by `sort` and limited to
+    the functions whose file and name match the regular expression
+    `restriction`, e.g. "students/".
+    """
+    try:
+        re.compile(restriction or "")
+    except re.error:
+        restriction = re.escape(restriction)
+    stream = io.StringIO()
+    stats = pstats.Stats(path(name), stream=stream)
+    stats.sort_stats(sort if sort in SORTS else "cumulative")
+    stats.print_stats(*([restriction] if restriction else []), limit)
+    # paths relative to the project, or to site-packages for the libraries
+    text = stream.getvalue().replace(f"{settings.BASE_DIR}{os.sep}", "")
+    return re.sub(r"\S*site-packages" + re.escape(os.sep), "", text)
@@ -0,0 +1,68 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections, migrations
+from django.db.models import FloatField, Q
+from django.db.models.functions import Cast, Greatest
+
+
+def search(queryset, query, fields):
+    """
+    Filter `queryset` down to rows where any of `fields` contains `query`.
+
+    On PostgreSQL the `icontains` lookups are served by the pg_trgm GIN indexes
+    created with `TrigramIndex`, and the rows are ranked by trigram word
+    similarity so the closest matches come first. Other databases (SQLite in
+    tests) get the same filter in the model's default ordering.
+    """
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f"{field}__icontains": query})
+    queryset = queryset.filter(condition)
+
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset
+
+    similarities = [TrigramWordSimilarity(query, field) for field in fields]
+    rank = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+    # word_similarity() is a float4, which psycopg reads back rounded; the
+    # cursor of the next page must hold the exact value compared in SQL
+    rank = Cast(rank, FloatField())
+    return queryset.annotate(rank=rank).order_by("-rank", "-pk")
+
+
+class TrigramIndex(migrations.RunPython):
+    """
+    Create a pg_trgm GIN index over `UPPER(column::text)`, which is exactly the
+    expression Django emits for `icontains`/`istartswith` on PostgreSQL, so
+    those lookups stop being sequential scans.
+
+    The index is built CONCURRENTLY, so the migration using it must set
+    `atomic = False`. It is a no-op on other databases.
+    """
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        super().__init__(self.create_index, self.drop_index, atomic=False)
+
+    def _target(self, apps):
+        opts = apps.get_model(self.model)._meta
+        column = opts.get_field(self.field).column
+        return f"{opts.db_table}_{column}_trgm", opts.db_table, column
+
+    def create_index(self, apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        name, table, column = self._target(apps)
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+    def drop_index(self, apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        name, _, _ = self._target(apps)
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+    def describe(self):
+        return f"Create trigram index on {self.model}.{self.field}"
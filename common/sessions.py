@@ -0,0 +1,13 @@
+"""
+The database session store, loading the session of an async request in the
+threads of common.threads like the queries of the async views.
+"""
+
+from django.contrib.sessions.backends import db
+
+from common.threads import in_thread
+
+
+class SessionStore(db.SessionStore):
+    async def aload(self):
+        return await in_thread(self.load)()
@@ -0,0 +1,19 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from common.cache import bump_generation
+
+
+@receiver([post_save, post_delete], sender="common.MetaData")
+@receiver([post_save, post_delete], sender="students.Student")
+@receiver([post_save, post_delete], sender="students.Course")
+@receiver([post_save, post_delete], sender="students.Instructor")
+@receiver([post_save, post_delete], sender="students.Enrollment")
+def model_changed(sender, instance, **kwargs):
+    # bumped again after commit, as a request may have cached data read from
+    # the rows that were visible before this transaction committed
+    bump_generation(sender)
+    transaction.on_commit(partial(bump_generation, sender))
@@ -0,0 +1,51 @@
+"""ROOT_URLCONF of the tests that need views of their own."""
+
+import asyncio
+
+from django.http import HttpResponse
+from django.template import engines
+from django.urls import path
+
+from common.models import MetaData
+
+
+def enrollment_students(request):
+    from students.models import Enrollment
+
+    template = engines["django"].from_string(
+        "{% for enrollment in enrollments %}{{ enrollment.student }}{% endfor %}"
+    )
+    return HttpResponse(template.render({"enrollments": Enrollment.objects.all()}))
+
+
+def instructor_courses(request):
+    """The instructors, and their courses when `?courses` is given."""
+    from students.models import Instructor
+
+    template = engines["django"].from_string(
+        "{% for instructor in instructors %}{{ instructor.pk }}"
+        "{% if courses %}{{ instructor.courses.all|join:', ' }}{% endif %}"
+        "{% endfor %}"
+    )
+    instructors = Instructor.objects.prefetch_related("courses__metadata")
+    context = {"instructors": instructors, "courses": "courses" in request.GET}
+    return HttpResponse(template.render(context))
+
+
+async def slow(request):
+    await asyncio.sleep(float(request.GET["seconds"]))
+    return HttpResponse()
+
+
+async def metadata_count(request):
+    template = engines["django"].from_string("{{ count }} metadata")
+    count = await MetaData.objects.acount()
+    return HttpResponse(template.render({"count": count}))
+
+
+urlpatterns = [
+    path("n-plus-one/", enrollment_students, name="n-plus-one"),
+    path("instructor-courses/", instructor_courses, name="instructor-courses"),
+    path("slow/", slow, name="slow"),
+    path("metadata-count/", metadata_count, name="metadata-count"),
+]
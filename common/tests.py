@@ -1,11 +1,45 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import pickle
+import subprocess
+import tempfile
+from io import StringIO
+from time import perf_counter
+from unittest import skipIf, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.functions import Cast
+from django.urls import reverse
+
+from common.instrumentation import QueryPatterns, normalize_sql, prefetch_usage
+from common.cache import Namespace, cache_stats, generation, reset_stats
+from common import profiling
+from common.metrics import archive_process, collect, registry, render_text
+from common.catalog import metadata_catalog
+from common.forms import MetaDataChoiceField
+from common.models import MetaData
+from common.pagination import (
+    MAX_PAGE_SIZE,
+    CursorPaginator,
+    InvalidCursor,
+    get_page_size,
+)
+from common.search import search
 
 User = get_user_model()
 
 
-class BaseTestCase(TestCase):
+class BaseTestMixin:
     def setUp(self):
+        cache.clear()
         self.admin = User.objects.create_superuser(
             first_name="admin",
             last_name="admin",
@@ -20,3 +54,595 @@ class BaseTestCase(TestCase):
             email="john@email.com",
             password="john123",
         )
+
+    def seed(self, count):
+        """
+        Create `count` more students, instructors, courses and enrollments with
+        metadata attached, for tests that need the tables to hold some rows.
+        """
+        from students.models import Course, Enrollment, Instructor, Student
+
+        offset = Course.objects.count()
+        metadata = [
+            MetaData.objects.get_or_create(key="seed", value=str(i))[0]
+            for i in range(3)
+        ]
+        for i in range(offset, offset + count):
+            student_user = User.objects.create(
+                username=f"student{i}", first_name="Student", last_name=str(i)
+            )
+            instructor_user = User.objects.create(
+                username=f"instructor{i}", first_name="Instructor", last_name=str(i)
+            )
+            student = Student.objects.create(user=student_user)
+            instructor = Instructor.objects.create(user=instructor_user)
+            course = Course.objects.create(
+                name=f"Course {i}", code=f"C{i:04}", description="Seeded course"
+            )
+            enrollment = Enrollment.objects.create(
+                student=student, course=course, score=40 + i % 60
+            )
+            instructor.courses.add(course)
+            for obj in (student, instructor, course, enrollment):
+                obj.metadata.set(metadata)
+
+    def assertQueryBudget(self, budget, url, sizes=(2, 8), **params):
+        """
+        GET `url` after seeding each of `sizes` more rows, and fail if the
+        number of queries grows with the data or goes over `budget`.
+        """
+        counts = []
+        for size in sizes:
+            self.seed(size)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+            if len(queries) > budget or len(set(counts)) > 1:
+                executed = "\n".join(
+                    f"{number}. {query['sql']}"
+                    for number, query in enumerate(queries.captured_queries, 1)
+                )
+                self.fail(
+                    f"GET {url} ran {counts} queries for {sizes[:len(counts)]} "
+                    f"seeded rows, budget is {budget}:\n{executed}"
+                )
+        return counts[-1]
+
+
+class BaseTestCase(BaseTestMixin, TestCase):
+    pass
+
+
+class AsyncBaseTestCase(BaseTestMixin, TransactionTestCase):
+    """
+    For the tests of async views: their queries run in the threads of
+    common.threads, where the transaction of a TestCase is not visible.
+    """
+
+
+class CursorPaginatorTestCase(TestCase):
+    def setUp(self):
+        MetaData.objects.bulk_create(
+            [MetaData(key=f"key{i:02}", value="value") for i in range(7)]
+        )
+
+    def keys(self, page):
+        return [metadata.key for metadata in page]
+
+    def test_walks_forward_and_back(self):
+        paginator = CursorPaginator(MetaData.objects.all(), per_page=3)
+        first = paginator.page()
+        self.assertEqual(self.keys(first), ["key00", "key01", "key02"])
+        self.assertFalse(first.has_previous())
+
+        second = paginator.page(first.next_cursor)
+        self.assertEqual(self.keys(second), ["key03", "key04", "key05"])
+
+        third = paginator.page(second.next_cursor)
+        self.assertEqual(self.keys(third), ["key06"])
+        self.assertFalse(third.has_next())
+
+        back = paginator.page(third.previous_cursor)
+        self.assertEqual(self.keys(back), ["key03", "key04", "key05"])
+        back = paginator.page(back.previous_cursor)
+        self.assertEqual(self.keys(back), ["key00", "key01", "key02"])
+        self.assertFalse(back.has_previous())
+
+    def test_last_page(self):
+        paginator = CursorPaginator(MetaData.objects.all(), per_page=3)
+        last = paginator.page(CursorPaginator.LAST_PAGE)
+        self.assertEqual(self.keys(last), ["key04", "key05", "key06"])
+        self.assertFalse(last.has_next())
+        self.assertTrue(last.has_previous())
+
+    def walk(self, queryset):
+        paginator = CursorPaginator(queryset, per_page=3)
+        page = paginator.page()
+        keys = self.keys(page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            keys += self.keys(page)
+        return keys
+
+    def test_tied_ranks_across_pages(self):
+        queryset = MetaData.objects.annotate(
+            rank=Cast(Value(1 / 3), FloatField())
+        ).order_by("-rank", "-pk")
+        self.assertEqual(self.walk(queryset), [f"key{i:02}" for i in range(6, -1, -1)])
+
+    @skipUnless(connection.vendor == "postgresql", "trigram ranks need PostgreSQL")
+    def test_tied_search_ranks_across_pages(self):
+        keys = self.walk(search(MetaData.objects.all(), "key", ["key"]))
+        self.assertEqual(keys, [f"key{i:02}" for i in range(6, -1, -1)])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        paginator = CursorPaginator(MetaData.objects.all(), per_page=3)
+        with self.assertRaises(InvalidCursor):
+            paginator.page("not-a-cursor")
+        self.assertEqual(
+            self.keys(paginator.get_page("not-a-cursor")), ["key00", "key01", "key02"]
+        )
+
+    def test_page_size_is_bounded(self):
+        self.assertEqual(get_page_size("100000"), MAX_PAGE_SIZE)
+        self.assertEqual(get_page_size("0"), 1)
+        self.assertEqual(get_page_size("abc", 5), 5)
+
+
+class MetaDataCatalogTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hobby = MetaData.objects.create(key="hobby", value="chess")
+
+    def test_catalog_is_cached_until_metadata_changes(self):
+        self.assertEqual(metadata_catalog(), [self.hobby])
+        with self.assertNumQueries(0):
+            self.assertEqual(metadata_catalog(), [self.hobby])
+
+        level = MetaData.objects.create(key="level", value="beginner")
+        self.assertEqual(metadata_catalog(), [self.hobby, level])
+        level.delete()
+        self.assertEqual(metadata_catalog(), [self.hobby])
+
+    def test_choice_field(self):
+        field = MetaDataChoiceField(required=False)
+        with self.assertNumQueries(1):
+            self.assertEqual(field.clean([str(self.hobby.pk)]), [self.hobby])
+            self.assertEqual(field.clean([]), [])
+            self.assertEqual(field.prepare_value([self.hobby]), [self.hobby.pk])
+
+    def test_form_pages_do_not_query_the_catalog(self):
+        self.client.force_login(self.admin)
+        metadata_catalog()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("students:courses-create"))
+        self.assertContains(response, "hobby: chess")
+        self.assertFalse(any('"common_metadata"' in query["sql"] for query in queries))
+
+
+class NamespaceTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        reset_stats()
+
+    def test_get_or_set_counts_hits_and_misses(self):
+        namespace = Namespace("answers")
+        self.assertEqual(namespace.get_or_set("a", default=lambda: 42), 42)
+        self.assertEqual(namespace.get_or_set("a", default=lambda: 0), 42)
+        self.assertIsNone(namespace.get("b"))
+        self.assertEqual(
+            cache_stats(), {"answers": {"hits": 1, "misses": 2, "hit_rate": 1 / 3}}
+        )
+
+    def test_model_changes_invalidate_the_namespace(self):
+        from students.models import Student
+
+        namespace = Namespace("students", models=[Student])
+        namespace.set("cached", "list")
+        version = generation(Student)
+        self.assertEqual(namespace.get("list"), "cached")
+
+        student = Student.objects.create(user=self.user)
+        self.assertNotEqual(generation(Student), version)
+        self.assertIsNone(namespace.get("list"))
+
+        namespace.set("cached again", "list")
+        with self.captureOnCommitCallbacks(execute=True):
+            student.delete()
+        self.assertIsNone(namespace.get("list"))
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = "django.core.cache.backends.filebased.FileBasedCache"
+            caches = {"default": {"BACKEND": backend, "LOCATION": location}}
+            with override_settings(CACHES=caches):
+                namespace = Namespace("metadata", models=[MetaData])
+                namespace.set("value", "key")
+                self.assertEqual(namespace.get("key"), "value")
+                MetaData.objects.create(key="key", value="value")
+                self.assertIsNone(namespace.get("key"))
+
+
+class DatabaseConnectionsTestCase(BaseTestCase):
+    def test_connection_report(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("common:connections"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["pooled"])
+        self.assertNotIn("stats", response.json())
+
+    def test_admin_only(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("common:connections"))
+        self.assertEqual(response.status_code, 302)
+
+    @skipIf(connection.vendor == "postgresql", "the benchmark runs on PostgreSQL")
+    def test_benchmark_needs_postgresql(self):
+        with self.assertRaises(CommandError):
+            call_command("benchmark_connections", requests=2)
+
+    @skipUnless(connection.vendor == "postgresql", "the benchmark needs PostgreSQL")
+    def test_benchmark(self):
+        out = StringIO()
+        call_command("benchmark_connections", requests=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            [line.split()[0] for line in lines],
+            ["mode", "per-request", "persistent", "pooled"],
+        )
+        for line in lines[1:]:
+            self.assertEqual(len([float(value) for value in line.split()[1:]]), 3)
+
+
+class MetricsTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.clear()
+
+    def test_requests_are_recorded_by_url_name(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("students:list"))
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=')
+        self.assertIn("total;dur=", timing)
+
+        text = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn(
+            'eduapp_http_request_duration_seconds_count{method="GET",status="200",'
+            'view="students:list"} 1',
+            text,
+        )
+        self.assertIn(
+            'eduapp_http_request_db_queries_bucket{view="students:list",le="', text
+        )
+        self.assertIn(
+            'eduapp_http_response_size_bytes_total{view="students:list"}', text
+        )
+
+        self.client.get("/no-such-page/")
+        text = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('view="<unresolved>"', text)
+
+    def test_access(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        self.client.logout()
+        with self.settings(METRICS_TOKEN="secret"):
+            response = self.client.get(
+                reverse("metrics"), headers={"Authorization": "Bearer secret"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4")
+        with self.settings(METRICS_TOKEN="secret"):
+            response = self.client.get(
+                reverse("metrics"), headers={"Authorization": "Bearer sécret"}
+            )
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(
+        ROOT_URLCONF="common.test_urls",
+        MIDDLEWARE=["common.middleware.MetricsMiddleware"],
+    )
+    async def test_async_requests_run_concurrently(self):
+        start = perf_counter()
+        responses = await asyncio.gather(
+            *(self.async_client.get("/slow/", {"seconds": 0.3}) for _ in range(6))
+        )
+        self.assertLess(perf_counter() - start, 1)
+        self.assertEqual([response.status_code for response in responses], [200] * 6)
+
+        response = await self.async_client.get("/metadata-count/")
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+    def test_exited_workers_are_archived_by_the_scrape(self):
+        exited = subprocess.Popen(["true"])
+        exited.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            registry.inc("http_request_db_seconds_total", {"view": "x"}, 0.25)
+            registry.flush(directory, force=True)
+            os.rename(
+                f"{directory}/{os.getpid()}.json", f"{directory}/{exited.pid}.json"
+            )
+            registry.clear()
+
+            text = render_text(collect(directory))
+            self.assertIn('eduapp_http_request_db_seconds_total{view="x"} 0.25', text)
+            self.assertFalse(os.path.exists(f"{directory}/{exited.pid}.json"))
+            self.assertTrue(os.path.exists(f"{directory}/archive.json"))
+
+    def test_workers_are_added_up(self):
+        with tempfile.TemporaryDirectory() as directory:
+            other = {
+                "counters": [["http_request_db_seconds_total", [["view", "x"]], 0.5]],
+                "histograms": [
+                    ["http_request_db_queries", [["view", "x"]], [1] + [0] * 8 + [1, 1]]
+                ],
+            }
+            with open(f"{directory}/1.json", "w") as f:
+                json.dump(other, f)
+            with open(f"{directory}/2.json", "w") as f:
+                json.dump(other, f)
+            archive_process(directory, 1)
+            registry.inc("http_request_db_seconds_total", {"view": "x"}, 0.25)
+
+            text = render_text(collect(directory))
+            self.assertIn('eduapp_http_request_db_seconds_total{view="x"} 1.25', text)
+            self.assertIn(
+                'eduapp_http_request_db_queries_bucket{view="x",le="1"} 2', text
+            )
+            self.assertIn('eduapp_http_request_db_queries_count{view="x"} 2', text)
+
+
+class NPlusOneTestCase(BaseTestCase):
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT a FROM t WHERE id IN (%s, %s) AND b = 'x'  LIMIT 21"),
+            "SELECT a FROM t WHERE id IN (...) AND b = %s LIMIT %s",
+        )
+
+    def test_repeated_queries(self):
+        from students.models import Enrollment
+
+        self.seed(3)
+        patterns = QueryPatterns()
+        with connection.execute_wrapper(patterns):
+            for enrollment in Enrollment.objects.all():
+                enrollment.student
+        [(sql, count, location, template)] = patterns.repeated(2)
+        self.assertEqual(count, 3)
+        self.assertIn('FROM "students_student"', sql)
+        self.assertRegex(location, r"^common/tests.py:\d+ in test_repeated_queries$")
+        self.assertIsNone(template)
+        self.assertEqual(patterns.repeated(3), [])
+
+    @override_settings(
+        ROOT_URLCONF="common.test_urls", NPLUSONE_SAMPLE_RATE=1, NPLUSONE_THRESHOLD=2
+    )
+    def test_middleware_logs_the_view(self):
+        self.seed(3)
+        with self.assertLogs("common.middleware", "WARNING") as logs:
+            self.client.get(reverse("n-plus-one"))
+        # the student of each enrollment, and the user of each student
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("N+1 in n-plus-one: 3 x SELECT", logs.output[0])
+        self.assertIn("rendering <unknown source>", logs.output[0])
+
+    @override_settings(ROOT_URLCONF="common.test_urls", NPLUSONE_SAMPLE_RATE=1)
+    def test_middleware_logs_unused_prefetches(self):
+        self.seed(3)
+        with self.assertLogs("common.middleware", "WARNING") as logs:
+            self.client.get(reverse("instructor-courses"))
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn(
+            "Unused prefetch in instructor-courses: Instructor.courses of 3 objects",
+            logs.output[0],
+        )
+        self.assertRegex(
+            logs.output[0], r"from common/test_urls.py:\d+ in instructor_courses"
+        )
+        self.assertIn("Course.metadata of 3 objects", logs.output[1])
+
+        # the courses are rendered, their metadata still is not
+        with self.assertLogs("common.middleware", "WARNING") as logs:
+            self.client.get(reverse("instructor-courses"), {"courses": 1})
+        [output] = logs.output
+        self.assertIn("Course.metadata of 3 objects", output)
+
+    def test_prefetch_usage(self):
+        from students.models import Instructor
+
+        self.seed(2)
+        with prefetch_usage() as usage:
+            instructors = list(Instructor.objects.prefetch_related("courses"))
+            self.assertEqual(
+                [(relation, count) for relation, count, *_ in usage.unused()],
+                [("Instructor.courses", 2)],
+            )
+            list(instructors[0].courses.all())
+        self.assertEqual(usage.unused(), [])
+        # a cached instance takes a plain dict along
+        copy = pickle.loads(pickle.dumps(instructors[0]))
+        self.assertIs(type(copy._prefetched_objects_cache), dict)
+
+    @override_settings(ROOT_URLCONF="common.test_urls", NPLUSONE_THRESHOLD=2)
+    def test_off_by_default(self):
+        self.seed(3)
+        with self.assertNoLogs("common.middleware"):
+            self.client.get(reverse("n-plus-one"))
+
+
+class ProfilerTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(PROFILE_DIR=directory.name, PROFILE_KEEP=2)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_admin_asks_for_a_profile(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("students:list"), {"profile": 1})
+        name = response["X-Profile"]
+        [info] = profiling.recent()
+        self.assertEqual(info["name"], name)
+        self.assertEqual(info["view"], "students:list")
+        self.assertGreater(info["queries"], 0)
+
+        response = self.client.get(reverse("common:profiles"))
+        self.assertContains(response, "students:list")
+        response = self.client.get(
+            reverse("common:profile-detail", args=[name]), {"filter": "students/"}
+        )
+        self.assertContains(response, "students/views.py")
+        self.assertNotContains(response, "django/")
+        response = self.client.get(
+            reverse("common:profile-detail", args=[name]), {"download": ""}
+        )
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+
+    def test_only_admins_ask_for_a_profile(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("students:list"), {"profile": 1})
+        self.assertNotIn("X-Profile", response)
+        self.assertEqual(profiling.recent(), [])
+        response = self.client.get(reverse("common:profiles"))
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sampled_requests_are_pruned(self):
+        for _ in range(3):
+            self.client.get(reverse("users:login"))
+        self.assertEqual(len(profiling.recent("users:login")), 2)
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse("common:profile-detail", args=["0-0"]), {"filter": "("}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(ROOT_URLCONF="common.test_urls")
+class ASGITestCase(AsyncBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(PROFILE_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    async def test_asgi_requests_run_concurrently(self):
+        # the whole MIDDLEWARE, none of it may make the requests wait in turn
+        start = perf_counter()
+        await asyncio.gather(
+            *(self.async_client.get("/slow/", {"seconds": 0.3}) for _ in range(6))
+        )
+        self.assertLess(perf_counter() - start, 1)
+
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(
+            "/metadata-count/", headers={"X-Profile": "1"}
+        )
+        [info] = await sync_to_async(profiling.recent)()
+        self.assertEqual(response["X-Profile"], info["name"])
+        self.assertEqual((info["view"], info["queries"]), ("metadata-count", 1))
+
+
+class TracingTestMixin:
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f"{directory.name}/traces.jsonl"
+        settings = override_settings(TRACE_FILE=self.path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def spans(self):
+        with open(self.path) as f:
+            [line] = f.readlines()
+        [resource] = json.loads(line)["resourceSpans"]
+        [scope] = resource["scopeSpans"]
+        return {span["name"]: span for span in scope["spans"]}
+
+
+class TracingTestCase(TracingTestMixin, BaseTestCase):
+    def test_request_is_traced(self):
+        self.seed(2)
+        self.client.force_login(self.admin)
+        self.client.get(reverse("students:list"))
+
+        spans = self.spans()
+        root = spans["GET students:list"]
+        self.assertNotIn("parentSpanId", root)
+        view = spans["view students.views.student_list"]
+        self.assertEqual(view["parentSpanId"], root["spanId"])
+        page = spans["render students/student_list.html"]
+        self.assertEqual(page["parentSpanId"], view["spanId"])
+        partial = spans["render partials/pagination.html"]
+        self.assertEqual(partial["parentSpanId"], page["spanId"])
+        self.assertIn("db SELECT", spans)
+        self.assertEqual(len({span["traceId"] for span in spans.values()}), 1)
+
+        out = StringIO()
+        call_command("show_trace", stdout=out)
+        self.assertIn("\n      render partials/pagination.html  ", out.getvalue())
+
+    def test_form_clean_is_traced(self):
+        self.client.force_login(self.admin)
+        self.client.post(reverse("students:courses-create"), {"name": ""})
+        spans = self.spans()
+        view = spans["view students.views.course_create"]
+        self.assertEqual(spans["clean CourseForm"]["parentSpanId"], view["spanId"])
+
+    @override_settings(TRACE_FILE=None)
+    def test_off_by_default(self):
+        self.client.get(reverse("users:login"))
+        with self.assertRaises(FileNotFoundError):
+            self.spans()
+
+
+@override_settings(ROOT_URLCONF="core.asgi_urls")
+class AsyncTracingTestCase(TracingTestMixin, AsyncBaseTestCase):
+    async def test_async_request_is_traced(self):
+        await sync_to_async(self.seed)(2)
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse("students:list"))
+        self.assertEqual(response.status_code, 200)
+
+        spans = self.spans()
+        root = spans["GET students:list"]
+        view = spans["view students.async_views.student_list"]
+        self.assertEqual(view["parentSpanId"], root["spanId"])
+        page = spans["render students/student_list.html"]
+        self.assertEqual(page["parentSpanId"], view["spanId"])
+        self.assertEqual(spans["db SELECT"]["parentSpanId"], view["spanId"])
+
+
+class MemoryTestCase(BaseTestCase):
+    @override_settings(MEMORY_SAMPLE_RATE=1, MEMORY_BUDGET_MB=0.01)
+    def test_requests_over_the_budget_are_logged(self):
+        registry.clear()
+        self.seed(3)
+        self.client.force_login(self.admin)
+        with self.assertLogs("common.middleware", "WARNING") as logs:
+            self.client.get(reverse("students:list"))
+        [message] = logs.output
+        self.assertIn("GET /students/ (students:list) peaked at", message)
+        self.assertRegex(message, r"\n  [\w/.]+:\d+: [\d.]+ MB in \d+ blocks")
+
+        text = render_text(collect())
+        self.assertIn(
+            'eduapp_http_request_memory_peak_bytes_count{view="students:list"} 1', text
+        )
+        self.assertIn(
+            'eduapp_http_request_memory_net_bytes_sum{view="students:list"}', text
+        )
+
+    @override_settings(MEMORY_SAMPLE_RATE=1)
+    def test_within_the_budget(self):
+        self.client.force_login(self.admin)
+        with self.assertNoLogs("common.middleware"):
+            self.client.get(reverse("students:list"))
@@ -0,0 +1,31 @@
+"""
+The threads the async views run their queries and templates in.
+
+sync_to_async runs a function in a thread of its request by default, which
+keeps its database connection until the response is sent, so an ASGI worker
+would hold a connection per request in flight and wait for the pool once
+there are more. `in_thread` runs it in one of WEB_THREADS threads instead,
+each giving its connection back to the pool (or keeping it, up to
+CONN_MAX_AGE) when the call returns: the pool sized in core.settings covers
+them all, however many requests are waiting.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+executor = ThreadPoolExecutor(settings.WEB_THREADS, thread_name_prefix="in-thread")
+
+
+def in_thread(func):
+    """`func` as a coroutine function running it in one of the threads."""
+
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False, executor=executor)
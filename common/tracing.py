@@ -0,0 +1,177 @@
+"""
+Tracing of single requests without a collector.
+
+common.middleware.TracingMiddleware starts a trace for a request, and
+`span()` records a timed, nested step of it: the view, every query, every
+template (included partials too) and every form clean. The finished trace
+is appended to TRACE_FILE as one line of OTLP/JSON, the format of the
+OpenTelemetry collector's file exporter, which its `otlpjsonfile` receiver
+and most trace viewers read. `manage.py show_trace` prints it as a tree.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.forms import BaseForm
+
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_ERROR = 2
+
+_trace = ContextVar("trace", default=None)
+_parent = ContextVar("span", default=None)
+_write_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans = []
+
+
+class span:
+    """
+    Record the block as a span of the current trace, a child of the span it
+    runs in. Does nothing outside a trace.
+    """
+
+    def __init__(self, name, kind=INTERNAL, **attributes):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.record = None
+
+    def __enter__(self):
+        trace = _trace.get()
+        if trace is None:
+            return self
+        self.record = {
+            "name": self.name,
+            "kind": self.kind,
+            "span_id": f"{random.getrandbits(64):016x}",
+            "parent_id": _parent.get(),
+            "start": time.time_ns(),
+            "attributes": self.attributes,
+        }
+        _parent.set(self.record["span_id"])
+        trace.spans.append(self.record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.record is None:
+            return
+        self.record["end"] = time.time_ns()
+        if exc is not None:
+            self.fail(f"{exc_type.__name__}: {exc}")
+        # not a token reset: under ASGI the view span is entered and exited
+        # by different middleware hooks, which run in different contexts
+        _parent.set(self.record["parent_id"])
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def rename(self, name):
+        self.name = name
+        if self.record is not None:
+            self.record["name"] = name
+
+    def fail(self, error):
+        if self.record is not None:
+            self.record["error"] = error
+
+
+def start():
+    """Start a trace in the current context, and return it."""
+    trace = Trace()
+    _trace.set(trace)
+    _parent.set(None)
+    return trace
+
+
+def stop():
+    _trace.set(None)
+
+
+def active():
+    return _trace.get() is not None
+
+
+class QuerySpans:
+    """A connection execute wrapper recording a span for every query."""
+
+    def __call__(self, execute, sql, params, many, context):
+        # the statement with its placeholders, the values stay out of the file
+        with span(
+            "db " + sql.split(None, 1)[0].upper(),
+            CLIENT,
+            **{"db.system": context["connection"].vendor, "db.statement": sql},
+        ):
+            return execute(sql, params, many, context)
+
+
+_full_clean = BaseForm.full_clean
+
+
+def _traced_full_clean(self):
+    with span(f"clean {type(self).__name__}", form=type(self).__name__):
+        return _full_clean(self)
+
+
+def install():
+    """Record a span for every form clean."""
+    BaseForm.full_clean = _traced_full_clean
+
+
+def attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def to_otlp(trace):
+    spans = []
+    for record in trace.spans:
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": record["span_id"],
+            "name": record["name"],
+            "kind": record["kind"],
+            "startTimeUnixNano": str(record["start"]),
+            "endTimeUnixNano": str(record.get("end", record["start"])),
+            "attributes": [attribute(k, v) for k, v in record["attributes"].items()],
+        }
+        if record["parent_id"]:
+            otlp_span["parentSpanId"] = record["parent_id"]
+        if "error" in record:
+            otlp_span["status"] = {"code": STATUS_ERROR, "message": record["error"]}
+        spans.append(otlp_span)
+    resource = {"service.name": "eduapp", "process.pid": os.getpid()}
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [attribute(k, v) for k, v in resource.items()]
+                },
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+            }
+        ]
+    }
+
+
+def export(trace, path):
+    """Append `trace` to the file at `path`, one JSON document per line."""
+    line = (json.dumps(to_otlp(trace), separators=(",", ":")) + "\n").encode()
+    # one append per trace, so that the lines of the workers never interleave
+    with _write_lock:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
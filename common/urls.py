@@ -9,4 +9,7 @@ urlpatterns = [
     path("metadata/create/", views.metadata_create, name="metadata-create"),
     path("metadata/<int:pk>/update/", views.metadata_update, name="metadata-update"),
     path("metadata/<int:pk>/delete/", views.metadata_delete, name="metadata-delete"),
+    path("connections/", views.database_connections, name="connections"),
+    path("profiles/", views.profile_list, name="profiles"),
+    path("profiles/<str:name>/", views.profile_detail, name="profile-detail"),
 ]
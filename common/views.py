@@ -1,12 +1,26 @@
+import hmac
+import os
+
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Q
-from django.core.paginator import Paginator
+from django.db import connections
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+)
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.views.decorators.http import require_POST
 
 
+from common import profiling
+from common.metrics import collect, render_text
 from common.models import MetaData
+from common.pagination import paginate
+from common.search import search
 from students.forms import MetaDataForm
 from users.permissions import is_admin
 
@@ -16,14 +30,9 @@ def metadata_list(request):
     metadata_qs = MetaData.objects.all()
     query = request.GET.get("q")
     if query:
-        metadata_qs = metadata_qs.filter(
-            Q(key__icontains=query) | Q(value__icontains=query)
-        )
+        metadata_qs = search(metadata_qs, query, ["key", "value"])
 
-    page_number = request.GET.get("page", 1)
-    page_limit = request.GET.get("limit", 10)
-    paginator = Paginator(metadata_qs, page_limit)
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, metadata_qs)
 
     metadata = page_obj.object_list
 
@@ -85,3 +94,80 @@ def metadata_delete(request, pk):
     metadata.delete()
     messages.success(request, "Metadata has been deleted successfully!")
     return redirect("common:metadata-list")
+
+
+@user_passes_test(is_admin)
+def database_connections(request):
+    """
+    Connection settings of this worker process, and the psycopg pool
+    statistics (waits, usage, size) when pooling is enabled. The pool is per
+    process, so each worker reports its own.
+    """
+    connection = connections["default"]
+    pool = getattr(connection, "pool", None)
+    data = {
+        "pid": os.getpid(),
+        "vendor": connection.vendor,
+        "pooled": pool is not None,
+        "conn_max_age": connection.settings_dict.get("CONN_MAX_AGE"),
+        "health_checks": connection.settings_dict.get("CONN_HEALTH_CHECKS"),
+    }
+    if pool is not None:
+        data["pool"] = {"min_size": pool.min_size, "max_size": pool.max_size}
+        data["stats"] = pool.get_stats()
+    return JsonResponse(data)
+
+
+def metrics(request):
+    """
+    The request metrics of every worker in the Prometheus text format, for
+    admins and for scrapers sending `Authorization: Bearer <METRICS_TOKEN>`.
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    if not is_admin(request.user) and not (
+        # bytes, as compare_digest only takes ASCII strings
+        token
+        and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode())
+    ):
+        return HttpResponseForbidden()
+    snapshot = collect(settings.METRICS_DIR)
+    return HttpResponse(render_text(snapshot), content_type="text/plain; version=0.0.4")
+
+
+@user_passes_test(is_admin)
+def profile_list(request):
+    view = request.GET.get("view") or None
+    return render(
+        request,
+        "common/profile_list.html",
+        {"profiles": profiling.recent(view)[:100], "view": view},
+    )
+
+
+@user_passes_test(is_admin)
+def profile_detail(request, name):
+    try:
+        info = profiling.load(name)
+        if "download" in request.GET:
+            return FileResponse(
+                open(profiling.path(name), "rb"),
+                as_attachment=True,
+                filename=f"{name}.prof",
+            )
+        sort = request.GET.get("sort", "cumulative")
+        restriction = request.GET.get("filter", "")
+        report = profiling.report(name, sort, restriction)
+    except FileNotFoundError:
+        raise Http404("This profile was pruned.")
+    return render(
+        request,
+        "common/profile_detail.html",
+        {
+            "info": info,
+            "report": report,
+            "sort": sort,
+            "sorts": profiling.SORTS,
+            "filter": restriction,
+        },
+    )
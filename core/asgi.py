@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# serve the read-only pages with the async views of students.async_views
+os.environ.setdefault('ROOT_URLCONF', 'core.asgi_urls')
+# how many requests of a worker may query the database at the same time (see
+# common.threads), the pool of core.settings is sized from it
+os.environ['ASGI'] = 'true'
+os.environ.setdefault('WEB_THREADS', '16')
 
 application = get_asgi_application()
@@ -0,0 +1,18 @@
+"""
+URLconf of the ASGI deployment: core.urls with the read-only student pages
+and the dashboard served by students.async_views.
+"""
+
+from django.urls import include, path
+
+from core.urls import urlpatterns as wsgi_urlpatterns
+from students.async_views import dashboard
+
+replacements = {
+    "students/": path("students/", include("students.async_urls")),
+    "": path("", dashboard, name="dashboard"),
+}
+
+urlpatterns = [
+    replacements.get(str(pattern.pattern), pattern) for pattern in wsgi_urlpatterns
+]
@@ -1,6 +1,7 @@
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import tempfile
 
 load_dotenv()
 
@@ -32,6 +33,9 @@ if DEBUG:
     INSTALLED_APPS.extend(development_apps)
 
 MIDDLEWARE = [
+    "common.middleware.MetricsMiddleware",
+    "common.middleware.NPlusOneMiddleware",
+    "common.middleware.MemoryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -39,11 +43,14 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "common.middleware.ProfilerMiddleware",
+    "common.middleware.TracingMiddleware",
 ]
 if DEBUG:
     MIDDLEWARE.append("debug_toolbar.middleware.DebugToolbarMiddleware")
 
-ROOT_URLCONF = "core.urls"
+# core.asgi switches to core.asgi_urls, the same routes with async read views
+ROOT_URLCONF = os.getenv("ROOT_URLCONF", "core.urls")
 
 TEMPLATES = [
     {
@@ -71,9 +78,101 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST", "localhost"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        # a broken connection (server restart, failover) is replaced before
+        # the request uses it instead of failing the request
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
     }
 }
 
+# gunicorn worker processes and threads per worker, gunicorn.conf.py sets
+# both to the numbers it picked before the app is loaded
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY") or "1")
+WEB_THREADS = int(os.getenv("WEB_THREADS") or "1")
+# under ASGI (core.asgi) the async views query from the WEB_THREADS threads of
+# common.threads, and each request of a sync view from a thread of its own;
+# the pool has room for WEB_THREADS of both
+ASGI = os.getenv("ASGI", "False").lower() == "true"
+# connections this app may hold in total, keep it below max_connections of
+# the server minus what migrations, cron jobs and psql sessions need
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "80"))
+
+if os.getenv("DB_POOL", "False").lower() == "true":
+    # one psycopg pool per worker process: a thread never waits for a
+    # connection, and all the workers together stay within DB_MAX_CONNECTIONS
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+        "max_size": max(
+            1, min(WEB_THREADS * (1 + ASGI), DB_MAX_CONNECTIONS // WEB_CONCURRENCY)
+        ),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "600")),
+    }
+else:
+    # without a pool, keep the connection of each thread open between requests
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+
+# locmem (default, tests), file (CACHE_LOCATION is a directory shared by the
+# workers of one host) or redis (CACHE_LOCATION is a redis:// URL, shared by
+# every host), see common.cache for the namespaced keys built on top of it
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "dda"),
+    "file": (
+        "django.core.cache.backends.filebased.FileBasedCache",
+        BASE_DIR / ".cache",
+    ),
+    "redis": (
+        "django.core.cache.backends.redis.RedisCache",
+        "redis://localhost:6379/0",
+    ),
+}
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": os.getenv("CACHE_LOCATION") or CACHE_BACKENDS[CACHE_BACKEND][1],
+        "KEY_PREFIX": os.getenv("CACHE_KEY_PREFIX", "dda"),
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", "300")),
+    }
+}
+
+# per-process metrics files that /metrics adds up, gunicorn.conf.py sets it;
+# unset, /metrics reports the process that answers only
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+# bearer token of the Prometheus scraper, admins can always read /metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# share of the requests common.middleware.NPlusOneMiddleware checks for
+# repeated queries, e.g. 0.01; 0 leaves it out of the middleware chain
+NPLUSONE_SAMPLE_RATE = float(os.getenv("NPLUSONE_SAMPLE_RATE", "0"))
+# times a query may repeat with different values before it is logged
+NPLUSONE_THRESHOLD = int(os.getenv("NPLUSONE_THRESHOLD", "5"))
+# share of the requests common.middleware.ProfilerMiddleware profiles, admins
+# can ask for a profile of any request, see common.profiling
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR") or os.path.join(
+    tempfile.gettempdir(), "eduapp-profiles"
+)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+# OTLP/JSON file common.middleware.TracingMiddleware appends the traces of a
+# sampled share of the requests to, see common.tracing; unset, nothing is traced
+TRACE_FILE = os.getenv("TRACE_FILE") or None
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1"))
+# share of the requests common.middleware.MemoryMiddleware measures with
+# tracemalloc, 0 leaves it out of the middleware chain
+MEMORY_SAMPLE_RATE = float(os.getenv("MEMORY_SAMPLE_RATE", "0"))
+# peak allocation of a request above which it is logged with its top sites
+MEMORY_BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB", "32"))
+MEMORY_TOP = int(os.getenv("MEMORY_TOP", "10"))
+# stack depth recorded per allocation, enough to reach our code from the ORM
+MEMORY_FRAMES = int(os.getenv("MEMORY_FRAMES", "30"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {"common": {"handlers": ["console"], "level": "INFO"}},
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -99,6 +198,17 @@ USE_TZ = True
 STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "users.User"
+AUTHENTICATION_BACKENDS = [
+    "users.backends.ProfileModelBackend",
+    # the sessions logged in before ProfileModelBackend name this one, keep it
+    # for a release so that they stay valid; remove it after that
+    "django.contrib.auth.backends.ModelBackend",
+]
+# seconds the session user is cached for, invalidation only reaches the cache
+# of this process unless CACHES points at a cache shared by all workers
+USER_CACHE_TIMEOUT = int(os.getenv("USER_CACHE_TIMEOUT", "0"))
+# the database sessions, loaded in the threads of common.threads under ASGI
+SESSION_ENGINE = "common.sessions"
 
 
 LOGIN_URL = "/users/login/"  # URL where login form is located
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from students.views import dashboard
+from common.views import metrics
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -10,6 +11,7 @@ urlpatterns = [
     path("users/", include("users.urls")),
     path("common/", include("common.urls")),
     path("admin/", admin.site.urls),
+    path("metrics", metrics, name="metrics"),
     path("", dashboard, name="dashboard"),
 ]
 
@@ -0,0 +1,144 @@
+"""
+Gunicorn settings of the prod compose service.
+
+Workers and threads are sized from the CPUs and the memory this container
+may use, unless WEB_CONCURRENCY / WEB_THREADS set them. The values chosen
+are written back to the environment, so that core.settings sizes the
+database pool for the same numbers, and logged when the server is ready.
+`python gunicorn.conf.py` prints them without starting anything, and
+`gunicorn --print-config` prints every setting.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def cpu_count():
+    """CPUs available to this process, within the cgroup CPU quota if any."""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            count = min(count, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def memory_mb():
+    """Memory available to this process in MB, within the cgroup limit if any."""
+    available = None
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            limit = f.read().strip()
+        if limit != "max":
+            limit = int(limit) // (1024 * 1024)
+            available = min(available, limit) if available else limit
+    except (OSError, ValueError):
+        pass
+    return available
+
+
+cpus = cpu_count()
+memory = memory_mb()
+# resident size of one worker, measure it with `ps -o rss` after some traffic
+worker_memory = env_int("WEB_WORKER_MEMORY_MB", 200)
+
+# 2 * CPUs + 1 workers, as many as fit in 80% of the memory
+workers = env_int("WEB_CONCURRENCY", 0)
+if not workers:
+    workers = 2 * cpus + 1
+    if memory:
+        workers = max(1, min(workers, int(memory * 0.8) // worker_memory))
+# threads keep a worker busy while its requests wait on the database
+threads = env_int("WEB_THREADS", 4)
+worker_class = "gthread" if threads > 1 else "sync"
+os.environ["WEB_CONCURRENCY"] = str(workers)
+os.environ["WEB_THREADS"] = str(threads)
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# import Django once in the master and fork the workers from it, which
+# starts them faster and shares the imported code between them
+preload_app = True
+# recycle workers to bound slow leaks, the jitter keeps them from all
+# restarting at once
+max_requests = env_int("WEB_MAX_REQUESTS", 1000)
+max_requests_jitter = env_int("WEB_MAX_REQUESTS_JITTER", max_requests // 10)
+timeout = env_int("WEB_TIMEOUT", 30)
+graceful_timeout = env_int("WEB_GRACEFUL_TIMEOUT", 30)
+# a little longer than nothing, nginx in front reuses its upstream connections
+keepalive = env_int("WEB_KEEPALIVE", 5)
+# the heartbeat files of the workers, /tmp may be on a slow overlay filesystem
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+accesslog = "-"
+errorlog = "-"
+# each worker writes its request metrics there, /metrics adds them up
+metrics_dir = os.environ.setdefault(
+    "METRICS_DIR",
+    os.path.join(worker_tmp_dir or tempfile.gettempdir(), "eduapp-metrics"),
+)
+
+
+def effective_settings():
+    return {
+        "cpus": cpus,
+        "memory_mb": memory,
+        "worker_memory_mb": worker_memory,
+        "workers": workers,
+        "threads": threads,
+        "worker_class": worker_class,
+        "bind": bind,
+        "preload_app": preload_app,
+        "max_requests": max_requests,
+        "max_requests_jitter": max_requests_jitter,
+        "timeout": timeout,
+        "graceful_timeout": graceful_timeout,
+        "keepalive": keepalive,
+        "metrics_dir": metrics_dir,
+    }
+
+
+def on_starting(server):
+    # the files of a previous run belong to processes that no longer exist
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def when_ready(server):
+    server.log.info("Effective settings: %s", json.dumps(effective_settings()))
+
+
+def worker_exit(server, worker):
+    from common.metrics import registry
+
+    registry.flush(metrics_dir, force=True)
+
+
+def child_exit(server, worker):
+    # keep the counts of recycled workers, Prometheus reads a counter that
+    # goes down as a restart
+    from common.metrics import archive_process
+
+    archive_process(metrics_dir, worker.pid)
+
+
+if __name__ == "__main__":
+    print(json.dumps(effective_settings(), indent=2))
@@ -0,0 +1,64 @@
+// Search box for the selects rendered by common.forms.AutocompleteSelect.
+// The select only holds the selected options; typing fetches the matching
+// ones from the JSON endpoint in its data-autocomplete-url attribute.
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(select => {
+        const search = document.createElement('input');
+        search.type = 'search';
+        search.className = 'form-control mb-2';
+        search.placeholder = 'Type to search...';
+        search.autocomplete = 'off';
+        select.parentNode.insertBefore(search, select);
+
+        let timer = null;
+        let controller = null;
+
+        function showResults(results) {
+            // keep what is already selected, replace everything else
+            Array.from(select.options).forEach(option => {
+                if (!option.selected && option.value !== '') {
+                    option.remove();
+                }
+            });
+            const present = new Set(Array.from(select.options).map(option => option.value));
+            results.forEach(result => {
+                const value = String(result.id);
+                if (!present.has(value)) {
+                    select.add(new Option(result.text, value));
+                }
+            });
+            if (!select.multiple) {
+                select.size = Math.min(select.options.length, 10);
+            }
+        }
+
+        search.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+                const url = new URL(select.dataset.autocompleteUrl, window.location.origin);
+                url.searchParams.set('q', search.value.trim());
+                fetch(url, {
+                    signal: controller.signal,
+                    headers: {'Accept': 'application/json'},
+                })
+                    .then(response => response.json())
+                    .then(data => showResults(data.results))
+                    .catch(error => {
+                        if (error.name !== 'AbortError') {
+                            console.error(error);
+                        }
+                    });
+            }, 250);
+        });
+
+        select.addEventListener('change', function() {
+            if (!select.multiple) {
+                select.size = 0;
+            }
+        });
+    });
+});
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from students.models import Student, Course, Enrollment, Instructor
+from students.models import Student, Course, Enrollment, GradingScheme, Instructor
 
 
 @admin.register(Student)
@@ -10,9 +10,16 @@ class StudentAdmin(admin.ModelAdmin):
     filter_horizontal = ("metadata",)
 
 
+@admin.register(GradingScheme)
+class GradingSchemeAdmin(admin.ModelAdmin):
+    list_display = ("name", "a_min", "b_min", "c_min", "d_min", "pass_mark")
+    search_fields = ("name",)
+
+
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
-    list_display = ("code", "description")
+    list_display = ("code", "description", "grading_scheme")
+    list_select_related = ("grading_scheme",)
     search_fields = ("code",)
     filter_horizontal = ("metadata",)
 
@@ -0,0 +1,29 @@
+from django.urls import path
+
+from students import async_views
+from students.urls import app_name, urlpatterns as sync_urlpatterns
+
+# the read-only pages have async views, everything else stays sync
+async_urlpatterns = [
+    path("", async_views.student_list, name="list"),
+    path("<int:pk>/", async_views.student_detail, name="detail"),
+    path("courses/", async_views.course_list, name="courses-list"),
+    path("courses/<int:pk>/", async_views.course_detail, name="courses-detail"),
+    path("instructors/", async_views.instructor_list, name="instructors-list"),
+    path(
+        "instructors/<int:pk>/",
+        async_views.instructor_detail,
+        name="instructors-detail",
+    ),
+    path("enrollments/", async_views.enrollment_list, name="enrollments-list"),
+    path(
+        "enrollments/<int:pk>/",
+        async_views.enrollment_detail,
+        name="enrollments-detail",
+    ),
+]
+replaced = {pattern.name for pattern in async_urlpatterns}
+
+urlpatterns = [
+    pattern for pattern in sync_urlpatterns if pattern.name not in replaced
+] + async_urlpatterns
@@ -0,0 +1,149 @@
+"""
+Async versions of the read-only pages, served by core.asgi_urls when the app
+runs under an ASGI server. The queries and the template rendering run in the
+threads of common.threads, so a worker keeps serving other requests while
+one waits on the database. The async ORM is not used: it runs the queries in
+a thread of the request, which holds a connection until the response is sent.
+"""
+
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseForbidden
+from django.shortcuts import get_object_or_404, render
+
+from common.pagination import paginate
+from common.search import search
+from common.threads import in_thread
+from students.models import Course, DashboardCounter, Enrollment, Instructor, Student
+from students.views import filter_enrollments, filter_students
+from users.permissions import is_own_enrollment, is_own_student
+
+arender = in_thread(render)
+aget_object_or_404 = in_thread(get_object_or_404)
+apaginate = in_thread(paginate)
+
+
+async def load_user(request):
+    """
+    Resolve the session user without blocking, and set it as `request.user`
+    so the sync helpers and context processors find it already loaded.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+@login_required
+async def dashboard(request):
+    await load_user(request)
+    counter = await in_thread(DashboardCounter.load)()
+    context = {
+        "total_students": counter.students,
+        "total_courses": counter.active_courses,
+        "total_instructors": counter.instructors,
+        "total_enrollments": counter.enrollments,
+    }
+    return await arender(request, "dashboard.html", context=context)
+
+
+@login_required
+async def student_list(request):
+    await load_user(request)
+    students_qs = filter_students(request, Student.objects.select_related("user"))
+    page_obj = await apaginate(request, students_qs)
+    return await arender(
+        request,
+        "students/student_list.html",
+        {"students": page_obj.object_list, "page_obj": page_obj},
+    )
+
+
+@login_required
+async def student_detail(request, pk):
+    user = await load_user(request)
+    students = Student.objects.select_related("user").prefetch_related("metadata")
+    student = await aget_object_or_404(students, pk=pk)
+    if not (user.is_admin or is_own_student(user, student)):
+        return HttpResponseForbidden(
+            "You do not have permission to view this student's details."
+        )
+    return await arender(request, "students/student_detail.html", {"student": student})
+
+
+@login_required
+async def course_list(request):
+    await load_user(request)
+    courses = Course.objects.all()
+    query = request.GET.get("q")
+    if query:
+        courses = search(courses, query, ["name", "code", "description"])
+    page_obj = await apaginate(request, courses)
+    return await arender(
+        request,
+        "students/course_list.html",
+        {"courses": page_obj.object_list, "page_obj": page_obj},
+    )
+
+
+@login_required
+async def course_detail(request, pk):
+    await load_user(request)
+    course = await aget_object_or_404(
+        Course.objects.select_related("statistics").prefetch_related("metadata"),
+        pk=pk,
+    )
+    return await arender(request, "students/course_detail.html", {"course": course})
+
+
+@login_required
+async def instructor_list(request):
+    await load_user(request)
+    instructors = Instructor.objects.select_related("user")
+    query = request.GET.get("q")
+    if query:
+        instructors = search(
+            instructors, query, ["user__first_name", "user__last_name"]
+        )
+    page_obj = await apaginate(request, instructors)
+    return await arender(
+        request,
+        "students/instructor_list.html",
+        {"instructors": page_obj.object_list, "page_obj": page_obj},
+    )
+
+
+@login_required
+async def instructor_detail(request, pk):
+    await load_user(request)
+    instructors = Instructor.objects.select_related("user").prefetch_related("metadata")
+    instructor = await aget_object_or_404(instructors, pk=pk)
+    return await arender(
+        request, "students/instructor_detail.html", {"instructor": instructor}
+    )
+
+
+@login_required
+async def enrollment_list(request):
+    await load_user(request)
+    enrollments = Enrollment.objects.select_related("student__user", "course")
+    enrollments = filter_enrollments(request, enrollments)
+    page_obj = await apaginate(request, enrollments, default_limit=2)
+    return await arender(
+        request,
+        "students/enrollment_list.html",
+        {"enrollments": page_obj.object_list, "page_obj": page_obj},
+    )
+
+
+@login_required
+async def enrollment_detail(request, pk):
+    user = await load_user(request)
+    enrollments = Enrollment.objects.select_related(
+        "student__user", "course"
+    ).prefetch_related("metadata")
+    enrollment = await aget_object_or_404(enrollments, pk=pk)
+    if not (user.is_admin or is_own_enrollment(user, enrollment)):
+        return HttpResponseForbidden(
+            "You don't have permission to view this enrollment."
+        )
+    return await arender(
+        request, "students/enrollment_detail.html", {"enrollment": enrollment}
+    )
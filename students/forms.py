@@ -1,23 +1,47 @@
-from students.models import Enrollment, Student, Course, MetaData
+from students.models import Enrollment, Student, Course, GradingScheme
 from django.utils import timezone
 from django import forms
-from common.forms import BaseModelForm
+from common.forms import (
+    AutocompleteSelect,
+    AutocompleteSelectMultiple,
+    BaseModelForm,
+    MetaDataChoiceField,
+)
 from django.contrib.auth import get_user_model
 
 
 User = get_user_model()
 
 
+def student_label(student):
+    return f"{student.user.first_name} {student.user.last_name}"
+
+
+def course_label(course):
+    return f"{course.name} ({course.code})"
+
+
+class StudentChoiceField(forms.ModelChoiceField):
+    def label_from_instance(self, obj):
+        return student_label(obj)
+
+
+class CourseChoiceField(forms.ModelChoiceField):
+    def label_from_instance(self, obj):
+        return course_label(obj)
+
+
+class CourseMultipleChoiceField(forms.ModelMultipleChoiceField):
+    def label_from_instance(self, obj):
+        return course_label(obj)
+
+
 class StudentForm(BaseModelForm):
     first_name = forms.CharField(max_length=30)
     last_name = forms.CharField(max_length=30)
     date_of_birth = forms.DateField(required=False)
     email = forms.EmailField(required=True)
-    metadata = forms.ModelMultipleChoiceField(
-        queryset=MetaData.objects.all(),
-        required=False,
-        widget=forms.CheckboxSelectMultiple,
-    )
+    metadata = MetaDataChoiceField(required=False)
 
     def clean_date_of_birth(self):
         date_of_birth = self.cleaned_data.get("date_of_birth")
@@ -39,15 +63,14 @@ class InstructorForm(BaseModelForm):
     first_name = forms.CharField(max_length=30)
     last_name = forms.CharField(max_length=30)
     email = forms.EmailField(required=True)
-    courses = forms.ModelMultipleChoiceField(
+    courses = CourseMultipleChoiceField(
         queryset=Course.objects.all(),
         required=False,
+        widget=AutocompleteSelectMultiple(
+            "students:courses-autocomplete", attrs={"class": "courses-select"}
+        ),
     )
-    metadata = forms.ModelMultipleChoiceField(
-        queryset=MetaData.objects.all(),
-        required=False,
-        widget=forms.CheckboxSelectMultiple,
-    )
+    metadata = MetaDataChoiceField(required=False)
 
     def clean_email(self):
         email = self.cleaned_data["email"]
@@ -63,11 +86,12 @@ class CourseForm(BaseModelForm):
     name = forms.CharField(max_length=100)
     code = forms.CharField(max_length=100)
     description = forms.CharField(widget=forms.Textarea)
-    metadata = forms.ModelMultipleChoiceField(
-        queryset=MetaData.objects.all(),
+    grading_scheme = forms.ModelChoiceField(
+        queryset=GradingScheme.objects.all(),
         required=False,
-        widget=forms.CheckboxSelectMultiple,
+        empty_label="Default (80/70/60/50/40)",
     )
+    metadata = MetaDataChoiceField(required=False)
 
     def clean_code(self):
         code = self.cleaned_data["code"]
@@ -80,17 +104,25 @@ class CourseForm(BaseModelForm):
 
 
 class EnrollmentForm(BaseModelForm):
-    student = forms.ModelChoiceField(queryset=Student.objects.all(), required=True)
-    course = forms.ModelChoiceField(queryset=Course.objects.all(), required=True)
+    student = StudentChoiceField(
+        queryset=Student.objects.select_related("user"),
+        empty_label="-- Select a student --",
+        widget=AutocompleteSelect(
+            "students:autocomplete", attrs={"class": "form-select"}
+        ),
+    )
+    course = CourseChoiceField(
+        queryset=Course.objects.all(),
+        empty_label="-- Select a course --",
+        widget=AutocompleteSelect(
+            "students:courses-autocomplete", attrs={"class": "form-select"}
+        ),
+    )
     score = forms.DecimalField(max_digits=5, decimal_places=2, required=False)
     enrollment_date = forms.DateField(
         required=False, widget=forms.DateInput(attrs={"type": "date"})
     )
-    metadata = forms.ModelMultipleChoiceField(
-        queryset=MetaData.objects.all(),
-        required=False,
-        widget=forms.CheckboxSelectMultiple,
-    )
+    metadata = MetaDataChoiceField(required=False)
 
     def clean(self):
         cleaned_data = super().clean()
@@ -107,6 +139,10 @@ class EnrollmentForm(BaseModelForm):
         return cleaned_data
 
 
+class EnrollmentImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV with an email,course,score header")
+
+
 class MetaDataForm(BaseModelForm):
     key = forms.CharField(max_length=100)
     value = forms.CharField(max_length=255)
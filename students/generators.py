@@ -0,0 +1,394 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import partial
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from common.cache import bump_generation
+from common.models import MetaData
+from students.models import (
+    Course,
+    CourseStatistics,
+    DashboardCounter,
+    Enrollment,
+    GradingScheme,
+    Instructor,
+    Student,
+)
+
+User = get_user_model()
+
+BATCH_SIZE = 10000
+
+FIRST_NAMES = [
+    "Aarav", "Sita", "Ram", "Gita", "Hari", "Anita", "Bikash", "Sunita",
+    "Rajesh", "Puja", "Suman", "Asha", "Nabin", "Kabita", "Dipesh", "Sarita",
+    "Prakash", "Manisha", "Roshan", "Sabina", "Anil", "Rekha", "Santosh",
+    "Nisha", "Ramesh", "Binita", "Kiran", "Sapana", "Sujan", "Alisha",
+    "James", "Mary", "John", "Linda", "David", "Emma", "Daniel", "Olivia",
+]  # fmt: skip
+LAST_NAMES = [
+    "Shrestha", "Sharma", "Thapa", "Gurung", "Tamang", "Rai", "Adhikari",
+    "Karki", "Magar", "Poudel", "Dhamala", "Bhattarai", "Khadka", "Basnet",
+    "Limbu", "Joshi", "Pandey", "Koirala", "Niraula", "Pradhan", "Smith",
+    "Johnson", "Brown", "Wilson",
+]  # fmt: skip
+DEPARTMENTS = ["CS", "MTH", "PHY", "CHM", "BIO", "ECO", "ENG", "HIS", "STA", "MGT"]
+TOPICS = [
+    "Foundations of", "Introduction to", "Advanced", "Applied", "Topics in",
+    "Principles of", "Methods in", "Seminar in",
+]  # fmt: skip
+SUBJECTS = {
+    "CS": "Computing", "MTH": "Mathematics", "PHY": "Physics",
+    "CHM": "Chemistry", "BIO": "Biology", "ECO": "Economics",
+    "ENG": "Writing", "HIS": "History", "STA": "Statistics", "MGT": "Management",
+}  # fmt: skip
+METADATA = {
+    "hobby": ["chess", "football", "music", "painting", "reading"],
+    "transport_mode": ["bus", "bike", "walk", "car"],
+    "difficulty": ["beginner", "intermediate", "advanced"],
+    "semester": ["Fall 2024", "Spring 2025", "Fall 2025"],
+    "enrollment_type": ["credit", "audit"],
+    "discount": ["none", "scholarship", "sibling"],
+    "research_area": ["AI", "Databases", "Algebra", "Ecology"],
+}
+
+
+def zipf_weights(count, exponent=1.0):
+    """Cumulative weights where the item of rank r is picked ~ 1 / r**exponent."""
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class GenerateReport:
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, name, count):
+        self.counts[name] = self.counts.get(name, 0) + count
+
+
+class Generator:
+    """
+    Deterministic synthetic data: the same seed and sizes always give the same
+    names, courses, enrollment pairs and scores.
+
+    The large tables (enrollments and the metadata links) are written with
+    COPY on PostgreSQL and with bulk_create elsewhere, `batch_size` rows at a
+    time, without holding the generated rows in memory.
+    """
+
+    def __init__(
+        self,
+        seed=0,
+        batch_size=BATCH_SIZE,
+        prefix="gen",
+        password=None,
+        metadata_per_object=2,
+        use_copy=None,
+    ):
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.prefix = prefix
+        # hashed once: hashing a password per user would take hours
+        self.password = make_password(password)
+        self.metadata_per_object = metadata_per_object
+        if use_copy is None:
+            use_copy = connection.vendor == "postgresql"
+        self.use_copy = use_copy
+        self.now = timezone.now()
+        self.first_name_weights = zipf_weights(len(FIRST_NAMES))
+        self.last_name_weights = zipf_weights(len(LAST_NAMES))
+        self.report = GenerateReport()
+
+    def write(self, model, columns, rows):
+        """Insert `rows`, tuples of `columns` values, into the table of `model`."""
+        count = 0
+        if self.use_copy:
+            table = connection.ops.quote_name(model._meta.db_table)
+            names = ", ".join(connection.ops.quote_name(column) for column in columns)
+            with connection.cursor() as cursor:
+                with cursor.copy(f"COPY {table} ({names}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                        count += 1
+        else:
+            attnames = [model._meta.get_field(column).attname for column in columns]
+            for batch in batched(rows, self.batch_size):
+                objs = [model(**dict(zip(attnames, row))) for row in batch]
+                # the plain manager, the grades are already computed
+                model._base_manager.bulk_create(objs, batch_size=self.batch_size)
+                count += len(objs)
+        return count
+
+    def name(self):
+        first = FIRST_NAMES[self.pick(self.first_name_weights)]
+        last = LAST_NAMES[self.pick(self.last_name_weights)]
+        return first, last
+
+    def pick(self, cum_weights):
+        return self.random.choices(
+            range(len(cum_weights)), cum_weights=cum_weights, k=1
+        )[0]
+
+    def create_users(self, role, count):
+        users = []
+        for index in range(count):
+            first, last = self.name()
+            username = f"{self.prefix}-{role}-{index:07}"
+            users.append(
+                User(
+                    username=username,
+                    first_name=first,
+                    last_name=last,
+                    email=f"{first}.{last}.{username}@example.com".lower(),
+                    password=self.password,
+                    date_joined=self.now,
+                )
+            )
+        created = []
+        for batch in batched(users, self.batch_size):
+            created += User.objects.bulk_create(batch)
+        self.report.add("users", len(created))
+        return created
+
+    def create_metadata(self):
+        MetaData.objects.bulk_create(
+            [
+                MetaData(key=key, value=value)
+                for key, values in METADATA.items()
+                for value in values
+            ],
+            ignore_conflicts=True,
+        )
+        pairs = [(key, value) for key, values in METADATA.items() for value in values]
+        ids = {
+            (metadata.key, metadata.value): metadata.pk
+            for metadata in MetaData.objects.filter(key__in=METADATA)
+        }
+        return [ids[pair] for pair in pairs]
+
+    def link_metadata(self, model, ids, metadata_ids):
+        """Attach 0..metadata_per_object random metadata to each of `ids`."""
+        field = model._meta.get_field("metadata")
+        through = field.remote_field.through
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        most = min(self.metadata_per_object, len(metadata_ids))
+
+        def rows():
+            for pk in ids:
+                count = self.random.randint(0, most)
+                for metadata_id in self.random.sample(metadata_ids, count):
+                    yield pk, metadata_id
+
+        columns = [
+            through._meta.get_field(source).column,
+            through._meta.get_field(target).column,
+        ]
+        self.report.add("metadata links", self.write(through, columns, rows()))
+
+    def create_courses(self, count):
+        courses = []
+        for index in range(count):
+            department = DEPARTMENTS[index % len(DEPARTMENTS)]
+            number = 100 + index // len(DEPARTMENTS)
+            topic = self.random.choice(TOPICS)
+            courses.append(
+                Course(
+                    name=f"{topic} {SUBJECTS[department]} {number}",
+                    code=f"{self.prefix.upper()}-{department}{number}",
+                    description=f"{topic} {SUBJECTS[department].lower()}.",
+                )
+            )
+        created = []
+        for batch in batched(courses, self.batch_size):
+            created += Course.objects.bulk_create(batch)
+        self.report.add("courses", len(created))
+        return created
+
+    def enrollment_rows(self, student_ids, course_ids, total):
+        """
+        `total` (student, course) pairs spread evenly over the students, the
+        courses picked by popularity, with a score drawn from the difficulty
+        of the course, the ability of the student and some noise.
+        """
+        scheme = GradingScheme()
+        popularity = zipf_weights(len(course_ids), exponent=0.8)
+        difficulty = [self.random.gauss(68, 8) for _ in course_ids]
+        per_student, extra = divmod(total, len(student_ids))
+        for index, student_id in enumerate(student_ids):
+            count = per_student + (index < extra)
+            ability = self.random.gauss(0, 8)
+            picked = set()
+            for _ in range(10):
+                if len(picked) == count:
+                    break
+                picked.update(
+                    self.random.choices(
+                        range(len(course_ids)),
+                        cum_weights=popularity,
+                        k=count - len(picked),
+                    )
+                )
+            else:
+                # nearly every course: collecting the unpopular ones by
+                # popularity would take long, take them at random instead
+                rest = [i for i in range(len(course_ids)) if i not in picked]
+                picked.update(self.random.sample(rest, count - len(picked)))
+            for course_index in sorted(picked):
+                # 1 in 20 is not graded yet
+                if self.random.random() < 0.05:
+                    score = None
+                else:
+                    value = difficulty[course_index] + ability
+                    value += self.random.gauss(0, 10)
+                    score = Decimal(f"{min(max(value, 0), 100):.2f}")
+                yield (
+                    student_id,
+                    course_ids[course_index],
+                    score,
+                    scheme.grade_for(score),
+                    self.now.date(),
+                    self.now,
+                    self.now,
+                )
+
+    def create_enrollments(self, student_ids, course_ids, total):
+        columns = [
+            "student_id",
+            "course_id",
+            "score",
+            "grade",
+            "enrollment_date",
+            "created_at",
+            "updated_at",
+        ]
+        rows = self.enrollment_rows(student_ids, course_ids, total)
+        self.report.add("enrollments", self.write(Enrollment, columns, rows))
+
+    def generate(self, students, instructors, courses, enrollments):
+        metadata_ids = self.create_metadata()
+
+        course_objs = self.create_courses(courses)
+        course_ids = [course.pk for course in course_objs]
+
+        users = self.create_users("student", students)
+        student_objs = []
+        for batch in batched(users, self.batch_size):
+            student_objs += Student.objects.bulk_create(
+                [
+                    Student(
+                        user=user,
+                        date_of_birth=date(2004, 1, 1)
+                        - timedelta(days=int(self.random.gauss(0, 3 * 365))),
+                    )
+                    for user in batch
+                ]
+            )
+        self.report.add("students", len(student_objs))
+        student_ids = [student.pk for student in student_objs]
+
+        users = self.create_users("instructor", instructors)
+        instructor_objs = []
+        for batch in batched(users, self.batch_size):
+            instructor_objs += Instructor.objects.bulk_create(
+                [Instructor(user=user) for user in batch]
+            )
+        self.report.add("instructors", len(instructor_objs))
+        # each course is taught by one to two instructors
+        if instructor_objs:
+            rows = (
+                (self.random.choice(instructor_objs).pk, course_id)
+                for course_id in course_ids
+                for _ in range(self.random.randint(1, 2))
+            )
+            rows = list(dict.fromkeys(rows))
+            self.write(Instructor.courses.through, ["instructor_id", "course_id"], rows)
+
+        if enrollments:
+            self.create_enrollments(student_ids, course_ids, enrollments)
+
+        self.link_metadata(Student, student_ids, metadata_ids)
+        self.link_metadata(Course, course_ids, metadata_ids)
+        self.link_metadata(
+            Instructor, [obj.pk for obj in instructor_objs], metadata_ids
+        )
+        # in batches of ids: the connection cannot read from a cursor while
+        # it is busy with a COPY
+        enrollment_ids = Enrollment.objects.filter(
+            course__code__startswith=f"{self.prefix.upper()}-"
+        ).order_by("pk")
+        last_pk = 0
+        while batch := list(
+            enrollment_ids.filter(pk__gt=last_pk).values_list("pk", flat=True)[
+                : self.batch_size
+            ]
+        ):
+            self.link_metadata(Enrollment, batch, metadata_ids)
+            last_pk = batch[-1]
+        return self.report
+
+
+def generate(
+    students,
+    instructors,
+    courses,
+    enrollments,
+    seed=0,
+    batch_size=BATCH_SIZE,
+    prefix="gen",
+    password=None,
+    metadata_per_object=2,
+    use_copy=None,
+):
+    """
+    Generate and insert synthetic students, instructors, courses, enrollments
+    and metadata links in one transaction, then bring the counters, the
+    course statistics and the cache generations up to date.
+    """
+    if courses < 1 or students < 1:
+        raise ValueError("At least one student and one course are needed.")
+    if enrollments > students * courses:
+        raise ValueError(
+            f"{enrollments} enrollments do not fit in {students} students "
+            f"x {courses} courses."
+        )
+    if User.objects.filter(username__startswith=f"{prefix}-").exists():
+        raise ValueError(f"Data with the prefix '{prefix}' already exists.")
+
+    generator = Generator(
+        seed=seed,
+        batch_size=batch_size,
+        prefix=prefix,
+        password=password,
+        metadata_per_object=metadata_per_object,
+        use_copy=use_copy,
+    )
+    with transaction.atomic():
+        report = generator.generate(students, instructors, courses, enrollments)
+        # nothing above sends the signals that keep these up to date
+        DashboardCounter.reconcile()
+        CourseStatistics.refresh(
+            Course.objects.filter(code__startswith=f"{prefix.upper()}-").values("pk")
+        )
+        for model in (MetaData, Student, Course, Instructor, Enrollment):
+            transaction.on_commit(partial(bump_generation, model))
+    if connection.vendor == "postgresql":
+        # fresh planner statistics for the tables that just grew
+        with connection.cursor() as cursor:
+            for model in (User, Student, Instructor, Course, Enrollment):
+                cursor.execute(
+                    f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}"
+                )
+    return report
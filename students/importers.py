@@ -0,0 +1,135 @@
+import csv
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from common.cache import bump_generation
+from students.models import (
+    Course,
+    CourseStatistics,
+    DashboardCounter,
+    Enrollment,
+    Student,
+)
+from students.signals import course_enrolled
+from students.validators import validate_score
+
+BATCH_SIZE = 2000
+COLUMNS = ("email", "course", "score")
+NOT_UTF8 = "The file is not UTF-8 encoded."
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.errors = []  # (line number, message)
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+
+def parse_score(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        score = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError(f"'{value}' is not a number.")
+    validate_score(score)
+    return score
+
+
+def import_enrollments(lines, batch_size=BATCH_SIZE):
+    """
+    Create or update enrollments from CSV `lines` with an `email,course,score`
+    header, where `email` is the student's email and `course` the course code.
+
+    Rows are read lazily and written `batch_size` at a time: the students and
+    courses of a batch are resolved with one query each and the enrollments
+    are upserted with a single INSERT ... ON CONFLICT on unique_student_course.
+    Rows that cannot be imported are reported with their line number, the rest
+    of the file is still imported.
+    """
+    report = ImportReport()
+    reader = csv.DictReader(lines)
+    try:
+        fieldnames = reader.fieldnames
+    except UnicodeDecodeError:
+        report.error(1, NOT_UTF8)
+        return report
+    if fieldnames is None or not set(COLUMNS) <= set(fieldnames):
+        report.error(1, f"The header must contain the columns {', '.join(COLUMNS)}.")
+        return report
+
+    rows = enumerate(reader, start=2)
+    course_ids = set()
+    line = 2
+    try:
+        while batch := list(islice(rows, batch_size)):
+            course_ids |= import_batch(batch, report)
+            line = batch[-1][0] + 1
+    except UnicodeDecodeError:
+        # the batches before the undecodable bytes are imported
+        report.error(line, f"{NOT_UTF8} The rows from this line on were skipped.")
+
+    CourseStatistics.refresh(course_ids)
+    return report
+
+
+def import_batch(batch, report):
+    emails = {(row["email"] or "").strip() for _, row in batch}
+    codes = {(row["course"] or "").strip() for _, row in batch}
+    students = dict(
+        Student.objects.filter(user__email__in=emails).values_list("user__email", "pk")
+    )
+    courses = dict(Course.objects.filter(code__in=codes).values_list("code", "pk"))
+
+    # keyed on (student, course), a later row for the same pair wins since
+    # ON CONFLICT cannot update the same row twice in one statement
+    enrollments = {}
+    for line, row in batch:
+        email = (row["email"] or "").strip()
+        code = (row["course"] or "").strip()
+        if email not in students:
+            report.error(line, f"No student with the email '{email}'.")
+            continue
+        if code not in courses:
+            report.error(line, f"No course with the code '{code}'.")
+            continue
+        try:
+            score = parse_score(row["score"])
+        except ValidationError as error:
+            report.error(line, " ".join(error.messages))
+            continue
+        enrollments[(students[email], courses[code])] = Enrollment(
+            student_id=students[email], course_id=courses[code], score=score
+        )
+
+    with transaction.atomic():
+        existing = set(
+            Enrollment.objects.filter(
+                student_id__in={student_id for student_id, _ in enrollments},
+                course_id__in={course_id for _, course_id in enrollments},
+            ).values_list("student_id", "course_id")
+        )
+        Enrollment.objects.bulk_create(
+            enrollments.values(),
+            update_conflicts=True,
+            unique_fields=["student", "course"],
+            update_fields=["score", "grade", "updated_at"],
+        )
+        # bulk_create does not send the signals that keep the counters up to
+        # date, move them by the rows that were inserted rather than updated
+        inserted = Counter(course_id for _, course_id in enrollments.keys() - existing)
+        for course_id, count in inserted.items():
+            course_enrolled(course_id, count)
+        DashboardCounter.add(enrollments=inserted.total())
+        for model in (Course, Enrollment):
+            transaction.on_commit(partial(bump_generation, model))
+    report.imported += len(enrollments)
+    return {course_id for _, course_id in enrollments}
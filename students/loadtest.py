@@ -0,0 +1,381 @@
+import html
+import http.client
+import json
+import random
+import re
+import statistics
+import threading
+from http.cookies import SimpleCookie
+from time import perf_counter, sleep
+from urllib.parse import urlencode, urlsplit
+
+from django.urls import reverse
+
+from students.models import Course, Enrollment, Instructor, Student
+
+NEXT_PAGE = re.compile(r'href="([^"]*cursor=[^"]*)">\s*next')
+SEARCH_TERMS = ["a", "ra", "sh", "john", "python", "CS1", "data", "ma"]
+LIMITS = [None, None, 5, 10, 20, 50]
+SAMPLE_SIZE = 500
+
+
+class Session:
+    """One virtual user: a keep-alive connection to the server and its cookies."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.netloc = parts.netloc
+        self.https = parts.scheme == "https"
+        self.connection = None
+        self.cookies = {}
+        # the cursor of the next page, per list, to page through like a user
+        self.next_pages = {}
+
+    def connect(self):
+        if self.https:
+            return http.client.HTTPSConnection(self.netloc, timeout=30)
+        return http.client.HTTPConnection(self.netloc, timeout=30)
+
+    def request(self, method, path, data=None):
+        headers = {}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if data is not None:
+            data = {**data, "csrfmiddlewaretoken": self.cookies.get("csrftoken", "")}
+            body = urlencode(data, doseq=True)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            headers["X-CSRFToken"] = self.cookies.get("csrftoken", "")
+        if self.connection is None:
+            self.connection = self.connect()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+        for header in response.headers.get_all("Set-Cookie") or []:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            for name, morsel in cookie.items():
+                self.cookies[name] = morsel.value
+        return response.status, content.decode(errors="replace")
+
+    def login(self, username, password):
+        path = reverse("users:login")
+        self.request("GET", path)
+        status, _ = self.request(
+            "POST", path, {"username": username, "password": password}
+        )
+        if status != 302:
+            raise LoginFailed(f"Could not log in as '{username}'.")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+class LoginFailed(Exception):
+    pass
+
+
+class Fixtures:
+    """Ids the scenarios pick from, a sample of each table read up front."""
+
+    def __init__(self):
+        self.students = self.sample(Student.objects.values_list("pk", flat=True))
+        self.courses = self.sample(Course.objects.values_list("pk", flat=True))
+        self.instructors = self.sample(Instructor.objects.values_list("pk", flat=True))
+        self.enrollments = self.sample(
+            Enrollment.objects.values_list("pk", "student_id", "course_id")
+        )
+
+    def sample(self, queryset):
+        return list(queryset.order_by("?")[:SAMPLE_SIZE])
+
+    def own(self, username):
+        """The student and the enrollment ids of a student user."""
+        student = Student.objects.filter(user__username=username).first()
+        if student is None:
+            return None, []
+        return student.pk, list(student.enrollments.values_list("pk", flat=True))
+
+
+# actions: (session, user, rng) -> (url name, method, path, data)
+
+
+def dashboard(session, user, rng):
+    return "dashboard", "GET", reverse("dashboard"), None
+
+
+def list_page(name):
+    def action(session, user, rng):
+        path = reverse(name)
+        params = {}
+        if rng.random() < 0.3:
+            params["q"] = rng.choice(SEARCH_TERMS)
+        limit = rng.choice(LIMITS)
+        if limit:
+            params["limit"] = limit
+        next_page = session.next_pages.pop(name, None)
+        if next_page and rng.random() < 0.5:
+            # follow the "next" link of the previous visit
+            return name, "GET", path + next_page, None
+        if params:
+            path += "?" + urlencode(params)
+        return name, "GET", path, None
+
+    return action
+
+
+def detail_page(name, ids):
+    def action(session, user, rng):
+        pks = getattr(user.fixtures, ids)
+        pk = rng.choice(pks)
+        pk = pk[0] if isinstance(pk, tuple) else pk
+        return name, "GET", reverse(name, args=[pk]), None
+
+    action.fixture = ids
+    return action
+
+
+def own_student(session, user, rng):
+    return (
+        "students:detail",
+        "GET",
+        reverse("students:detail", args=[user.student]),
+        None,
+    )
+
+
+def own_enrollment(session, user, rng):
+    pk = rng.choice(user.enrollments)
+    return (
+        "students:enrollments-detail",
+        "GET",
+        reverse("students:enrollments-detail", args=[pk]),
+        None,
+    )
+
+
+def update_enrollment(session, user, rng):
+    pk, student_id, course_id = rng.choice(user.fixtures.enrollments)
+    data = {
+        "student": student_id,
+        "course": course_id,
+        "score": f"{rng.uniform(40, 100):.2f}",
+    }
+    path = reverse("students:enrollments-update", args=[pk])
+    return "students:enrollments-update", "POST", path, data
+
+
+update_enrollment.fixture = "enrollments"
+
+
+def create_course(session, user, rng):
+    code = f"LT-{rng.getrandbits(40):010x}"
+    data = {
+        "name": f"Load test {code}",
+        "code": code,
+        "description": "Created by the load test.",
+    }
+    user.created_courses[code] = None
+    return "students:courses-create", "POST", reverse("students:courses-create"), data
+
+
+def update_course(session, user, rng):
+    if not user.created_courses:
+        return create_course(session, user, rng)
+    code = rng.choice(list(user.created_courses))
+    course = user.created_courses[code]
+    if course is None:
+        # the create redirects to the list, look the id up like the forms do
+        path = reverse("students:courses-autocomplete") + "?" + urlencode({"q": code})
+        status, content = session.request("GET", path)
+        results = json.loads(content)["results"] if status == 200 else []
+        course = results[0]["id"] if results else None
+        user.created_courses[code] = course
+    if course is None:
+        return create_course(session, user, rng)
+    data = {
+        "name": f"Load test {code} ({rng.randint(1, 99)})",
+        "code": code,
+        "description": "Updated by the load test.",
+    }
+    path = reverse("students:courses-update", args=[course])
+    return "students:courses-update", "POST", path, data
+
+
+READER = [
+    (5, dashboard),
+    (10, list_page("students:list")),
+    (10, list_page("students:courses-list")),
+    (5, list_page("students:instructors-list")),
+    (15, list_page("students:enrollments-list")),
+    (10, detail_page("students:detail", "students")),
+    (10, detail_page("students:courses-detail", "courses")),
+    (5, detail_page("students:instructors-detail", "instructors")),
+    (10, detail_page("students:enrollments-detail", "enrollments")),
+]
+WRITER = READER + [
+    (10, update_enrollment),
+    (3, create_course),
+    (5, update_course),
+]
+STUDENT = [
+    (10, dashboard),
+    (15, list_page("students:list")),
+    (20, list_page("students:enrollments-list")),
+    (10, list_page("students:courses-list")),
+    (10, detail_page("students:courses-detail", "courses")),
+    (15, own_student),
+    (20, own_enrollment),
+]
+
+# profile: [(share of the virtual users, role, actions)]
+PROFILES = {
+    "browse": [(1, "admin", READER)],
+    "students": [(1, "student", STUDENT)],
+    "mixed": [(6, "admin", READER), (3, "student", STUDENT), (1, "admin", WRITER)],
+    "write": [(1, "admin", WRITER)],
+}
+
+
+class VirtualUser:
+    def __init__(self, role, actions, credentials, fixtures, rng):
+        self.role = role
+        self.username, self.password = credentials
+        self.fixtures = fixtures
+        self.rng = rng
+        self.student = None
+        self.enrollments = []
+        self.created_courses = {}  # code: pk
+        if role == "student":
+            self.student, self.enrollments = fixtures.own(self.username)
+        # drop what cannot be done with this data, e.g. a student without
+        # enrollments has none to open
+        actions = [
+            (weight, action)
+            for weight, action in actions
+            if (action is not own_student or self.student)
+            and (action is not own_enrollment or self.enrollments)
+            and getattr(fixtures, getattr(action, "fixture", ""), True)
+        ]
+        self.weights = [weight for weight, _ in actions]
+        self.actions = [action for _, action in actions]
+
+    def next_request(self, session):
+        action = self.rng.choices(self.actions, weights=self.weights)[0]
+        return action(session, self, self.rng)
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # url name: [(ok, ms)]
+
+    def add(self, name, ok, elapsed):
+        with self.lock:
+            self.samples.setdefault(name, []).append((ok, elapsed))
+
+
+def percentile(timings, fraction):
+    if len(timings) == 1:
+        return timings[0]
+    return statistics.quantiles(timings, n=100, method="inclusive")[
+        round(fraction * 100) - 1
+    ]
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles (ms), req/s and errors of each url name."""
+    routes = {}
+    for name, rows in sorted(samples.items()):
+        timings = [ms for ok, ms in rows if ok]
+        errors = len(rows) - len(timings)
+        routes[name] = {
+            "requests": len(rows),
+            "errors": errors,
+            "rps": round(len(rows) / elapsed, 2),
+            "p50": round(percentile(timings, 0.50), 2) if timings else None,
+            "p95": round(percentile(timings, 0.95), 2) if timings else None,
+            "p99": round(percentile(timings, 0.99), 2) if timings else None,
+            "max": round(max(timings), 2) if timings else None,
+        }
+    return routes
+
+
+def run(
+    base_url,
+    profile,
+    users,
+    duration,
+    admin=("admin", "admin123"),
+    students=(("rabin", "test123"),),
+    think=0.0,
+    seed=0,
+):
+    """
+    Replay `profile` against the server at `base_url` with `users` virtual
+    users for `duration` seconds, and return the samples and elapsed time.
+    Each virtual user logs in first, as `admin` or one of `students`
+    depending on its role, the logins are not part of the results.
+    """
+    fixtures = Fixtures()
+    rng = random.Random(seed)
+    roles = [
+        (role, actions)
+        for share, role, actions in PROFILES[profile]
+        for _ in range(share)
+    ]
+    virtual_users = []
+    for index in range(users):
+        role, actions = roles[index % len(roles)]
+        credentials = admin if role == "admin" else students[index % len(students)]
+        virtual_users.append(
+            VirtualUser(
+                role, actions, credentials, fixtures, random.Random(rng.random())
+            )
+        )
+
+    sessions = []
+    for user in virtual_users:
+        session = Session(base_url)
+        session.login(user.username, user.password)
+        sessions.append(session)
+
+    recorder = Recorder()
+    deadline = perf_counter() + duration
+
+    def loop(user, session):
+        while perf_counter() < deadline:
+            name, method, path, data = user.next_request(session)
+            start = perf_counter()
+            try:
+                status, content = session.request(method, path, data)
+            except (OSError, http.client.HTTPException):
+                status, content = None, ""
+            # a form post that does not redirect was not saved
+            ok = status is not None and status < 400
+            ok = ok and (method == "GET" or status in (301, 302, 303))
+            recorder.add(name, ok, (perf_counter() - start) * 1000)
+            if status == 200 and method == "GET":
+                match = NEXT_PAGE.search(content)
+                if match:
+                    session.next_pages[name] = html.unescape(match.group(1))
+            if think:
+                sleep(user.rng.expovariate(1 / think))
+        session.close()
+
+    started = perf_counter()
+    threads = [
+        threading.Thread(target=loop, args=(user, session))
+        for user, session in zip(virtual_users, sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.samples, perf_counter() - started
@@ -0,0 +1,244 @@
+import json
+import statistics
+from datetime import datetime, timezone
+from fnmatch import fnmatch
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import URLResolver, get_resolver, reverse
+
+from common.instrumentation import QueryTimer, query_wrapper, template_timer
+from common.models import MetaData
+from students.generators import generate
+from students.models import Course, Enrollment, Instructor, Student
+
+NAMESPACES = ["students", "common", "users"]
+# routes that change data or the session of the client
+UNSAFE = ["*-delete", "*:delete", "users:logout"]
+# the object of the <pk> routes, by url name prefix
+DETAIL_MODELS = [
+    ("students:courses-", Course),
+    ("students:instructors-", Instructor),
+    ("students:enrollments-", Enrollment),
+    ("students:", Student),
+    ("common:metadata-", MetaData),
+]
+
+
+def named_routes():
+    """(url name, needs a pk) for the dashboard and the routes of NAMESPACES."""
+    routes = [("dashboard", False)]
+    for pattern in get_resolver().url_patterns:
+        if not isinstance(pattern, URLResolver) or pattern.namespace not in NAMESPACES:
+            continue
+        for route in pattern.url_patterns:
+            if route.name:
+                name = f"{pattern.namespace}:{route.name}"
+                routes.append((name, "pk" in route.pattern.converters))
+    return routes
+
+
+def scale_sizes(enrollments):
+    """Students, instructors and courses in proportion to `enrollments`."""
+    courses = max(20, enrollments // 200)
+    students = max(10, enrollments // 10)
+    return students, max(5, courses // 2), courses
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every named view of the students, common and users apps with the "
+        "test client against the current database, optionally at growing "
+        "numbers of enrollments, and compare with a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            help="comma separated numbers of enrollments, e.g. 1000,100000,1000000; "
+            "generate_data tops the database up to each before it is measured",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--routes", default="*", help="glob on the url names, e.g. 'students:*'"
+        )
+        parser.add_argument("--username", help="user to log in as, an admin by default")
+        parser.add_argument("--output", help="save the results to this JSON file")
+        parser.add_argument("--compare", help="JSON file of an earlier run")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="relative slowdown flagged in the comparison",
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.all()
+        if options["username"]:
+            user = users.filter(username=options["username"]).first()
+        else:
+            user = users.filter(is_superuser=True).order_by("pk").first()
+        if user is None:
+            raise CommandError("No user to log in as.")
+        scales = [None]
+        if options["scales"]:
+            try:
+                scales = [int(scale) for scale in options["scales"].split(",")]
+            except ValueError:
+                raise CommandError("--scales must be a list of numbers.")
+
+        # keyed on the requested scale, so that runs can be compared even
+        # if the database holds a few more rows
+        results = {}
+        for scale in scales:
+            if scale is not None:
+                self.top_up(scale)
+            enrollments = Enrollment.objects.count()
+            self.stdout.write(f"== {enrollments} enrollments")
+            routes = self.measure(user, options)
+            results[str(scale or enrollments)] = routes
+            self.report(routes)
+
+        run = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "repeat": options["repeat"],
+            "scales": results,
+        }
+        self.report_growth(results)
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                self.report_changes(run, json.load(f), options["threshold"])
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(run, f, indent=2)
+
+    def top_up(self, target):
+        missing = target - Enrollment.objects.count()
+        if missing <= 0:
+            return
+        students, instructors, courses = scale_sizes(missing)
+        self.stdout.write(f"generating {missing} enrollments...")
+        try:
+            generate(
+                students,
+                instructors,
+                courses,
+                missing,
+                prefix=f"bench{target}",
+                metadata_per_object=1,
+            )
+        except ValueError as error:
+            # e.g. an earlier top up to this scale whose rows were deleted since
+            raise CommandError(str(error))
+
+    def measure(self, user, options):
+        client = Client()
+        client.force_login(user)
+        routes = {}
+        hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        with override_settings(ALLOWED_HOSTS=hosts):
+            for name, needs_pk in named_routes():
+                if not fnmatch(name, options["routes"]) or any(
+                    fnmatch(name, pattern) for pattern in UNSAFE
+                ):
+                    continue
+                url = self.url(name, needs_pk)
+                if url is None:
+                    continue
+                routes[name] = self.time(client, url, options["repeat"])
+        return routes
+
+    def url(self, name, needs_pk):
+        if not needs_pk:
+            return reverse(name)
+        for prefix, model in DETAIL_MODELS:
+            if name.startswith(prefix):
+                pk = model.objects.order_by("pk").values_list("pk", flat=True).first()
+                return reverse(name, args=[pk]) if pk is not None else None
+        return None
+
+    def time(self, client, url, repeat):
+        """Medians of `repeat` requests, after one to warm the caches up."""
+        client.get(url)
+        samples = []
+        for _ in range(repeat):
+            with query_wrapper(QueryTimer()) as queries, template_timer() as templates:
+                start = perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                wall = (perf_counter() - start) * 1000
+            samples.append((wall, queries.count, queries.ms, templates.ms))
+        return {
+            "url": url,
+            "status": response.status_code,
+            "wall_ms": round(statistics.median(s[0] for s in samples), 2),
+            "queries": max(s[1] for s in samples),
+            "query_ms": round(statistics.median(s[2] for s in samples), 2),
+            "template_ms": round(statistics.median(s[3] for s in samples), 2),
+        }
+
+    def report(self, routes):
+        self.stdout.write(
+            f"{'url name':<34} {'status':>6} {'wall':>9} {'queries':>7} "
+            f"{'query':>9} {'template':>9}  (ms)"
+        )
+        for name, route in routes.items():
+            self.stdout.write(
+                f"{name:<34} {route['status']:>6} {route['wall_ms']:9.2f} "
+                f"{route['queries']:>7} {route['query_ms']:9.2f} "
+                f"{route['template_ms']:9.2f}"
+            )
+
+    def report_growth(self, results):
+        """
+        Wall time and queries of each route at each scale relative to the
+        smallest one, next to how much the data grew. A route whose time grows
+        faster than the data, or whose query count grows at all, is flagged.
+        """
+        if len(results) < 2:
+            return
+        scales = sorted(results, key=int)
+        base = scales[0]
+        self.stdout.write(f"== growth relative to {base} enrollments")
+        for name, first in results[base].items():
+            cells, flag = [], ""
+            for scale in scales[1:]:
+                route = results[scale].get(name)
+                if route is None:
+                    continue
+                data = int(scale) / max(int(base), 1)
+                time = route["wall_ms"] / max(first["wall_ms"], 0.01)
+                cells.append(f"x{time:.1f} (data x{data:.0f})")
+                if route["queries"] > first["queries"]:
+                    flag = "  queries grow"
+                elif time > max(data, 2):
+                    flag = "  non-linear"
+            self.stdout.write(f"{name:<34} {' '.join(cells)}{flag}")
+
+    def report_changes(self, run, baseline, threshold):
+        self.stdout.write("== compared with the baseline")
+        for scale, routes in run["scales"].items():
+            before_routes = baseline.get("scales", {}).get(scale)
+            if before_routes is None:
+                self.stdout.write(f"{scale} enrollments: not in the baseline")
+                continue
+            for name, route in routes.items():
+                before = before_routes.get(name)
+                if before is None:
+                    continue
+                change = (route["wall_ms"] - before["wall_ms"]) / max(
+                    before["wall_ms"], 0.01
+                )
+                flags = []
+                if change > threshold:
+                    flags.append("slower")
+                if route["queries"] > before["queries"]:
+                    flags.append(f"queries {before['queries']} -> {route['queries']}")
+                self.stdout.write(
+                    f"{scale:>9} {name:<34} {before['wall_ms']:9.2f} -> "
+                    f"{route['wall_ms']:9.2f} ms ({change:+.0%}) {', '.join(flags)}"
+                )
@@ -0,0 +1,60 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.generators import BATCH_SIZE, generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate deterministic synthetic students, instructors, courses, "
+        "enrollments and metadata links for benchmarking."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=10000)
+        parser.add_argument("--instructors", type=int, default=500)
+        parser.add_argument("--courses", type=int, default=1000)
+        parser.add_argument("--enrollments", type=int, default=100000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--prefix",
+            default="gen",
+            help="prefix of the generated usernames and course codes",
+        )
+        parser.add_argument(
+            "--password", help="password of the generated users, unusable by default"
+        )
+        parser.add_argument(
+            "--metadata-per-object",
+            type=int,
+            default=2,
+            help="each object gets between 0 and this many metadata links",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="use bulk_create instead of COPY on PostgreSQL",
+        )
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        try:
+            report = generate(
+                options["students"],
+                options["instructors"],
+                options["courses"],
+                options["enrollments"],
+                seed=options["seed"],
+                batch_size=options["batch_size"],
+                prefix=options["prefix"],
+                password=options["password"],
+                metadata_per_object=options["metadata_per_object"],
+                use_copy=False if options["no_copy"] else None,
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+        for name, count in report.counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(f"done in {perf_counter() - start:.1f}s")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from students.importers import BATCH_SIZE, import_enrollments
+
+
+class Command(BaseCommand):
+    help = "Create or update enrollments from a CSV file with an email,course,score header."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file to import")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="", encoding="utf-8-sig") as lines:
+            report = import_enrollments(lines, batch_size=options["batch_size"])
+        for line, message in report.errors:
+            self.stderr.write(f"line {line}: {message}")
+        self.stdout.write(
+            f"{report.imported} enrollments imported, {len(report.errors)} rows rejected"
+        )
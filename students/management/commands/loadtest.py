@@ -0,0 +1,122 @@
+import json
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.loadtest import PROFILES, LoginFailed, run, summarize
+
+
+def credentials(value):
+    username, _, password = value.partition(":")
+    return username, password
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a mix of page views and form posts against a running server "
+        "as the seed_data users, and report the latency percentiles and "
+        "requests per second of each url name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", nargs="?", default="http://localhost:8000")
+        parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--duration", type=float, default=30.0)
+        parser.add_argument(
+            "--think", type=float, default=0.0, help="mean pause between requests (s)"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--admin", type=credentials, default=("admin", "admin123"))
+        parser.add_argument(
+            "--student",
+            type=credentials,
+            action="append",
+            help="username:password, can be repeated",
+        )
+        parser.add_argument("--label", help="name of this run, e.g. the release")
+        parser.add_argument("--output", help="save the results to this JSON file")
+        parser.add_argument(
+            "--compare", help="JSON file of an earlier run to compare with"
+        )
+
+    def handle(self, *args, **options):
+        students = options["student"] or [
+            (name, "test123") for name in ("rabin", "simran", "rakesh", "priyanka")
+        ]
+        started_at = datetime.now(timezone.utc)
+        try:
+            samples, elapsed = run(
+                options["url"],
+                options["profile"],
+                options["users"],
+                options["duration"],
+                admin=options["admin"],
+                students=students,
+                think=options["think"],
+                seed=options["seed"],
+            )
+        except LoginFailed as error:
+            raise CommandError(str(error))
+        except OSError as error:
+            raise CommandError(f"Cannot reach {options['url']}: {error}")
+
+        routes = summarize(samples, elapsed)
+        requests = sum(route["requests"] for route in routes.values())
+        result = {
+            "label": options["label"],
+            "started_at": started_at.isoformat(),
+            "url": options["url"],
+            "profile": options["profile"],
+            "users": options["users"],
+            "duration": round(elapsed, 2),
+            "seed": options["seed"],
+            "totals": {
+                "requests": requests,
+                "errors": sum(route["errors"] for route in routes.values()),
+                "rps": round(requests / elapsed, 2),
+            },
+            "routes": routes,
+        }
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+        self.report(result, baseline)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(result, f, indent=2)
+
+    def report(self, result, baseline=None):
+        def ms(value):
+            return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+
+        header = (
+            f"{'url name':<32} {'req':>6} {'err':>4} {'req/s':>7} "
+            f"{'p50':>8} {'p95':>8} {'p99':>8}"
+        )
+        if baseline:
+            header += f" {'p95 Δ':>8} {'req/s Δ':>8}"
+        self.stdout.write(header + "  (ms)")
+        for name, route in result["routes"].items():
+            line = (
+                f"{name:<32} {route['requests']:>6} {route['errors']:>4} "
+                f"{route['rps']:>7.1f} {ms(route['p50'])} {ms(route['p95'])} "
+                f"{ms(route['p99'])}"
+            )
+            before = (baseline or {}).get("routes", {}).get(name)
+            if before:
+                line += f" {change(before['p95'], route['p95']):>8}"
+                line += f" {change(before['rps'], route['rps']):>8}"
+            self.stdout.write(line)
+        totals = result["totals"]
+        self.stdout.write(
+            f"{'total':<32} {totals['requests']:>6} {totals['errors']:>4} "
+            f"{totals['rps']:>7.1f}"
+        )
+
+
+def change(before, after):
+    if not before or after is None:
+        return "-"
+    return f"{(after - before) / before * 100:+.0f}%"
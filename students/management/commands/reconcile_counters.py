@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from students.models import DashboardCounter
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the dashboard counters and course enrollment counts from the tables."
+    )
+
+    def handle(self, *args, **options):
+        counter = DashboardCounter.reconcile()
+        self.stdout.write(
+            f"students={counter.students} instructors={counter.instructors} "
+            f"active_courses={counter.active_courses} enrollments={counter.enrollments}"
+        )
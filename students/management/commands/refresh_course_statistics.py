@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from students.models import CourseStatistics
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the score statistics of every course, e.g. from a periodic job "
+        "after bulk writes that bypass the enrollment signals."
+    )
+
+    def handle(self, *args, **options):
+        CourseStatistics.refresh()
+        self.stdout.write(
+            f"statistics refreshed for {CourseStatistics.objects.count()} courses"
+        )
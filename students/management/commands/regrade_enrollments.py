@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from students.models import Course, Enrollment, EnrollmentQuerySet, PendingRegrade
+
+
+class Command(BaseCommand):
+    help = "Recompute enrollment grades from the grading schemes of their courses."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course", help="code of the course to regrade, all courses by default"
+        )
+        parser.add_argument(
+            "--pending",
+            action="store_true",
+            help="only the courses queued by a change of scheme that were too "
+            "large to regrade in the request",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=EnrollmentQuerySet.REGRADE_BATCH_SIZE
+        )
+
+    def progress(self, done, total):
+        self.stdout.write(f"{done}/{total} enrollments regraded")
+
+    def handle(self, *args, **options):
+        if options["pending"]:
+            courses = PendingRegrade.process(
+                batch_size=options["batch_size"], progress=self.progress
+            )
+            self.stdout.write(f"{len(courses)} queued courses regraded")
+        elif options["course"]:
+            try:
+                course = Course.objects.select_related("grading_scheme").get(
+                    code=options["course"]
+                )
+            except Course.DoesNotExist:
+                raise CommandError(f"No course with the code '{options['course']}'.")
+            course.regrade(batch_size=options["batch_size"], progress=self.progress)
+        else:
+            Enrollment.objects.regrade(
+                batch_size=options["batch_size"], progress=self.progress
+            )
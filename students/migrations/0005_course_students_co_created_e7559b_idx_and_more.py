@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("common", "0003_metadata_common_meta_key_577751_idx"),
+        ("students", "0004_alter_enrollment_grade"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="students_co_created_e7559b_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="enrollment",
+            index=models.Index(
+                fields=["-enrollment_date", "-id"],
+                name="students_en_enrollm_7bd035_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="instructor",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="students_in_created_7c5244_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="student",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="students_st_created_40c7e9_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+from common.search import TrigramIndex
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("students", "0005_course_students_co_created_e7559b_idx_and_more"),
+        ("users", "0002_trigram_indexes"),
+    ]
+
+    operations = [
+        TrigramIndex("students.Course", "name"),
+        TrigramIndex("students.Course", "code"),
+        TrigramIndex("students.Course", "description"),
+    ]
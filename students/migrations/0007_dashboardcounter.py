@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:11
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Course = apps.get_model("students", "Course")
+    Enrollment = apps.get_model("students", "Enrollment")
+    Instructor = apps.get_model("students", "Instructor")
+    Student = apps.get_model("students", "Student")
+    DashboardCounter = apps.get_model("students", "DashboardCounter")
+
+    enrollment_counts = (
+        Enrollment.objects.filter(course=OuterRef("pk"))
+        .order_by()
+        .values("course")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Course.objects.update(enrollment_count=Coalesce(Subquery(enrollment_counts), 0))
+    DashboardCounter.objects.update_or_create(
+        pk=1,
+        defaults={
+            "students": Student.objects.filter(user__is_active=True).count(),
+            "instructors": Instructor.objects.filter(user__is_active=True).count(),
+            "active_courses": Course.objects.filter(enrollment_count__gt=0).count(),
+            "enrollments": Enrollment.objects.count(),
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0006_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DashboardCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("students", models.BigIntegerField(default=0)),
+                ("instructors", models.BigIntegerField(default=0)),
+                ("active_courses", models.BigIntegerField(default=0)),
+                ("enrollments", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="enrollment_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,144 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def backfill_grades(apps, schema_editor):
+    # no course has a scheme yet, so every grade uses the default thresholds,
+    # which now include E; only the rows whose grade changes are written
+    Enrollment = apps.get_model("students", "Enrollment")
+    grade = models.Case(
+        models.When(score__isnull=True, then=models.Value("NA")),
+        models.When(score__gte=80, then=models.Value("A")),
+        models.When(score__gte=70, then=models.Value("B")),
+        models.When(score__gte=60, then=models.Value("C")),
+        models.When(score__gte=50, then=models.Value("D")),
+        models.When(score__gt=40, then=models.Value("E")),
+        default=models.Value("F"),
+    )
+    enrollments = Enrollment.objects.order_by("pk")
+    last_pk = 0
+    while True:
+        upper = enrollments.filter(pk__gt=last_pk).values_list("pk", flat=True)[
+            BATCH_SIZE - 1 : BATCH_SIZE
+        ]
+        chunk = enrollments.filter(pk__gt=last_pk)
+        if upper:
+            chunk = chunk.filter(pk__lte=upper[0])
+        chunk.exclude(grade=grade).update(grade=grade)
+        if not upper:
+            break
+        last_pk = upper[0]
+
+
+class Migration(migrations.Migration):
+    # the grades are backfilled in chunks that commit one by one
+    atomic = False
+
+    replaces = [
+        ("students", "0008_enrollment_generated_grade"),
+        ("students", "0009_grading_schemes"),
+    ]
+
+    dependencies = [
+        ("students", "0007_dashboardcounter"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # choices and editable only, the column is not rewritten
+        migrations.AlterField(
+            model_name="enrollment",
+            name="grade",
+            field=models.CharField(
+                choices=[
+                    ("A", "A"),
+                    ("B", "B"),
+                    ("C", "C"),
+                    ("D", "D"),
+                    ("E", "E"),
+                    ("F", "F"),
+                    ("NA", "Not Applicable"),
+                ],
+                default="NA",
+                editable=False,
+                max_length=2,
+            ),
+        ),
+        migrations.RunPython(backfill_grades, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="GradingScheme",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("name", models.CharField(max_length=100, unique=True)),
+                (
+                    "a_min",
+                    models.DecimalField(decimal_places=2, default=80, max_digits=5),
+                ),
+                (
+                    "b_min",
+                    models.DecimalField(decimal_places=2, default=70, max_digits=5),
+                ),
+                (
+                    "c_min",
+                    models.DecimalField(decimal_places=2, default=60, max_digits=5),
+                ),
+                (
+                    "d_min",
+                    models.DecimalField(decimal_places=2, default=50, max_digits=5),
+                ),
+                (
+                    "pass_mark",
+                    models.DecimalField(decimal_places=2, default=40, max_digits=5),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_created",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_updated",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="grading_scheme",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="courses",
+                to="students.gradingscheme",
+            ),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_statistics(apps, schema_editor):
+    # the aggregates live on the model, which historical models do not have;
+    # they only read the ids, scores and grades, which this state already has
+    from students.models import CourseStatistics
+
+    CourseStatistics.refresh()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0008_squashed_0009_grading_schemes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourseStatistics",
+            fields=[
+                (
+                    "course",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="statistics",
+                        serialize=False,
+                        to="students.course",
+                    ),
+                ),
+                ("enrollments", models.IntegerField(default=0)),
+                ("scored", models.IntegerField(default=0)),
+                (
+                    "mean",
+                    models.DecimalField(decimal_places=2, max_digits=5, null=True),
+                ),
+                (
+                    "minimum",
+                    models.DecimalField(decimal_places=2, max_digits=5, null=True),
+                ),
+                ("p25", models.DecimalField(decimal_places=2, max_digits=5, null=True)),
+                (
+                    "median",
+                    models.DecimalField(decimal_places=2, max_digits=5, null=True),
+                ),
+                ("p75", models.DecimalField(decimal_places=2, max_digits=5, null=True)),
+                ("p90", models.DecimalField(decimal_places=2, max_digits=5, null=True)),
+                (
+                    "maximum",
+                    models.DecimalField(decimal_places=2, max_digits=5, null=True),
+                ),
+                ("grade_counts", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "course statistics",
+            },
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
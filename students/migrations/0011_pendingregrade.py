@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("students", "0010_coursestatistics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingRegrade",
+            fields=[
+                (
+                    "course",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="pending_regrade",
+                        serialize=False,
+                        to="students.course",
+                    ),
+                ),
+                ("requested_at", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -1,4 +1,13 @@
-from django.db import models
+from decimal import Decimal
+from functools import partial
+from itertools import groupby
+
+from django.db import connections, models, transaction
+from django.db.models import Avg, Count, F, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual, IsNull
+from django.utils import timezone
+from common.cache import bump_generation
 from common.models import BaseModel, MetaData
 
 from django.contrib.auth import get_user_model
@@ -17,6 +26,9 @@ class Student(BaseModel):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),
+        ]
 
     @property
     def first_name(self):
@@ -27,17 +39,258 @@ class Student(BaseModel):
         return self.user.last_name
 
 
+class GradingScheme(BaseModel):
+    """
+    Score thresholds for the letter grades of a course. A score of at least
+    `a_min` is an A, and so on down to D; anything above the pass mark is an
+    E and the rest is an F. Courses without a scheme use the field defaults.
+    """
+
+    BANDS = [("A", "a_min"), ("B", "b_min"), ("C", "c_min"), ("D", "d_min")]
+
+    name = models.CharField(max_length=100, unique=True)
+    a_min = models.DecimalField(max_digits=5, decimal_places=2, default=80)
+    b_min = models.DecimalField(max_digits=5, decimal_places=2, default=70)
+    c_min = models.DecimalField(max_digits=5, decimal_places=2, default=60)
+    d_min = models.DecimalField(max_digits=5, decimal_places=2, default=50)
+    pass_mark = models.DecimalField(max_digits=5, decimal_places=2, default=40)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ["name"]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so that a regrade only runs when a threshold changes
+        instance._loaded_thresholds = instance.thresholds
+        return instance
+
+    @property
+    def thresholds(self):
+        return tuple(getattr(self, field) for _, field in self.BANDS) + (
+            self.pass_mark,
+        )
+
+    def grade_for(self, score):
+        if score is None:
+            return "NA"
+        for grade, field in self.BANDS:
+            if score >= getattr(self, field):
+                return grade
+        return "E" if score > self.pass_mark else "F"
+
+    @classmethod
+    def grade_expression(cls, score, scheme=None, course=OuterRef("course_id")):
+        """
+        SQL version of `grade_for` over the `score` expression. The thresholds
+        are literals when `scheme` is given, otherwise they are looked up from
+        the scheme of `course` (the row's own course by default), so a single
+        UPDATE can grade rows of several courses.
+        """
+        if not hasattr(score, "resolve_expression"):
+            score = models.Value(score)
+
+        def threshold(field):
+            if scheme is not None:
+                return models.Value(getattr(scheme, field))
+            schemes = Course.objects.filter(pk=course).values(
+                f"grading_scheme__{field}"
+            )
+            default = cls._meta.get_field(field).default
+            return Coalesce(
+                Subquery(schemes[:1]),
+                models.Value(default),
+                output_field=models.DecimalField(),
+            )
+
+        return models.Case(
+            models.When(IsNull(score, True), then=models.Value("NA")),
+            *[
+                models.When(
+                    GreaterThanOrEqual(score, threshold(field)),
+                    then=models.Value(grade),
+                )
+                for grade, field in cls.BANDS
+            ],
+            models.When(
+                GreaterThan(score, threshold("pass_mark")), then=models.Value("E")
+            ),
+            default=models.Value("F"),
+            output_field=models.CharField(),
+        )
+
+    def regrade(self, batch_size=None, progress=None):
+        enrollments = Enrollment.objects.filter(course__grading_scheme=self)
+        return enrollments.regrade(
+            scheme=self, batch_size=batch_size, progress=progress
+        )
+
+
 class Course(BaseModel):
     name = models.CharField(max_length=100, db_index=True)
     code = models.CharField(max_length=100, unique=True)  # code is indexed by default
     description = models.TextField()
     metadata = models.ManyToManyField(MetaData, blank=True, related_name="courses")
+    grading_scheme = models.ForeignKey(
+        GradingScheme,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="courses",
+    )
+    # maintained by students.signals, see DashboardCounter
+    enrollment_count = models.IntegerField(default=0, editable=False)
 
     def __str__(self):
         return str(self.code)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so that a change of scheme regrades the course on save
+        instance._loaded_grading_scheme_id = instance.__dict__.get("grading_scheme_id")
+        return instance
+
+    def regrade(self, batch_size=None, progress=None):
+        return self.enrollments.all().regrade(
+            scheme=self.grading_scheme or GradingScheme(),
+            batch_size=batch_size,
+            progress=progress,
+        )
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),
+        ]
+
+
+class PendingRegrade(models.Model):
+    """
+    A course whose enrollments have to be regraded after a change of grading
+    scheme, queued by students.signals in the transaction of the change.
+    Courses of up to INLINE_LIMIT enrollments are regraded as soon as it
+    commits, the larger ones by `manage.py regrade_enrollments --pending`,
+    so a request never regrades more than that.
+    """
+
+    INLINE_LIMIT = 20000
+
+    course = models.OneToOneField(
+        Course,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="pending_regrade",
+    )
+    requested_at = models.DateTimeField()
+
+    @classmethod
+    def request(cls, course_ids):
+        requested_at = timezone.now()
+        cls.objects.bulk_create(
+            [cls(course_id=pk, requested_at=requested_at) for pk in course_ids],
+            update_conflicts=True,
+            unique_fields=["course"],
+            update_fields=["requested_at"],
+        )
+
+    @classmethod
+    def process(cls, course_ids=None, limit=None, batch_size=None, progress=None):
+        """
+        Regrade the queued courses, the oldest request first, optionally only
+        those of `course_ids` and only as many as fit in `limit` enrollments.
+        Returns the courses that were regraded.
+        """
+        pending = cls.objects.select_related("course__grading_scheme").order_by(
+            "requested_at"
+        )
+        if course_ids is not None:
+            pending = pending.filter(course__in=course_ids)
+        regraded = []
+        for request in pending:
+            course = request.course
+            if limit is not None:
+                if course.enrollment_count > limit:
+                    continue
+                limit -= course.enrollment_count
+            course.regrade(batch_size=batch_size, progress=progress)
+            # a change made while it ran has queued it again, keep that one
+            cls.objects.filter(
+                pk=request.pk, requested_at=request.requested_at
+            ).delete()
+            regraded.append(course)
+        return regraded
+
+
+class EnrollmentQuerySet(models.QuerySet):
+    REGRADE_BATCH_SIZE = 5000
+
+    def update(self, **kwargs):
+        # the grade follows the score and the course's scheme in the same UPDATE
+        if "grade" not in kwargs and kwargs.keys() & {"score", "course", "course_id"}:
+            course = kwargs.get(
+                "course", kwargs.get("course_id", OuterRef("course_id"))
+            )
+            kwargs["grade"] = GradingScheme.grade_expression(
+                kwargs.get("score", F("score")), course=course
+            )
+            # the cached list rows are keyed on updated_at
+            kwargs.setdefault("updated_at", timezone.now())
+        # a bulk write sends no signals, see common.signals
+        transaction.on_commit(partial(bump_generation, Enrollment))
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        course_ids = {obj.course_id for obj in objs}
+        schemes = {
+            course.pk: course.grading_scheme or GradingScheme()
+            for course in Course.objects.filter(pk__in=course_ids).select_related(
+                "grading_scheme"
+            )
+        }
+        for obj in objs:
+            obj.grade = schemes[obj.course_id].grade_for(obj.score)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    bulk_create.alters_data = True
+
+    def regrade(self, scheme=None, batch_size=None, progress=None):
+        """
+        Recompute the grade of every enrollment in the queryset with one
+        `UPDATE ... SET grade = CASE ...` per chunk of `batch_size` rows, in
+        primary key order. Each chunk commits on its own when not run inside a
+        transaction, so the row locks of a large course are held briefly.
+
+        Only the rows whose grade changes are written (and get a new
+        `updated_at`). `progress(done, total)` is called after every chunk.
+        Returns the number of rows whose grade changed.
+        """
+        batch_size = batch_size or self.REGRADE_BATCH_SIZE
+        grade = GradingScheme.grade_expression(F("score"), scheme=scheme)
+        queryset = self.order_by("pk")
+        total = queryset.count()
+        done = changed = last_pk = 0
+        while done < total:
+            remaining = queryset.filter(pk__gt=last_pk)
+            upper = remaining.values_list("pk", flat=True)[batch_size - 1 : batch_size]
+            chunk = remaining.filter(pk__lte=upper[0]) if upper else remaining
+            changed += chunk.exclude(grade=grade).update(
+                grade=grade, updated_at=timezone.now()
+            )
+            done = min(done + batch_size, total) if upper else total
+            if progress:
+                progress(done, total)
+            if not upper:
+                break
+            last_pk = upper[0]
+        CourseStatistics.refresh(self.order_by().values("course_id"))
+        return changed
 
 
 class Enrollment(BaseModel):
@@ -47,6 +300,7 @@ class Enrollment(BaseModel):
         ("B", "B"),
         ("C", "C"),
         ("D", "D"),
+        ("E", "E"),
         ("F", "F"),
         ("NA", "Not Applicable"),
     ]
@@ -66,7 +320,13 @@ class Enrollment(BaseModel):
         validators=[validate_score],
     )
     metadata = models.ManyToManyField(MetaData, blank=True, related_name="enrollments")
-    grade = models.CharField(max_length=2, choices=GRADE_CHOICES, default="NA")
+    # derived from the score and the course's grading scheme on save(),
+    # bulk_create(), update() and bulk_update(), see EnrollmentQuerySet
+    grade = models.CharField(
+        max_length=2, choices=GRADE_CHOICES, default="NA", editable=False
+    )
+
+    objects = EnrollmentQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -77,37 +337,25 @@ class Enrollment(BaseModel):
         ordering = ["-enrollment_date"]
         indexes = [
             models.Index(fields=["student", "course"]),
+            models.Index(fields=["-enrollment_date", "-id"]),
         ]
 
     def __str__(self):
         return f"{self.student} -> {self.course}"
 
-    # although  grade is a computed property, we keep
-    # it in the model for historical reasons also, this makes it
-    # much easier to query for students with a specific grade and
-    # and to save the grade, we retrieve the grade via grade_score
-    # so it is the responsibility of the application logic to set
-    # the grade field consistent with the score field
-
-    @property
-    def grade_score(self):
-        if self.score is None:
-            return "NA"
-        elif self.score >= 80:
-            return "A"
-        elif self.score >= 70:
-            return "B"
-        elif self.score >= 60:
-            return "C"
-        elif self.score >= 50:
-            return "D"
-        elif self.score > 40:
-            return "E"
-        else:
-            return "F"
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so that a change of course can be counted on save
+        instance._loaded_course_id = instance.__dict__.get("course_id")
+        return instance
 
     def save(self, *args, **kwargs):
-        self.grade = self.grade_score
+        scheme = self.course.grading_scheme or GradingScheme()
+        self.grade = scheme.grade_for(self.score)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "grade" not in update_fields:
+            kwargs["update_fields"] = {*update_fields, "grade"}
         super().save(*args, **kwargs)
 
 
@@ -123,6 +371,9 @@ class Instructor(BaseModel):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),
+        ]
 
     @property
     def first_name(self):
@@ -131,3 +382,191 @@ class Instructor(BaseModel):
     @property
     def last_name(self):
         return self.user.last_name
+
+
+class DashboardCounter(models.Model):
+    """
+    Single row holding the dashboard totals. It is kept in step with
+    Student, Course, Instructor and Enrollment writes by students.signals,
+    so the dashboard reads one row instead of aggregating over the tables.
+    Bulk writes bypass the signals, run `manage.py reconcile_counters` after them.
+    """
+
+    students = models.BigIntegerField(default=0)
+    instructors = models.BigIntegerField(default=0)
+    active_courses = models.BigIntegerField(default=0)
+    enrollments = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def load(cls):
+        counter, _ = cls.objects.get_or_create(pk=1)
+        return counter
+
+    @classmethod
+    def add(cls, **deltas):
+        deltas = {name: F(name) + delta for name, delta in deltas.items() if delta}
+        if deltas:
+            cls.objects.filter(pk=1).update(**deltas)
+
+    @classmethod
+    @transaction.atomic
+    def reconcile(cls):
+        # holding the row lock makes concurrent writers wait for us, so their
+        # deltas apply on top of the recomputed totals instead of being lost
+        cls.objects.get_or_create(pk=1)
+        counter = cls.objects.select_for_update().get(pk=1)
+
+        enrollment_counts = (
+            Enrollment.objects.filter(course=OuterRef("pk"))
+            .order_by()
+            .values("course")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        Course.objects.update(enrollment_count=Coalesce(Subquery(enrollment_counts), 0))
+
+        counter.students = Student.objects.filter(user__is_active=True).count()
+        counter.instructors = Instructor.objects.filter(user__is_active=True).count()
+        counter.active_courses = Course.objects.filter(enrollment_count__gt=0).count()
+        counter.enrollments = Enrollment.objects.count()
+        counter.save()
+        return counter
+
+
+class PercentileCont(models.Aggregate):
+    """PostgreSQL's continuous percentile, interpolated between the two closest values."""
+
+    function = "PERCENTILE_CONT"
+    name = "PercentileCont"
+    template = "%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = models.FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def percentile(scores, fraction):
+    """Same interpolation as PERCENTILE_CONT over the sorted `scores`."""
+    position = (len(scores) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(scores) - 1)
+    return scores[lower] + (scores[upper] - scores[lower]) * Decimal(position - lower)
+
+
+class CourseStatistics(models.Model):
+    """
+    Score statistics of a course, one row per course, so that the course page
+    reads them in O(1) whatever the class size. The row of a course is
+    recomputed after commit when one of its enrollments is saved or deleted,
+    and for every course by `manage.py refresh_course_statistics`.
+    """
+
+    PERCENTILES = {"p25": 0.25, "median": 0.5, "p75": 0.75, "p90": 0.9}
+
+    course = models.OneToOneField(
+        Course, on_delete=models.CASCADE, primary_key=True, related_name="statistics"
+    )
+    enrollments = models.IntegerField(default=0)
+    scored = models.IntegerField(default=0)
+    mean = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    minimum = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    p25 = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    median = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    p75 = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    p90 = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    maximum = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    grade_counts = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "course statistics"
+
+    def __str__(self):
+        return f"Statistics of {self.course_id}"
+
+    @property
+    def histogram(self):
+        """(grade, count, percent of the enrollments) in GRADE_CHOICES order."""
+        total = self.enrollments or 1
+        return [
+            (
+                grade,
+                self.grade_counts.get(grade, 0),
+                100 * self.grade_counts.get(grade, 0) // total,
+            )
+            for grade, _ in Enrollment.GRADE_CHOICES
+        ]
+
+    @staticmethod
+    def _score_statistics(enrollments):
+        """Aggregate the scores per course, {course id: {field: value}}."""
+        scored = enrollments.filter(score__isnull=False).order_by()
+        aggregates = {
+            "scored": Count("pk"),
+            "mean": Avg("score"),
+            "minimum": Min("score"),
+            "maximum": Max("score"),
+        }
+        if connections[enrollments.db].vendor == "postgresql":
+            for name, fraction in CourseStatistics.PERCENTILES.items():
+                aggregates[name] = PercentileCont("score", fraction)
+            rows = scored.values("course_id").annotate(**aggregates)
+            return {row.pop("course_id"): row for row in rows}
+
+        # other databases (SQLite in tests) have no percentile aggregate
+        rows = scored.values("course_id").annotate(**aggregates)
+        statistics = {row.pop("course_id"): row for row in rows}
+        scores = scored.order_by("course_id", "score").values_list("course_id", "score")
+        for course_id, group in groupby(scores, key=lambda row: row[0]):
+            values = [score for _, score in group]
+            for name, fraction in CourseStatistics.PERCENTILES.items():
+                statistics[course_id][name] = percentile(values, fraction)
+        return statistics
+
+    @classmethod
+    def refresh(cls, course_ids=None):
+        """
+        Recompute the statistics of `course_ids` (a list or a queryset of ids),
+        or of every course, with one aggregate query for the scores and one for
+        the grades.
+        """
+        courses = Course.objects.all()
+        if course_ids is not None:
+            courses = courses.filter(pk__in=course_ids)
+        course_ids = list(courses.values_list("pk", flat=True))
+        if not course_ids:
+            return
+
+        enrollments = Enrollment.objects.filter(course_id__in=course_ids)
+        scores = cls._score_statistics(enrollments)
+        grade_counts = {course_id: {} for course_id in course_ids}
+        grades = (
+            enrollments.order_by()
+            .values_list("course_id", "grade")
+            .annotate(count=Count("pk"))
+        )
+        for course_id, grade, count in grades:
+            grade_counts[course_id][grade] = count
+
+        statistics = []
+        for course_id in course_ids:
+            row = cls(course_id=course_id, grade_counts=grade_counts[course_id])
+            row.enrollments = sum(row.grade_counts.values())
+            for name, value in scores.get(course_id, {}).items():
+                if name != "scored" and value is not None:
+                    value = Decimal(value).quantize(Decimal("0.01"))
+                setattr(row, name, value)
+            statistics.append(row)
+
+        fields = [
+            field.name
+            for field in cls._meta.concrete_fields
+            if not field.primary_key and field.name != "updated_at"
+        ]
+        cls.objects.bulk_create(
+            statistics,
+            update_conflicts=True,
+            unique_fields=["course"],
+            update_fields=[*fields, "updated_at"],
+        )
@@ -0,0 +1,175 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from common.cache import bump_generation
+
+from students.models import (
+    Course,
+    CourseStatistics,
+    DashboardCounter,
+    Enrollment,
+    GradingScheme,
+    Instructor,
+    PendingRegrade,
+    Student,
+)
+
+User = get_user_model()
+
+
+def course_enrolled(course_id, delta):
+    """
+    Move the enrollment count of a course by `delta`, and the active course
+    total when the course gains its first or loses its last enrollments.
+
+    The conditional UPDATE takes the row lock before checking the boundary, so
+    two concurrent writers cannot both see the course as empty (or as holding
+    its last enrollment).
+    """
+    boundary = 0 if delta > 0 else -delta
+    courses = Course.objects.filter(pk=course_id)
+    if courses.filter(enrollment_count=boundary).update(
+        enrollment_count=boundary + delta
+    ):
+        DashboardCounter.add(active_courses=delta)
+    else:
+        courses.update(enrollment_count=F("enrollment_count") + delta)
+
+
+def refresh_statistics(*course_ids):
+    """
+    Refresh the statistics of the courses once the transaction commits. The
+    courses of all the writes of a transaction are refreshed together by the
+    first of their callbacks, the later ones find nothing left to do.
+    """
+    connection = transaction.get_connection()
+    if not hasattr(connection, "pending_statistics"):
+        connection.pending_statistics = set()
+    # the courses of a rolled back transaction stay in the set, and are just
+    # refreshed once more after the next commit
+    connection.pending_statistics.update(course_ids)
+    transaction.on_commit(
+        partial(refresh_pending_statistics, connection.pending_statistics)
+    )
+
+
+def refresh_pending_statistics(pending):
+    if pending:
+        course_ids = set(pending)
+        pending.clear()
+        CourseStatistics.refresh(course_ids)
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, created, **kwargs):
+    if created and instance.user.is_active:
+        DashboardCounter.add(students=1)
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    if instance.user.is_active:
+        DashboardCounter.add(students=-1)
+
+
+@receiver(post_save, sender=Instructor)
+def instructor_saved(sender, instance, created, **kwargs):
+    if created and instance.user.is_active:
+        DashboardCounter.add(instructors=1)
+
+
+@receiver(post_delete, sender=Instructor)
+def instructor_deleted(sender, instance, **kwargs):
+    if instance.user.is_active:
+        DashboardCounter.add(instructors=-1)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    was_active = getattr(instance, "_loaded_is_active", None)
+    instance._loaded_is_active = instance.is_active
+    if created or was_active is None or was_active == instance.is_active:
+        return
+    delta = 1 if instance.is_active else -1
+    DashboardCounter.add(
+        students=delta if Student.objects.filter(user=instance).exists() else 0,
+        instructors=delta if Instructor.objects.filter(user=instance).exists() else 0,
+    )
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, created, **kwargs):
+    # the list rows of the profiles (and of their enrollments) show the name
+    # of the user, but are cached by the profile's updated_at
+    previous = getattr(instance, "_loaded_name", None)
+    instance._loaded_name = (instance.first_name, instance.last_name)
+    if created or previous == instance._loaded_name:
+        return
+    now = timezone.now()
+    for model in (Student, Instructor):
+        if model.objects.filter(user=instance).update(updated_at=now):
+            transaction.on_commit(partial(bump_generation, model))
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, created, **kwargs):
+    previous_course_id = getattr(instance, "_loaded_course_id", None)
+    instance._loaded_course_id = instance.course_id
+    if created:
+        DashboardCounter.add(enrollments=1)
+        course_enrolled(instance.course_id, 1)
+    elif previous_course_id and previous_course_id != instance.course_id:
+        course_enrolled(previous_course_id, -1)
+        course_enrolled(instance.course_id, 1)
+        refresh_statistics(previous_course_id)
+    refresh_statistics(instance.course_id)
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    DashboardCounter.add(enrollments=-1)
+    course_enrolled(instance.course_id, -1)
+    refresh_statistics(instance.course_id)
+
+
+def regrade(course_ids):
+    """
+    Queue the courses for regrading with the change that calls this, and
+    regrade on commit those that fit in PendingRegrade.INLINE_LIMIT.
+    """
+    course_ids = list(course_ids)
+    if course_ids:
+        PendingRegrade.request(course_ids)
+        transaction.on_commit(
+            partial(
+                PendingRegrade.process, course_ids, limit=PendingRegrade.INLINE_LIMIT
+            )
+        )
+
+
+@receiver(post_save, sender=GradingScheme)
+def grading_scheme_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_loaded_thresholds", None)
+    instance._loaded_thresholds = instance.thresholds
+    if not created and previous != instance.thresholds:
+        regrade(instance.courses.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=GradingScheme)
+def grading_scheme_deleted(sender, instance, **kwargs):
+    # the courses fall back to the default scheme once SET_NULL has run
+    regrade(instance.courses.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_loaded_grading_scheme_id", None)
+    instance._loaded_grading_scheme_id = instance.grading_scheme_id
+    if not created and previous != instance.grading_scheme_id:
+        regrade([instance.pk])
@@ -1,7 +1,34 @@
+import json
+import tempfile
+import threading
+from io import BytesIO, StringIO, TextIOWrapper
+from unittest.mock import patch
 from django.contrib.auth import get_user_model
-from students.models import Instructor, Student, Course, Enrollment
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from students.models import (
+    Course,
+    CourseStatistics,
+    DashboardCounter,
+    Enrollment,
+    GradingScheme,
+    Instructor,
+    PendingRegrade,
+    Student,
+)
+from django.core.cache import cache
+from django.test import LiveServerTestCase, override_settings
 from django.urls import reverse
-from common.tests import BaseTestCase
+from common.cache import generations
+from common.catalog import metadata_catalog
+from common.instrumentation import query_wrapper
+from common.sessions import SessionStore
+from common.models import MetaData
+from common.tests import AsyncBaseTestCase, BaseTestCase
+from students.forms import course_label
+from students.importers import import_enrollments
+from students.loadtest import run, summarize
 
 User = get_user_model()
 
@@ -84,6 +111,15 @@ class CourseTestCase(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "students/course_list.html")
 
+    def test_course_list_search(self):
+        Course.objects.create(name="Math 101", code="MTH101", description="Basic Math")
+        Course.objects.create(name="Physics", code="PHY101", description="Mechanics")
+        self.client.force_login(self.user)
+        url = reverse("students:courses-list")
+        response = self.client.get(url, {"q": "math"})
+        codes = [course.code for course in response.context["page_obj"]]
+        self.assertEqual(codes, ["MTH101"])
+
     def test_course_detail_view(self):
         course = Course.objects.create(
             name="Math 101", code="MTH101", description="Basic Math"
@@ -247,9 +283,7 @@ class EnrollmentTestCase(BaseTestCase):
         course = Course.objects.create(
             name="Math 101", code="MTH101", description="Basic Math"
         )
-        Enrollment.objects.create(
-            student=student, course=course, score=85.00, grade="A"
-        )
+        Enrollment.objects.create(student=student, course=course, score=85.00)
         self.client.force_login(self.user)
         url = reverse("students:enrollments-list")
         response = self.client.get(url)
@@ -262,7 +296,7 @@ class EnrollmentTestCase(BaseTestCase):
             name="Math 101", code="MTH101", description="Basic Math"
         )
         enrollment = Enrollment.objects.create(
-            student=student, course=course, score=85.00, grade="A"
+            student=student, course=course, score=85.00
         )
         self.client.force_login(self.user)
         url = reverse("students:enrollments-detail", kwargs={"pk": enrollment.pk})
@@ -296,7 +330,7 @@ class EnrollmentTestCase(BaseTestCase):
             name="Math 101", code="MTH101", description="Basic Math"
         )
         enrollment = Enrollment.objects.create(
-            student=student, course=course, score=85.00, grade="A"
+            student=student, course=course, score=85.00
         )
         url = reverse("students:enrollments-update", kwargs={"pk": enrollment.pk})
         data = {
@@ -317,9 +351,805 @@ class EnrollmentTestCase(BaseTestCase):
             name="Math 101", code="MTH101", description="Basic Math"
         )
         enrollment = Enrollment.objects.create(
-            student=student, course=course, score=85.00, grade="A"
+            student=student, course=course, score=85.00
         )
         url = reverse("students:enrollments-delete", kwargs={"pk": enrollment.pk})
         response = self.client.post(url)
         self.assertEqual(response.status_code, 302)
         self.assertFalse(Enrollment.objects.filter(pk=enrollment.pk).exists())
+
+    def test_enrollment_list_cursor_pagination(self):
+        self.client.force_login(self.admin)
+        student = Student.objects.create(user=self.user, date_of_birth="2000-01-01")
+        for code in ["MTH101", "PHY101", "CHEM101"]:
+            course = Course.objects.create(name=code, code=code, description=code)
+            Enrollment.objects.create(student=student, course=course, score=50)
+        url = reverse("students:enrollments-list")
+        response = self.client.get(url, {"limit": 2})
+        page_obj = response.context["page_obj"]
+        self.assertEqual(len(page_obj), 2)
+        self.assertTrue(page_obj.has_next())
+
+        response = self.client.get(url, {"limit": 2, "cursor": page_obj.next_cursor})
+        next_page = response.context["page_obj"]
+        self.assertEqual(len(next_page), 1)
+        self.assertFalse(next_page.has_next())
+        seen = {e.pk for e in page_obj} | {e.pk for e in next_page}
+        self.assertEqual(seen, set(Enrollment.objects.values_list("pk", flat=True)))
+
+
+class DashboardCounterTestCase(BaseTestCase):
+    def assertCounters(self, **expected):
+        counter = DashboardCounter.load()
+        actual = {name: getattr(counter, name) for name in expected}
+        self.assertEqual(actual, expected)
+
+    def test_counters_follow_writes(self):
+        student = Student.objects.create(user=self.user, date_of_birth="2000-01-01")
+        Instructor.objects.create(user=self.admin)
+        math = Course.objects.create(name="Math", code="MTH101", description="Math")
+        physics = Course.objects.create(name="Physics", code="PHY101", description="")
+        self.assertCounters(students=1, instructors=1, active_courses=0, enrollments=0)
+
+        enrollment = Enrollment.objects.create(student=student, course=math, score=70)
+        self.assertCounters(active_courses=1, enrollments=1)
+
+        enrollment.course = physics
+        enrollment.save()
+        self.assertCounters(active_courses=1, enrollments=1)
+        math.refresh_from_db()
+        physics.refresh_from_db()
+        self.assertEqual((math.enrollment_count, physics.enrollment_count), (0, 1))
+
+        physics.delete()
+        self.assertCounters(active_courses=0, enrollments=0)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertCounters(students=0, instructors=1)
+
+    def test_dashboard_reads_counters(self):
+        self.client.force_login(self.admin)
+        Student.objects.create(user=self.user, date_of_birth="2000-01-01")
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.context["total_students"], 1)
+
+    def test_reconcile_command(self):
+        student = Student.objects.create(user=self.user, date_of_birth="2000-01-01")
+        course = Course.objects.create(name="Math", code="MTH101", description="Math")
+        Enrollment.objects.bulk_create(
+            [Enrollment(student=student, course=course, score=70)]
+        )
+        self.assertCounters(enrollments=0, active_courses=0)
+        call_command("reconcile_counters", stdout=StringIO())
+        self.assertCounters(students=1, enrollments=1, active_courses=1)
+
+
+class GradingSchemeTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = Student.objects.create(
+            user=self.user, date_of_birth="2000-01-01"
+        )
+        self.course = Course.objects.create(
+            name="Math", code="MTH101", description="Math"
+        )
+
+    def test_default_thresholds(self):
+        grades = {
+            None: "NA",
+            80: "A",
+            79.99: "B",
+            60: "C",
+            50: "D",
+            40.01: "E",
+            40: "F",
+        }
+        for score, grade in grades.items():
+            enrollment = Enrollment.objects.create(
+                student=self.student, course=self.course, score=score
+            )
+            self.assertEqual(enrollment.grade, grade)
+            enrollment.delete()
+
+    def test_set_based_writes_follow_the_scheme(self):
+        self.course.grading_scheme = GradingScheme.objects.create(
+            name="Strict", a_min=90
+        )
+        self.course.save()
+        Enrollment.objects.bulk_create(
+            [Enrollment(student=self.student, course=self.course, score=85)]
+        )
+        enrollments = Enrollment.objects.filter(course=self.course)
+        self.assertEqual(enrollments.get().grade, "B")
+
+        enrollments.update(score=95)
+        self.assertEqual(enrollments.get().grade, "A")
+        enrollment = enrollments.get()
+        enrollment.score = 45
+        Enrollment.objects.bulk_update([enrollment], ["score"])
+        self.assertEqual(enrollments.get().grade, "E")
+
+    def test_scheme_change_regrades_in_chunks(self):
+        scheme = GradingScheme.objects.create(name="Curve")
+        users = [self.user, self.admin]
+        for user, score in zip(users, [75, 65]):
+            student, _ = Student.objects.get_or_create(user=user)
+            Enrollment.objects.create(student=student, course=self.course, score=score)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.grading_scheme = scheme
+            self.course.save()
+
+        progress = []
+        with self.captureOnCommitCallbacks(execute=True):
+            scheme.b_min = 60
+            scheme.save()
+        self.assertEqual(
+            sorted(self.course.enrollments.values_list("grade", flat=True)),
+            ["B", "B"],
+        )
+
+        scheme.b_min = scheme.c_min = 70
+        scheme.save()
+        scheme.regrade(batch_size=1, progress=lambda *args: progress.append(args))
+        self.assertEqual(progress, [(1, 2), (2, 2)])
+        self.assertEqual(
+            sorted(self.course.enrollments.values_list("grade", flat=True)),
+            ["B", "D"],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            scheme.delete()
+        self.assertEqual(
+            sorted(self.course.enrollments.values_list("grade", flat=True)),
+            ["B", "C"],
+        )
+
+    def test_large_courses_are_regraded_by_the_command(self):
+        for user, score in zip([self.user, self.admin], [75, 65]):
+            student, _ = Student.objects.get_or_create(user=user)
+            Enrollment.objects.create(student=student, course=self.course, score=score)
+        self.course.refresh_from_db()
+        scheme = GradingScheme.objects.create(name="Curve", b_min=60)
+        with patch.object(PendingRegrade, "INLINE_LIMIT", 1):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.course.grading_scheme = scheme
+                self.course.save()
+        grades = self.course.enrollments.order_by("score").values_list(
+            "grade", flat=True
+        )
+        self.assertEqual(list(grades.all()), ["C", "B"])
+        self.assertTrue(PendingRegrade.objects.filter(course=self.course).exists())
+
+        out = StringIO()
+        call_command("regrade_enrollments", pending=True, stdout=out)
+        self.assertEqual(list(grades.all()), ["B", "B"])
+        self.assertFalse(PendingRegrade.objects.exists())
+        self.assertIn("1 queued courses regraded", out.getvalue())
+
+    def test_regrade_command(self):
+        Enrollment.objects.create(student=self.student, course=self.course, score=75)
+        Enrollment.objects.update(grade="F")
+        out = StringIO()
+        call_command("regrade_enrollments", course="MTH101", stdout=out)
+        self.assertEqual(Enrollment.objects.get().grade, "B")
+        self.assertIn("1/1 enrollments regraded", out.getvalue())
+
+
+class CourseStatisticsTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(4)
+        self.course = Course.objects.create(
+            name="Math", code="MTH101", description="Math"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for student, score in zip(Student.objects.all(), [50, 60, 70, None]):
+                Enrollment.objects.create(
+                    student=student, course=self.course, score=score
+                )
+
+    def test_refreshed_on_commit(self):
+        stats = CourseStatistics.objects.get(course=self.course)
+        self.assertEqual((stats.enrollments, stats.scored), (4, 3))
+        self.assertEqual((stats.mean, stats.median), (60, 60))
+        self.assertEqual((stats.p25, stats.p90), (55, 68))
+        self.assertEqual((stats.minimum, stats.maximum), (50, 70))
+        self.assertEqual(stats.grade_counts, {"B": 1, "C": 1, "D": 1, "NA": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.enrollments.filter(score=None).delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.enrollments, 3)
+        self.assertNotIn("NA", stats.grade_counts)
+
+    def test_refreshed_once_per_transaction(self):
+        other = Course.objects.create(name="Physics", code="PHY101", description="")
+        students = Student.objects.all()
+        with patch.object(
+            CourseStatistics, "refresh", wraps=CourseStatistics.refresh
+        ) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                for student in students:
+                    Enrollment.objects.create(student=student, course=other, score=90)
+                self.course.enrollments.filter(score=None).delete()
+        refresh.assert_called_once_with({self.course.pk, other.pk})
+        self.assertEqual(CourseStatistics.objects.get(course=other).enrollments, 4)
+        self.assertEqual(CourseStatistics.objects.get(course=self.course).scored, 3)
+
+    def test_refresh_command(self):
+        CourseStatistics.objects.all().delete()
+        call_command("refresh_course_statistics", stdout=StringIO())
+        self.assertEqual(CourseStatistics.objects.get(course=self.course).median, 60)
+
+    def test_course_detail(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("students:courses-detail", args=[self.course.pk])
+        )
+        self.assertContains(response, "90th percentile")
+        self.assertEqual(response.context["course"].statistics.mean, 60)
+
+
+class QueryBudgetTestCase(BaseTestCase):
+    """
+    The number of queries of a page must not depend on the number of rows,
+    a change that makes one of these fail is most likely an N+1 query.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def test_dashboard(self):
+        self.assertQueryBudget(3, reverse("dashboard"))
+
+    def test_list_views(self):
+        budgets = {
+            "students:list": 3,
+            "students:courses-list": 3,
+            "students:instructors-list": 3,
+            "students:enrollments-list": 3,
+            "common:metadata-list": 3,
+        }
+        for name, budget in budgets.items():
+            with self.subTest(name):
+                self.assertQueryBudget(budget, reverse(name), limit=20)
+
+    def test_detail_views(self):
+        self.seed(1)
+        objects = {
+            "students:detail": Student.objects.first(),
+            "students:courses-detail": Course.objects.first(),
+            "students:instructors-detail": Instructor.objects.first(),
+            "students:enrollments-detail": Enrollment.objects.first(),
+            "common:metadata-detail": MetaData.objects.first(),
+        }
+        for name, obj in objects.items():
+            with self.subTest(name):
+                self.assertQueryBudget(4, reverse(name, kwargs={"pk": obj.pk}))
+
+    def test_form_views(self):
+        self.seed(1)
+        metadata_catalog()
+        enrollment = Enrollment.objects.first()
+        instructor = Instructor.objects.first()
+        urls = {
+            reverse("students:enrollments-create"): 2,
+            reverse("students:enrollments-update", args=[enrollment.pk]): 6,
+            reverse("students:instructors-create"): 2,
+            reverse("students:instructors-update", args=[instructor.pk]): 6,
+        }
+        for url, budget in urls.items():
+            with self.subTest(url):
+                self.assertQueryBudget(budget, url)
+
+
+class BenchViewsTestCase(BaseTestCase):
+    def test_times_the_routes_at_each_scale(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            out = StringIO()
+            call_command(
+                "bench_views",
+                "--repeat=1",
+                "--routes=students:*",
+                "--scales=4,8",
+                f"--output={output.name}",
+                stdout=out,
+            )
+            run = json.load(output)
+            self.assertEqual(list(run["scales"]), ["4", "8"])
+            routes = run["scales"]["8"]
+            self.assertNotIn("students:delete", routes)
+            self.assertEqual(routes["students:list"]["status"], 200)
+            self.assertEqual(routes["students:list"]["queries"], 3)
+            self.assertGreater(routes["students:list"]["template_ms"], 0)
+            self.assertIn("growth relative to 4 enrollments", out.getvalue())
+
+            out = StringIO()
+            call_command(
+                "bench_views",
+                "--repeat=1",
+                "--routes=students:list",
+                f"--compare={output.name}",
+                stdout=out,
+            )
+            self.assertIn("compared with the baseline", out.getvalue())
+
+    def test_top_up_to_a_scale_generated_before(self):
+        options = ["--repeat=1", "--routes=dashboard", "--scales=4"]
+        call_command("bench_views", *options, stdout=StringIO())
+        Enrollment.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, "'bench4' already exists"):
+            call_command("bench_views", *options, stdout=StringIO())
+
+
+@override_settings(ROOT_URLCONF="core.asgi_urls")
+class AsyncViewsTestCase(AsyncBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(2)
+
+    async def test_read_pages(self):
+        await self.async_client.aforce_login(self.admin)
+        student = await Student.objects.afirst()
+        course = await Course.objects.afirst()
+        instructor = await Instructor.objects.afirst()
+        enrollment = await Enrollment.objects.afirst()
+        pages = {
+            reverse("dashboard"): "dashboard.html",
+            reverse("students:list"): "students/student_list.html",
+            reverse("students:detail", args=[student.pk]): (
+                "students/student_detail.html"
+            ),
+            reverse("students:courses-list"): "students/course_list.html",
+            reverse("students:courses-detail", args=[course.pk]): (
+                "students/course_detail.html"
+            ),
+            reverse("students:instructors-list"): "students/instructor_list.html",
+            reverse("students:instructors-detail", args=[instructor.pk]): (
+                "students/instructor_detail.html"
+            ),
+            reverse("students:enrollments-list"): "students/enrollment_list.html",
+            reverse("students:enrollments-detail", args=[enrollment.pk]): (
+                "students/enrollment_detail.html"
+            ),
+        }
+        for url, template in pages.items():
+            with self.subTest(url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTemplateUsed(response, template)
+        response = await self.async_client.get(reverse("students:detail", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_visibility_rules(self):
+        student = await Student.objects.acreate(user=self.user)
+        other = await Student.objects.exclude(pk=student.pk).afirst()
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("students:list"))
+        self.assertEqual(list(response.context["students"]), [student])
+        response = await self.async_client.get(
+            reverse("students:detail", args=[other.pk])
+        )
+        self.assertEqual(response.status_code, 403)
+
+    async def test_queries_run_in_the_shared_threads(self):
+        # none in the thread of the request, which would keep its connection
+        # until the response is sent
+        queries, sessions = [], []
+        load = SessionStore.load
+
+        def record_query(execute, sql, params, many, context):
+            queries.append(threading.current_thread().name)
+            return execute(sql, params, many, context)
+
+        def record_session(session):
+            sessions.append(threading.current_thread().name)
+            return load(session)
+
+        await self.async_client.aforce_login(self.admin)
+        with query_wrapper(record_query), patch.object(
+            SessionStore, "load", record_session
+        ):
+            response = await self.async_client.get(reverse("students:list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(sessions), 1)
+        self.assertTrue(queries)
+        for name in queries + sessions:
+            self.assertTrue(name.startswith("in-thread"), name)
+
+    async def test_login_required(self):
+        response = await self.async_client.get(reverse("students:list"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_write_pages_stay_sync(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("students:create"))
+        self.assertEqual(response.status_code, 200)
+
+
+class ListRowCacheTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(2)
+        self.client.force_login(self.admin)
+        self.url = reverse("students:courses-list")
+
+    def test_rows_are_rendered_from_cache_until_updated(self):
+        course = Course.objects.first()
+        self.assertContains(self.client.get(self.url), course.name)
+
+        # update() leaves updated_at alone, so the cached row is still served
+        Course.objects.filter(pk=course.pk).update(name="Renamed")
+        self.assertNotContains(self.client.get(self.url), "Renamed")
+
+        course.refresh_from_db()
+        course.save()
+        self.assertContains(self.client.get(self.url), "Renamed")
+
+    def test_rows_follow_user_renames(self):
+        urls = [
+            reverse("students:list"),
+            reverse("students:instructors-list"),
+            reverse("students:enrollments-list"),
+        ]
+        for url in urls:
+            self.assertNotContains(self.client.get(url), "Renamed")
+
+        for profile in (Student.objects.first(), Instructor.objects.first()):
+            user = User.objects.get(pk=profile.user_id)
+            user.last_name = "Renamed"
+            user.save()
+        for url in urls:
+            with self.subTest(url):
+                self.assertContains(self.client.get(url), "Renamed")
+
+        # other changes of the user leave the rows cached
+        student = Student.objects.first()
+        user = User.objects.get(pk=student.user_id)
+        user.email = "student@example.com"
+        user.save()
+        self.assertEqual(
+            Student.objects.get(pk=student.pk).updated_at, student.updated_at
+        )
+
+    def test_rows_depend_on_the_role(self):
+        self.client.get(self.url)
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertNotContains(response, "Delete")
+        self.assertNotContains(response, "csrfmiddlewaretoken")
+
+    def test_csrf_token_is_outside_the_rows(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, "csrfmiddlewaretoken", count=1)
+        self.assertContains(response, 'form="delete-form"', count=2)
+
+    def test_regrade_invalidates_enrollment_rows(self):
+        url = reverse("students:enrollments-list")
+        enrollment = Enrollment.objects.first()
+        enrollment.score = 75
+        enrollment.save()
+        self.assertContains(self.client.get(url), "<td>B</td>", html=False)
+
+        Enrollment.objects.filter(pk=enrollment.pk).update(score=85)
+        self.assertContains(self.client.get(url), "<td>A</td>", html=False)
+
+    def test_bulk_writes_bump_the_generations(self):
+        before = generations(Course, Enrollment)
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.update(score=50)
+        after_update = generations(Course, Enrollment)
+        self.assertEqual(after_update[0], before[0])
+        self.assertNotEqual(after_update[1], before[1])
+
+        student = Student.objects.first()
+        lines = StringIO(
+            f"email,course,score\n{student.user.email},{Course.objects.last().code},60\n"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            import_enrollments(lines)
+        after_import = generations(Course, Enrollment)
+        self.assertNotEqual(after_import[0], after_update[0])
+        self.assertNotEqual(after_import[1], after_update[1])
+
+
+class AutocompleteTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(25)
+        self.client.force_login(self.admin)
+
+    def results(self, name, query=""):
+        response = self.client.get(reverse(name), {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"]
+
+    def test_results_are_limited(self):
+        self.assertEqual(len(self.results("students:autocomplete")), 20)
+        self.assertEqual(len(self.results("students:courses-autocomplete")), 20)
+
+    def test_prefix_lookup(self):
+        course = Course.objects.get(code="C0007")
+        self.assertEqual(
+            self.results("students:courses-autocomplete", "c0007"),
+            [{"id": course.pk, "text": "Course 7 (C0007)"}],
+        )
+        student = Student.objects.get(user__username="student7")
+        self.assertEqual(
+            self.results("students:autocomplete", "7"),
+            [{"id": student.pk, "text": "Student 7"}],
+        )
+        self.assertEqual(len(self.results("students:autocomplete", "stud")), 20)
+        self.assertEqual(self.results("students:autocomplete", "nobody"), [])
+
+    def test_form_renders_only_the_selected_options(self):
+        enrollment = Enrollment.objects.select_related("course").first()
+        response = self.client.get(
+            reverse("students:enrollments-update", args=[enrollment.pk])
+        )
+        self.assertContains(response, course_label(enrollment.course))
+        # the empty choice and the selected one, for the course and the student
+        self.assertContains(response, "<option", count=4)
+
+    def test_requires_admin(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("students:autocomplete"))
+        self.assertEqual(response.status_code, 302)
+
+
+class GenerateDataTestCase(BaseTestCase):
+    def generated(self, prefix):
+        enrollments = Enrollment.objects.filter(
+            student__user__username__startswith=f"{prefix}-"
+        ).order_by("pk")
+        return list(
+            enrollments.values_list(
+                "student__user__first_name", "course__name", "score", "grade"
+            )
+        )
+
+    def test_generates_the_requested_rows(self):
+        out = StringIO()
+        call_command(
+            "generate_data",
+            "--students=30",
+            "--instructors=3",
+            "--courses=8",
+            "--enrollments=100",
+            "--batch-size=7",
+            stdout=out,
+        )
+        self.assertIn("enrollments: 100", out.getvalue())
+        self.assertEqual(Student.objects.count(), 30)
+        self.assertEqual(Course.objects.count(), 8)
+        self.assertEqual(Enrollment.objects.count(), 100)
+        # every student gets 3 or 4 of the 8 courses
+        per_student = Enrollment.objects.values("student").annotate(n=Count("pk"))
+        self.assertEqual({row["n"] for row in per_student}, {3, 4})
+        for enrollment in Enrollment.objects.select_related("course"):
+            self.assertEqual(
+                enrollment.grade, GradingScheme().grade_for(enrollment.score)
+            )
+        self.assertEqual(DashboardCounter.load().enrollments, 100)
+        self.assertEqual(CourseStatistics.objects.count(), 8)
+
+    def test_same_seed_same_data(self):
+        for prefix in ("a", "b"):
+            call_command(
+                "generate_data",
+                f"--prefix={prefix}",
+                "--seed=3",
+                "--students=10",
+                "--courses=4",
+                "--instructors=1",
+                "--enrollments=20",
+                stdout=StringIO(),
+            )
+        self.assertEqual(self.generated("a"), self.generated("b"))
+
+    def test_refuses_impossible_or_repeated_runs(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "generate_data", "--students=2", "--courses=2", "--enrollments=5"
+            )
+        call_command(
+            "generate_data",
+            "--students=2",
+            "--courses=2",
+            "--enrollments=4",
+            stdout=StringIO(),
+        )
+        with self.assertRaises(CommandError):
+            call_command(
+                "generate_data", "--students=2", "--courses=2", "--enrollments=4"
+            )
+
+
+class LoadTestTestCase(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser(
+            username="admin", email="admin@email.com", password="admin123"
+        )
+        user = User.objects.create_user(username="rabin", password="test123")
+        self.student = Student.objects.create(user=user)
+        course = Course.objects.create(name="Python", code="CS101", description="-")
+        Enrollment.objects.create(student=self.student, course=course, score=70)
+
+    def test_mixed_profile(self):
+        samples, elapsed = run(self.live_server_url, "mixed", users=1, duration=1)
+        routes = summarize(samples, elapsed)
+        self.assertIn("dashboard", routes)
+        self.assertTrue(all(route["errors"] == 0 for route in routes.values()))
+
+    def test_writes_and_report(self):
+        output = tempfile.NamedTemporaryFile(suffix=".json")
+        call_command(
+            "loadtest",
+            self.live_server_url,
+            "--profile=write",
+            "--users=1",
+            "--duration=1",
+            f"--output={output.name}",
+            stdout=StringIO(),
+        )
+        result = json.load(output)
+        self.assertEqual(result["totals"]["errors"], 0)
+        self.assertGreater(result["totals"]["requests"], 0)
+        out = StringIO()
+        call_command(
+            "loadtest",
+            self.live_server_url,
+            "--users=1",
+            "--duration=0.5",
+            f"--compare={output.name}",
+            stdout=out,
+        )
+        self.assertIn("p95 Δ", out.getvalue())
+
+    def test_bad_credentials(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "loadtest",
+                self.live_server_url,
+                "--admin=admin:wrong",
+                "--duration=0.1",
+                stdout=StringIO(),
+            )
+
+
+class EnrollmentImportTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = Student.objects.create(user=self.user)
+        self.course = Course.objects.create(name="Math", code="MTH101", description="")
+        Course.objects.create(name="Physics", code="PHY101", description="")
+
+    def test_import_creates_updates_and_reports(self):
+        Enrollment.objects.create(student=self.student, course=self.course, score=10)
+        lines = StringIO(
+            "email,course,score\n"
+            "john@email.com,MTH101,85\n"
+            "john@email.com,PHY101,\n"
+            "nobody@email.com,MTH101,70\n"
+            "john@email.com,CS999,70\n"
+            "john@email.com,PHY101,101\n"
+        )
+        report = import_enrollments(lines, batch_size=2)
+        self.assertEqual(report.imported, 2)
+        self.assertEqual([line for line, _ in report.errors], [4, 5, 6])
+
+        math = Enrollment.objects.get(course__code="MTH101")
+        self.assertEqual((math.score, math.grade), (85, "A"))
+        physics = Enrollment.objects.get(course__code="PHY101")
+        self.assertEqual((physics.score, physics.grade), (None, "NA"))
+        self.assertEqual(DashboardCounter.load().enrollments, 2)
+
+    def test_import_moves_the_counters_by_the_inserted_rows(self):
+        Enrollment.objects.create(student=self.student, course=self.course, score=10)
+        other = Student.objects.create(user=self.admin)
+        lines = StringIO(
+            "email,course,score\n"
+            "john@email.com,MTH101,85\n"
+            "admin@email.com,MTH101,60\n"
+            "admin@email.com,PHY101,70\n"
+        )
+        with self.assertNumQueries(17):
+            import_enrollments(lines)
+        self.assertEqual(Enrollment.objects.filter(student=other).count(), 2)
+        counter = DashboardCounter.load()
+        self.assertEqual((counter.enrollments, counter.active_courses), (3, 2))
+        self.assertEqual(
+            dict(Course.objects.values_list("code", "enrollment_count")),
+            {"MTH101": 2, "PHY101": 1},
+        )
+        self.assertEqual(DashboardCounter.reconcile().enrollments, 3)
+
+    def test_import_view(self):
+        self.client.force_login(self.admin)
+        url = reverse("students:enrollments-import")
+        upload = SimpleUploadedFile(
+            "enrollments.csv", b"email,course,score\njohn@email.com,MTH101,55\n"
+        )
+        response = self.client.post(url, {"file": upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "students/enrollment_import.html")
+        self.assertTrue(
+            Enrollment.objects.filter(student=self.student, course=self.course).exists()
+        )
+
+    def test_import_view_reports_a_file_that_is_not_utf8(self):
+        self.client.force_login(self.admin)
+        upload = SimpleUploadedFile(
+            "enrollments.csv",
+            "email,course,score\njohn@email.com,MTH101,55\nRenée,MTH101,60\n".encode(
+                "latin-1"
+            ),
+        )
+        response = self.client.post(
+            reverse("students:enrollments-import"), {"file": upload}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context["report"].errors,
+            [(1, "The file is not UTF-8 encoded.")],
+        )
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_import_stops_at_bytes_that_are_not_utf8(self):
+        # past the first chunk TextIOWrapper decodes, after a batch is written
+        rows = "john@email.com,MTH101,55\n" * 400 + "Renée,PHY101,60\n"
+        lines = TextIOWrapper(
+            BytesIO(f"email,course,score\n{rows}".encode("latin-1")),
+            encoding="utf-8-sig",
+            newline="",
+        )
+        report = import_enrollments(lines, batch_size=100)
+        self.assertEqual(
+            report.errors,
+            [
+                (
+                    302,
+                    "The file is not UTF-8 encoded. The rows from this line on were skipped.",
+                )
+            ],
+        )
+        self.assertEqual(report.imported, 3)
+        self.assertEqual(DashboardCounter.load().enrollments, 1)
+
+
+class ExportTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(3)
+
+    def test_enrollment_export_csv(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("students:enrollments-export"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("id,student_email,"))
+        self.assertEqual(len(lines), 1 + Enrollment.objects.count())
+
+    def test_student_export_jsonl_applies_search(self):
+        self.client.force_login(self.admin)
+        url = reverse("students:export")
+        response = self.client.get(url, {"format": "jsonl", "q": "Student"})
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["first_name"], "Student")
+
+    def test_students_only_export_their_enrollments(self):
+        student = Student.objects.create(user=self.user)
+        Enrollment.objects.create(student=student, course=Course.objects.first())
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("students:enrollments-export"))
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("john@email.com", lines[1])
@@ -6,12 +6,19 @@ app_name = "students"
 urlpatterns = [
     # students
     path("", views.student_list, name="list"),
+    path("export/", views.student_export, name="export"),
+    path("autocomplete/", views.student_autocomplete, name="autocomplete"),
     path("<int:pk>/", views.student_detail, name="detail"),
     path("create/", views.student_create, name="create"),
     path("<int:pk>/update/", views.student_update, name="update"),
     path("<int:pk>/delete/", views.student_delete, name="delete"),
     # Courses
     path("courses/", views.course_list, name="courses-list"),
+    path(
+        "courses/autocomplete/",
+        views.course_autocomplete,
+        name="courses-autocomplete",
+    ),
     path("courses/<int:pk>/", views.course_detail, name="courses-detail"),
     path("courses/create/", views.course_create, name="courses-create"),
     path(
@@ -48,6 +55,16 @@ urlpatterns = [
     ),
     # Enrollments
     path("enrollments/", views.enrollment_list, name="enrollments-list"),
+    path(
+        "enrollments/export/",
+        views.enrollment_export,
+        name="enrollments-export",
+    ),
+    path(
+        "enrollments/import/",
+        views.enrollment_import,
+        name="enrollments-import",
+    ),
     path(
         "enrollments/<int:pk>/",
         views.enrollment_detail,
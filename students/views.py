@@ -1,15 +1,34 @@
+import io
+
 from django.db.models import Q
-from django.core.paginator import Paginator
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
 from django.shortcuts import render
-from students.models import Student, Course, Instructor, Enrollment, MetaData
-from students.forms import CourseForm, StudentForm, InstructorForm, EnrollmentForm
+from students.models import (
+    Student,
+    Course,
+    Instructor,
+    Enrollment,
+    DashboardCounter,
+)
+from students.forms import (
+    CourseForm,
+    StudentForm,
+    InstructorForm,
+    EnrollmentForm,
+    EnrollmentImportForm,
+    course_label,
+    student_label,
+)
+from students.importers import import_enrollments
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.views.decorators.http import require_POST
 
+from common.pagination import paginate
+from common.search import search
+from students.exports import export_response
 from users.permissions import is_admin, is_own_student, is_own_enrollment
 
 User = get_user_model()
@@ -17,36 +36,32 @@ User = get_user_model()
 
 @login_required
 def dashboard(request):
-    total_students = Student.objects.filter(user__is_active=True).count()
-    total_courses = Course.objects.filter(enrollments__isnull=False).distinct().count()
-    instructors = Instructor.objects.filter(user__is_active=True).count()
-    total_enrollments = Enrollment.objects.count()
+    counter = DashboardCounter.load()
     context = {
-        "total_students": total_students,
-        "total_courses": total_courses,
-        "total_instructors": instructors,
-        "total_enrollments": total_enrollments,
+        "total_students": counter.students,
+        "total_courses": counter.active_courses,
+        "total_instructors": counter.instructors,
+        "total_enrollments": counter.enrollments,
     }
     return render(request, "dashboard.html", context=context)
 
 
-@login_required
-def student_list(request):
-    students_qs = Student.objects.select_related("user")
-    user = request.user
-    if user.is_student:
-        students_qs = students_qs.filter(user=user)
-
+def filter_students(request, students):
+    """
+    Apply the visibility rules and the `q` search of the student list.
+    """
+    if request.user.is_student:
+        students = students.filter(user=request.user)
     query = request.GET.get("q")
     if query:
-        students_qs = students_qs.filter(
-            Q(user__first_name__icontains=query) | Q(user__last_name__icontains=query)
-        )
+        students = search(students, query, ["user__first_name", "user__last_name"])
+    return students
 
-    page_number = request.GET.get("page", 1)
-    page_limit = request.GET.get("limit", 10)
-    paginator = Paginator(students_qs, page_limit)
-    page_obj = paginator.get_page(page_number)
+
+@login_required
+def student_list(request):
+    students_qs = filter_students(request, Student.objects.select_related("user"))
+    page_obj = paginate(request, students_qs)
 
     students = page_obj.object_list
 
@@ -57,9 +72,49 @@ def student_list(request):
     )
 
 
+@login_required
+def student_export(request):
+    students = filter_students(request, Student.objects.all())
+    columns = ["id", "first_name", "last_name", "email", "date_of_birth"]
+    rows = students.values_list(
+        "id", "user__first_name", "user__last_name", "user__email", "date_of_birth"
+    )
+    return export_response(request, rows, columns, "students")
+
+
+AUTOCOMPLETE_LIMIT = 20
+
+
+def autocomplete_response(queryset, label):
+    results = [
+        {"id": obj.pk, "text": label(obj)} for obj in queryset[:AUTOCOMPLETE_LIMIT]
+    ]
+    return JsonResponse({"results": results})
+
+
+@user_passes_test(is_admin)
+def student_autocomplete(request):
+    # prefix lookups, served by the trigram indexes on the user name columns;
+    # the order follows the users name index, so that without a query only the
+    # first AUTOCOMPLETE_LIMIT rows are read
+    students = Student.objects.select_related("user").only(
+        "user__first_name", "user__last_name"
+    )
+    students = students.order_by("user__first_name", "user__last_name", "user_id")
+    query = request.GET.get("q", "").strip()
+    if query:
+        students = students.filter(
+            Q(user__first_name__istartswith=query)
+            | Q(user__last_name__istartswith=query)
+            | Q(user__email__istartswith=query)
+        )
+    return autocomplete_response(students, student_label)
+
+
 @login_required
 def student_detail(request, pk):
-    student = get_object_or_404(Student, pk=pk)
+    students = Student.objects.select_related("user").prefetch_related("metadata")
+    student = get_object_or_404(students, pk=pk)
     user = request.user
     if not (user.is_admin or is_own_student(user, student)):
         return HttpResponseForbidden(
@@ -70,7 +125,6 @@ def student_detail(request, pk):
 
 @user_passes_test(is_admin)
 def student_create(request):
-    metadata_qs = MetaData.objects.all()
     if request.method == "POST":
         form = StudentForm(request.POST)
         if form.is_valid():
@@ -93,7 +147,7 @@ def student_create(request):
     return render(
         request,
         "students/student_form.html",
-        {"form": form, "student": None, "metadata": metadata_qs},
+        {"form": form, "student": None},
     )
 
 
@@ -101,7 +155,6 @@ def student_create(request):
 def student_update(request, pk):
     student = get_object_or_404(Student, pk=pk)
     user = student.user
-    metadata_qs = MetaData.objects.all()
     if request.method == "POST":
         form = StudentForm(request.POST, instance=student)
         if form.is_valid():
@@ -134,7 +187,7 @@ def student_update(request, pk):
     return render(
         request,
         "students/student_form.html",
-        {"form": form, "student": student, "metadata": metadata_qs},
+        {"form": form, "student": student},
     )
 
 
@@ -153,16 +206,9 @@ def course_list(request):
 
     query = request.GET.get("q")  # search term
     if query:
-        courses = courses.filter(
-            Q(name__icontains=query)
-            | Q(code__icontains=query)
-            | Q(description__icontains=query)
-        )
+        courses = search(courses, query, ["name", "code", "description"])
 
-    page_number = request.GET.get("page", 1)
-    page_limit = request.GET.get("limit", 10)
-    paginator = Paginator(courses, page_limit)
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, courses)
 
     courses = page_obj.object_list
 
@@ -171,15 +217,28 @@ def course_list(request):
     )
 
 
+@user_passes_test(is_admin)
+def course_autocomplete(request):
+    courses = Course.objects.only("name", "code").order_by("code")
+    query = request.GET.get("q", "").strip()
+    if query:
+        courses = courses.filter(
+            Q(code__istartswith=query) | Q(name__istartswith=query)
+        )
+    return autocomplete_response(courses, course_label)
+
+
 @login_required
 def course_detail(request, pk):
-    course = get_object_or_404(Course, pk=pk)
+    course = get_object_or_404(
+        Course.objects.select_related("statistics").prefetch_related("metadata"),
+        pk=pk,
+    )
     return render(request, "students/course_detail.html", {"course": course})
 
 
 @user_passes_test(is_admin)
 def course_create(request):
-    metadata_qs = MetaData.objects.all()
     if request.method == "POST":
         form = CourseForm(request.POST)
         if form.is_valid():
@@ -187,6 +246,7 @@ def course_create(request):
                 name=form.cleaned_data["name"],
                 code=form.cleaned_data["code"],
                 description=form.cleaned_data["description"],
+                grading_scheme=form.cleaned_data["grading_scheme"],
             )
             metadata = form.cleaned_data.get("metadata", [])
             if metadata:
@@ -198,20 +258,20 @@ def course_create(request):
     return render(
         request,
         "students/course_form.html",
-        {"form": form, "course": None, "metadata": metadata_qs},
+        {"form": form, "course": None},
     )
 
 
 @user_passes_test(is_admin)
 def course_update(request, pk):
     course = get_object_or_404(Course, pk=pk)
-    metadata_qs = MetaData.objects.all()
     if request.method == "POST":
         form = CourseForm(request.POST, instance=course)
         if form.is_valid():
             course.name = form.cleaned_data["name"]
             course.code = form.cleaned_data["code"]
             course.description = form.cleaned_data["description"]
+            course.grading_scheme = form.cleaned_data["grading_scheme"]
             metadata = form.cleaned_data.get("metadata", [])
             course.save()
             course.metadata.set(metadata)
@@ -222,13 +282,14 @@ def course_update(request, pk):
             "name": course.name,
             "code": course.code,
             "description": course.description,
+            "grading_scheme": course.grading_scheme_id,
             "metadata": course.metadata.all(),
         }
         form = CourseForm(initial=initial_data, instance=course)
     return render(
         request,
         "students/course_form.html",
-        {"form": form, "course": course, "metadata": metadata_qs},
+        {"form": form, "course": course},
     )
 
 
@@ -243,18 +304,15 @@ def course_delete(request, pk):
 
 @login_required
 def instructor_list(request):
-    instructors = Instructor.objects.select_related("user").prefetch_related("courses")
+    instructors = Instructor.objects.select_related("user")
 
     query = request.GET.get("q")  # search term
     if query:
-        instructors = instructors.filter(
-            Q(user__first_name__icontains=query) | Q(user__last_name__icontains=query)
+        instructors = search(
+            instructors, query, ["user__first_name", "user__last_name"]
         )
 
-    page_number = request.GET.get("page", 1)
-    page_limit = request.GET.get("limit", 10)
-    paginator = Paginator(instructors, page_limit)
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, instructors)
 
     instructors = page_obj.object_list
 
@@ -270,7 +328,8 @@ def instructor_list(request):
 
 @login_required
 def instructor_detail(request, pk):
-    instructor = get_object_or_404(Instructor, pk=pk)
+    instructors = Instructor.objects.select_related("user").prefetch_related("metadata")
+    instructor = get_object_or_404(instructors, pk=pk)
     return render(
         request, "students/instructor_detail.html", {"instructor": instructor}
     )
@@ -278,8 +337,6 @@ def instructor_detail(request, pk):
 
 @user_passes_test(is_admin)
 def instructor_create(request):
-    courses = Course.objects.all()
-    metadata_qs = MetaData.objects.all()
     if request.method == "POST":
         form = InstructorForm(request.POST)
         if form.is_valid():
@@ -302,16 +359,14 @@ def instructor_create(request):
     return render(
         request,
         "students/instructor_form.html",
-        {"form": form, "instructor": None, "courses": courses, "metadata": metadata_qs},
+        {"form": form, "instructor": None},
     )
 
 
 @user_passes_test(is_admin)
 def instructor_update(request, pk):
-    instructor = get_object_or_404(Instructor, pk=pk)
+    instructor = get_object_or_404(Instructor.objects.select_related("user"), pk=pk)
     user = instructor.user
-    courses = Course.objects.all()
-    metadata_qs = MetaData.objects.all()
     if request.method == "POST":
         form = InstructorForm(request.POST, instance=instructor)
         if form.is_valid():
@@ -346,8 +401,6 @@ def instructor_update(request, pk):
         {
             "form": form,
             "instructor": instructor,
-            "courses": courses,
-            "metadata": metadata_qs,
         },
     )
 
@@ -361,26 +414,32 @@ def instructor_delete(request, pk):
     return redirect("students:instructors-list")
 
 
-@login_required
-def enrollment_list(request):
-    if is_admin(request.user):
-        enrollments = Enrollment.objects.all()
-    else:
-        enrollments = Enrollment.objects.filter(student__user=request.user)
-
+def filter_enrollments(request, enrollments):
+    """
+    Apply the visibility rules and the `q` search of the enrollment list.
+    """
+    if not is_admin(request.user):
+        enrollments = enrollments.filter(student__user=request.user)
     query = request.GET.get("q")
     if query:
-        enrollments = enrollments.filter(
-            Q(student__user__first_name__icontains=query)
-            | Q(student__user__last_name__icontains=query)
-            | Q(course__name__icontains=query)
-            | Q(course__code__icontains=query)
+        enrollments = search(
+            enrollments,
+            query,
+            [
+                "student__user__first_name",
+                "student__user__last_name",
+                "course__name",
+                "course__code",
+            ],
         )
+    return enrollments
 
-    page_number = request.GET.get("page", 1)
-    page_limit = request.GET.get("limit", 2)
-    paginator = Paginator(enrollments, page_limit)
-    page_obj = paginator.get_page(page_number)
+
+@login_required
+def enrollment_list(request):
+    enrollments = Enrollment.objects.select_related("student__user", "course")
+    enrollments = filter_enrollments(request, enrollments)
+    page_obj = paginate(request, enrollments, default_limit=2)
 
     enrollments = page_obj.object_list
 
@@ -391,9 +450,40 @@ def enrollment_list(request):
     )
 
 
+@login_required
+def enrollment_export(request):
+    enrollments = filter_enrollments(request, Enrollment.objects.all())
+    columns = [
+        "id",
+        "student_email",
+        "student_first_name",
+        "student_last_name",
+        "course_code",
+        "course_name",
+        "enrollment_date",
+        "score",
+        "grade",
+    ]
+    rows = enrollments.values_list(
+        "id",
+        "student__user__email",
+        "student__user__first_name",
+        "student__user__last_name",
+        "course__code",
+        "course__name",
+        "enrollment_date",
+        "score",
+        "grade",
+    )
+    return export_response(request, rows, columns, "enrollments")
+
+
 @login_required
 def enrollment_detail(request, pk):
-    enrollment = get_object_or_404(Enrollment, pk=pk)
+    enrollments = Enrollment.objects.select_related(
+        "student__user", "course"
+    ).prefetch_related("metadata")
+    enrollment = get_object_or_404(enrollments, pk=pk)
     user = request.user
     if not (user.is_admin or is_own_enrollment(user, enrollment)):
         return HttpResponseForbidden(
@@ -406,16 +496,12 @@ def enrollment_detail(request, pk):
 
 @user_passes_test(is_admin)
 def enrollment_create(request):
-    students = Student.objects.all()
-    courses = Course.objects.all()
-    metadata_qs = MetaData.objects.all()
     if request.method == "POST":
         form = EnrollmentForm(request.POST)
         if form.is_valid():
             enrollment = Enrollment.objects.create(
                 student=form.cleaned_data["student"],
                 course=form.cleaned_data["course"],
-                grade=form.cleaned_data.get("grade"),
                 score=form.cleaned_data.get("score"),
             )
             metadata = form.cleaned_data.get("metadata", [])
@@ -428,9 +514,6 @@ def enrollment_create(request):
     context = {
         "form": form,
         "enrollment": None,
-        "students": students,
-        "courses": courses,
-        "metadata": metadata_qs,
     }
     return render(request, "students/enrollment_form.html", context=context)
 
@@ -438,15 +521,11 @@ def enrollment_create(request):
 @user_passes_test(is_admin)
 def enrollment_update(request, pk):
     enrollment = get_object_or_404(Enrollment, pk=pk)
-    students = Student.objects.all()
-    courses = Course.objects.all()
-    metadata_qs = MetaData.objects.all()
     if request.method == "POST":
         form = EnrollmentForm(request.POST, instance=enrollment)
         if form.is_valid():
             enrollment.student = form.cleaned_data["student"]
             enrollment.course = form.cleaned_data["course"]
-            enrollment.grade = form.cleaned_data.get("grade")
             enrollment.score = form.cleaned_data.get("score")
             metadata = form.cleaned_data.get("metadata", [])
             enrollment.save()
@@ -455,10 +534,9 @@ def enrollment_update(request, pk):
             return redirect("students:enrollments-list")
     else:
         initial_data = {
-            "student": enrollment.student.id,
-            "course": enrollment.course.id,
+            "student": enrollment.student_id,
+            "course": enrollment.course_id,
             "enrollment_date": getattr(enrollment, "enrollment_date", None),
-            "grade": getattr(enrollment, "grade", None),
             "score": getattr(enrollment, "score", None),
             "metadata": enrollment.metadata.all(),
         }
@@ -469,9 +547,6 @@ def enrollment_update(request, pk):
         {
             "form": form,
             "enrollment": enrollment,
-            "students": students,
-            "courses": courses,
-            "metadata": metadata_qs,
         },
     )
 
@@ -483,3 +558,25 @@ def enrollment_delete(request, pk):
     enrollment.delete()
     messages.success(request, "Enrollment has been deleted successfully!")
     return redirect("students:enrollments-list")
+
+
+@user_passes_test(is_admin)
+def enrollment_import(request):
+    report = None
+    if request.method == "POST":
+        form = EnrollmentImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            lines = io.TextIOWrapper(
+                form.cleaned_data["file"], encoding="utf-8-sig", newline=""
+            )
+            report = import_enrollments(lines)
+            messages.success(
+                request, f"{report.imported} enrollments have been imported."
+            )
+    else:
+        form = EnrollmentImportForm()
+    return render(
+        request,
+        "students/enrollment_import.html",
+        {"form": form, "report": report},
+    )
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from common.threads import in_thread
+
+User = get_user_model()
+
+
+def user_cache_key(user_id):
+    return f"users:user:{user_id}"
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the session user together with the student and
+    instructor profiles in one query, so the role checks made on every page
+    (`is_student`, `is_instructor`) do not query again.
+
+    When USER_CACHE_TIMEOUT is set the loaded user is also cached, and dropped
+    by users.signals whenever the user or one of the profiles changes.
+    """
+
+    def get_user(self, user_id):
+        timeout = settings.USER_CACHE_TIMEOUT
+        user = cache.get(user_cache_key(user_id)) if timeout else None
+        if user is None:
+            try:
+                user = User._default_manager.select_related(
+                    "student", "instructor_profile"
+                ).get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            if timeout:
+                cache.set(user_cache_key(user_id), user, timeout)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        # ModelBackend.aget_user queries on its own, without the profiles
+        return await in_thread(self.get_user)(user_id)
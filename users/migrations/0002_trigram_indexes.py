@@ -0,0 +1,18 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from common.search import TrigramIndex
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        TrigramIndex("users.User", "first_name"),
+        TrigramIndex("users.User", "last_name"),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0002_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["email"], name="users_user_email_6f2530_idx"),
+        ),
+    ]
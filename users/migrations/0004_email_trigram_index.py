@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from common.search import TrigramIndex
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("users", "0003_user_email_index"),
+    ]
+
+    operations = [
+        TrigramIndex("users.User", "email"),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0004_email_trigram_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["first_name", "last_name", "id"],
+                name="users_user_first_n_b28b0b_idx",
+            ),
+        ),
+    ]
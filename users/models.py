@@ -1,15 +1,36 @@
 from django.contrib.auth.models import AbstractUser
+from django.db import models
 
 
 class User(AbstractUser):
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # lookups by email: the email uniqueness checks and the enrollment import
+            models.Index(fields=["email"]),
+            # the name order of the student autocomplete, read up to its limit
+            models.Index(fields=["first_name", "last_name", "id"]),
+        ]
+
     @property
     def is_student(self):
         return hasattr(self, "student")
 
     @property
     def is_instructor(self):
-        return hasattr(self, "instructor")
+        return hasattr(self, "instructor_profile")
 
     @property
     def is_admin(self):
         return self.is_staff
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so that (de)activation can be counted on save
+        instance._loaded_is_active = instance.__dict__.get("is_active")
+        # and renames, which the cached list rows of the profiles show
+        instance._loaded_name = (
+            instance.__dict__.get("first_name"),
+            instance.__dict__.get("last_name"),
+        )
+        return instance
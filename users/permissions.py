@@ -8,5 +8,5 @@ def is_own_student(user, student):
 
 def is_own_enrollment(user, enrollment):
     return user.is_authenticated and (
-        user.is_student and user.student == enrollment.student
+        user.is_student and user.student.pk == enrollment.student_id
     )
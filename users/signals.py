@@ -0,0 +1,28 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.backends import user_cache_key
+
+User = get_user_model()
+
+
+def forget_user(user_id):
+    # deleting only after commit keeps a concurrent request from caching the
+    # old row again before this transaction is visible
+    transaction.on_commit(partial(cache.delete, user_cache_key(user_id)))
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender="students.Student")
+@receiver([post_save, post_delete], sender="students.Instructor")
+def profile_changed(sender, instance, **kwargs):
+    forget_user(instance.user_id)
@@ -1,3 +1,50 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from common.tests import BaseTestCase
+from students.models import Instructor, Student
+from users.backends import ProfileModelBackend
+
+User = get_user_model()
+
+
+class ProfileModelBackendTestCase(BaseTestCase):
+    def test_roles_need_no_extra_queries(self):
+        Student.objects.create(user=self.user, date_of_birth="2000-01-01")
+        Instructor.objects.create(user=self.admin)
+        backend = ProfileModelBackend()
+
+        student_user = backend.get_user(self.user.pk)
+        instructor_user = backend.get_user(self.admin.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(student_user.is_student)
+            self.assertFalse(student_user.is_instructor)
+            self.assertTrue(instructor_user.is_instructor)
+            self.assertFalse(instructor_user.is_student)
+
+    @override_settings(USER_CACHE_TIMEOUT=60)
+    def test_cached_user_is_invalidated_on_profile_change(self):
+        backend = ProfileModelBackend()
+        self.assertFalse(backend.get_user(self.user.pk).is_student)
+        with self.assertNumQueries(0):
+            self.assertFalse(backend.get_user(self.user.pk).is_student)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.create(user=self.user, date_of_birth="2000-01-01")
+        self.assertTrue(backend.get_user(self.user.pk).is_student)
+
+    def test_sessions_of_the_previous_backend_stay_logged_in(self):
+        self.client.force_login(
+            self.user, backend="django.contrib.auth.backends.ModelBackend"
+        )
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_dashboard_role_checks(self):
+        Instructor.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("dashboard"))
+        self.assertFalse(response.context["is_student"])
+        self.assertTrue(response.context["is_instructor"])